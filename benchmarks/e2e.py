@@ -0,0 +1,299 @@
+# benchmarks/e2e.py
+"""
+Benchmarks de extremo a extremo de la CLI contra fuentes locales simuladas.
+
+Cada escenario ejecuta los comandos reales (`download`, `convert`,
+`organize`) en un proceso nuevo, con las fuentes de `benchmarks/fakes.py`
+servidas por un servidor HTTP local con latencia, ancho de banda y tasa de
+errores configurables. Se mide el rendimiento (elementos/s), la latencia
+p50/p99 por elemento y la memoria pico (RSS del proceso y sus hijos).
+
+Con `--baseline` los resultados se comparan con una referencia guardada y el
+benchmark termina con código 1 si alguna métrica empeora más de
+`--tolerance`. `--update-baseline` guarda los resultados como nueva
+referencia (generarla en la misma máquina donde se va a comparar).
+
+Uso:
+    python benchmarks/e2e.py                                  # todos los escenarios
+    python benchmarks/e2e.py --scenario playlist-1000 --scale 0.1
+    python benchmarks/e2e.py --baseline benchmarks/baseline.json --update-baseline
+    python benchmarks/e2e.py --baseline benchmarks/baseline.json --tolerance 0.25
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from urllib.parse import urlparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = ["single-track", "playlist-1000", "spotify-resolution", "batch-convert", "organize-100k"]
+
+# Métricas comparadas con la referencia: True si un valor mayor es mejor.
+METRICS = {"throughput": True, "p50": False, "p99": False, "peak_rss_mb": False}
+
+
+def percentile(values, fraction):
+    """Percentil por el método del rango más cercano; None si no hay valores."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def peak_rss_mb() -> float:
+    """Memoria pico del proceso y de sus hijos ya terminados (ffmpeg, pools), en MiB."""
+    scale = 1 if sys.platform == "darwin" else 1024  # macOS informa bytes; Linux, KiB
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak * scale / 1_048_576
+
+
+# --- Escenarios (se ejecutan dentro del proceso hijo) ---
+
+def _download_scenario(options, workdir, path):
+    """Ejecuta `download` sobre `path` del servidor simulado con las fuentes falsas."""
+    import fakes
+    from commands import download_command
+    from metadata import postprocess
+    from sources.registry import ProviderRegistry, ProviderSpec
+
+    server = fakes.FakeServer(fakes.ServerConfig(
+        latency=options.latency, bandwidth=options.bandwidth,
+        error_rate=options.error_rate, track_seconds=options.track_seconds,
+    )).start()
+    youtube = fakes.FakeYouTubeSource(server)
+    spotify = fakes.FakeSpotifySource(server, youtube)
+    # Ambas fuentes comparten el dominio del servidor: desempata `is_valid_url`
+    host = urlparse(server.base_url).hostname
+    providers = ProviderRegistry([
+        ProviderSpec("fakespotify", lambda: spotify, hosts=(host,)),
+        ProviderSpec("fakeyoutube", lambda: youtube, hosts=(host,)),
+    ])
+    download_command.get_providers = lambda **options: providers
+
+    # La latencia de cada pista va desde que la fuente empieza a resolverla
+    # hasta que termina su posproceso (etiquetado y renombrado).
+    latencies = []
+    process_file = postprocess.process_file
+
+    def timed_process_file(file_path, metadata, output_dir, *args, **kwargs):
+        result = process_file(file_path, metadata, output_dir, *args, **kwargs)
+        if 'bench_started' in metadata:
+            latencies.append(time.perf_counter() - metadata['bench_started'])
+        return result
+
+    postprocess.process_file = timed_process_file
+    urls = [f"{server.base_url}{path}"] * (options.repeat if path.startswith("/track/") else 1)
+    started = time.perf_counter()
+    items = 0
+    for n, url in enumerate(urls):
+        # Cada repetición usa su propio directorio: el manifiesto la omitiría
+        stats = download_command.download.main(
+            [url, "--output", os.path.join(workdir, f"out{n}"), "--jobs", str(options.jobs)],
+            standalone_mode=False,
+        )
+        items += len(stats.completed)
+        if stats.failures:
+            raise RuntimeError(f"{len(stats.failures)} fallos, el primero: {stats.failures[0].error}")
+    elapsed = time.perf_counter() - started
+    server.stop()
+    return items, elapsed, latencies
+
+
+def scenario_single_track(options, workdir):
+    return _download_scenario(options, workdir, "/track/1")
+
+
+def scenario_playlist(options, workdir):
+    return _download_scenario(options, workdir, f"/playlist/{max(1, int(1000 * options.scale))}")
+
+
+def scenario_spotify(options, workdir):
+    return _download_scenario(options, workdir, f"/spotify/playlist/{max(1, int(200 * options.scale))}")
+
+
+def scenario_batch_convert(options, workdir):
+    import fakes
+    from commands import convert_command
+
+    source = os.path.join(workdir, "wav")
+    os.makedirs(source)
+    wav = fakes.tone_wav(options.track_seconds * 5)
+    for n in range(max(1, int(40 * options.scale))):
+        with open(os.path.join(source, f"Artist {n} - Track {n}.wav"), "wb") as f:
+            f.write(wav)
+    started = time.perf_counter()
+    results = convert_command.convert.main([source, "--output", os.path.join(workdir, "mp3")], standalone_mode=False)
+    elapsed = time.perf_counter() - started
+    errors = [result for result in results if result['status'] == 'error']
+    if errors:
+        raise RuntimeError(f"{len(errors)} conversiones fallidas, la primera: {errors[0]['error']}")
+    return len(results), elapsed, [result['elapsed'] for result in results]
+
+
+def scenario_organize(options, workdir):
+    from commands import organize_command
+
+    library = os.path.join(workdir, "library")
+    total = max(1, int(100_000 * options.scale))
+    # Nombres que necesitan renombrado ("!" no es válido), repartidos en 100 carpetas
+    for n in range(total):
+        directory = os.path.join(library, f"{n % 100:03d}")
+        os.makedirs(directory, exist_ok=True)
+        open(os.path.join(directory, f"Artist {n % 997} - Track {n}!.mp3"), "wb").close()
+    started = time.perf_counter()
+    applied = organize_command.organize.main([library], standalone_mode=False)
+    elapsed = time.perf_counter() - started
+    if len(applied) != total:
+        raise RuntimeError(f"Se renombraron {len(applied)} de {total} archivos")
+    return total, elapsed, []
+
+
+RUNNERS = {
+    "single-track": scenario_single_track,
+    "playlist-1000": scenario_playlist,
+    "spotify-resolution": scenario_spotify,
+    "batch-convert": scenario_batch_convert,
+    "organize-100k": scenario_organize,
+}
+
+
+def run_child(options):
+    """Ejecuta un escenario en este proceso y escribe sus métricas en `options.result`."""
+    sys.path.insert(0, os.path.join(ROOT, "src"))
+    with tempfile.TemporaryDirectory(prefix="music-cli-bench-") as workdir:
+        # Cachés e índices aislados: el benchmark no toca los del usuario
+        os.environ["MUSIC_CLI_CACHE_DIR"] = os.path.join(workdir, "cache")
+        items, elapsed, latencies = RUNNERS[options.run_scenario](options, workdir)
+        result = {
+            "items": items,
+            "elapsed": elapsed,
+            "throughput": items / max(elapsed, 1e-9),
+            "p50": percentile(latencies, 0.50),
+            "p99": percentile(latencies, 0.99),
+            "peak_rss_mb": peak_rss_mb(),
+        }
+    with open(options.result, "w", encoding="utf-8") as f:
+        json.dump(result, f)
+
+
+def run_scenario(name, options):
+    """Lanza el escenario en un proceso nuevo (RSS limpio) y retorna sus métricas, o None si se omite."""
+    if name == "batch-convert" and shutil.which("ffmpeg") is None:
+        print(f"  {name:<20} omitido: FFmpeg no está instalado")
+        return None
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        result_path = f.name
+    args = [
+        sys.executable, os.path.abspath(__file__), "--run-scenario", name, "--result", result_path,
+        "--scale", str(options.scale), "--jobs", str(options.jobs), "--repeat", str(options.repeat),
+        "--latency", str(options.latency), "--bandwidth", str(options.bandwidth),
+        "--error-rate", str(options.error_rate), "--track-seconds", str(options.track_seconds),
+    ]
+    try:
+        output = None if options.verbose else subprocess.DEVNULL
+        completed = subprocess.run(args, stdout=output, stderr=None if options.verbose else subprocess.PIPE, text=True, check=False)
+        if completed.returncode != 0:
+            print(f"  {name:<20} ❌ falló (código {completed.returncode})")
+            if completed.stderr:
+                print(completed.stderr.strip())
+            return {"error": completed.returncode}
+        with open(result_path, encoding="utf-8") as f:
+            return json.load(f)
+    finally:
+        os.remove(result_path)
+
+
+def _format(value, unit=""):
+    if value is None:
+        return "—"
+    if unit == "ms":
+        return f"{value * 1000:.1f} ms"
+    return f"{value:.1f}{unit}"
+
+
+def compare(results, baseline, tolerance):
+    """Retorna las regresiones (escenario, métrica, referencia, actual) frente a la referencia."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get("scenarios", {}).get(name)
+        if not reference or "error" in result:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            expected, actual = reference.get(metric), result.get(metric)
+            if expected is None or actual is None:
+                continue
+            limit = expected * (1 - tolerance) if higher_is_better else expected * (1 + tolerance)
+            if (actual < limit) if higher_is_better else (actual > limit):
+                regressions.append((name, metric, expected, actual))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de extremo a extremo con fuentes simuladas.")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS, help="Escenario a ejecutar (repetible; por defecto, todos).")
+    parser.add_argument("--scale", type=float, default=1.0, help="Factor de tamaño de los escenarios (0.1 = playlist de 100, organize de 10k).")
+    parser.add_argument("--jobs", type=int, default=4, help="Trabajadores por etapa en las descargas.")
+    parser.add_argument("--repeat", type=int, default=5, help="Repeticiones del escenario de una sola pista.")
+    parser.add_argument("--latency", type=float, default=0.02, help="Latencia simulada por petición (s).")
+    parser.add_argument("--bandwidth", type=float, default=0.0, help="Ancho de banda simulado por conexión (bytes/s, 0 = sin límite).")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="Fracción de peticiones que fallan (503) en el primer intento.")
+    parser.add_argument("--track-seconds", type=float, default=2.0, help="Duración del audio generado por pista (s).")
+    parser.add_argument("--baseline", help="Archivo JSON de referencia con el que comparar.")
+    parser.add_argument("--update-baseline", action="store_true", help="Guarda los resultados en --baseline en lugar de comparar.")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Empeoramiento relativo permitido antes de fallar.")
+    parser.add_argument("--verbose", action="store_true", help="Muestra la salida de los comandos.")
+    parser.add_argument("--run-scenario", choices=SCENARIOS, help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    options = parser.parse_args()
+
+    if options.run_scenario:
+        run_child(options)
+        return 0
+
+    results = {}
+    print(f"{'Escenario':<22} {'Elementos':>9} {'Elem/s':>9} {'p50':>10} {'p99':>10} {'RSS pico':>10}")
+    for name in options.scenario or SCENARIOS:
+        result = run_scenario(name, options)
+        if result is None:
+            continue
+        results[name] = result
+        if "error" not in result:
+            print(
+                f"  {name:<20} {result['items']:>9} {result['throughput']:>9.1f} {_format(result['p50'], 'ms'):>10} "
+                f"{_format(result['p99'], 'ms'):>10} {_format(result['peak_rss_mb'], ' MiB'):>10}"
+            )
+    failed = any("error" in result for result in results.values())
+
+    if options.baseline and options.update_baseline:
+        document = {
+            "machine": {"python": platform.python_version(), "platform": platform.platform(), "cpus": os.cpu_count()},
+            "settings": {key: getattr(options, key) for key in ("scale", "jobs", "repeat", "latency", "bandwidth", "error_rate", "track_seconds")},
+            "scenarios": {name: result for name, result in results.items() if "error" not in result},
+        }
+        with open(options.baseline, "w", encoding="utf-8") as f:
+            json.dump(document, f, indent=2)
+        print(f"\nReferencia guardada en {options.baseline}")
+    elif options.baseline:
+        with open(options.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, options.tolerance)
+        for name, metric, expected, actual in regressions:
+            print(f"❌ Regresión en {name}: {metric} {expected:.4g} → {actual:.4g} (tolerancia {options.tolerance:.0%})")
+        if not regressions:
+            print(f"\n✅ Sin regresiones frente a {options.baseline}")
+        failed = failed or bool(regressions)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+# benchmarks/fakes.py
+"""
+Fuentes de prueba para los benchmarks de extremo a extremo.
+
+Un servidor HTTP local sirve audio generado, metadatos, páginas de playlist y
+búsquedas, con latencia, ancho de banda y tasa de errores configurables. Las
+fuentes `FakeYouTubeSource` y `FakeSpotifySource` implementan `BaseSource`
+contra ese servidor recorriendo el mismo camino que las reales: limitador,
+pool de conexiones, transferencia reanudable y caché de resoluciones.
+"""
+
+import http.server
+import io
+import json
+import math
+import os
+import re
+import struct
+import sys
+import threading
+import time
+import wave
+import zlib
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional
+from urllib.parse import parse_qs, quote, urlsplit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+from core import metrics, transfer  # noqa: E402
+from core.cache import get_resolution_cache, query_key  # noqa: E402
+from sources.base_source import BaseSource, DownloadError  # noqa: E402
+
+PAGE_SIZE = 100
+
+# Trama MPEG-1 Layer III de 128 kbps a 44,1 kHz (417 bytes, ~26 ms) con datos
+# nulos: un MP3 válido y silencioso que mutagen puede leer y etiquetar.
+_MP3_FRAME = b"\xff\xfb\x90\x64" + bytes(413)
+_MP3_FRAME_SECONDS = 1152 / 44100
+
+
+def silent_mp3(seconds: float) -> bytes:
+    """MP3 silencioso de la duración indicada (sin necesidad de un codificador)."""
+    return _MP3_FRAME * max(1, int(seconds / _MP3_FRAME_SECONDS))
+
+
+def tone_wav(seconds: float, frequency: float = 440.0, sample_rate: int = 22050) -> bytes:
+    """WAV mono de 16 bits con un tono puro, generado solo con la librería estándar."""
+    frames = int(seconds * sample_rate)
+    samples = (int(12000 * math.sin(2 * math.pi * frequency * n / sample_rate)) for n in range(frames))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(sample_rate)
+        out.writeframes(struct.pack(f"<{frames}h", *samples))
+    return buffer.getvalue()
+
+
+@dataclass
+class ServerConfig:
+    """Comportamiento del servidor simulado."""
+    latency: float = 0.02          # segundos añadidos a cada petición
+    bandwidth: float = 0.0         # bytes/s por conexión (0 = sin límite)
+    error_rate: float = 0.0        # fracción de peticiones que fallan (503) en el primer intento
+    track_seconds: float = 2.0     # duración del audio servido
+
+
+class FakeServer:
+    """
+    Servidor HTTP/1.1 (keep-alive) en 127.0.0.1 con las rutas:
+
+    - /track/<id>            metadatos JSON de una pista
+    - /audio/<id>.mp3        audio (admite HEAD y Range)
+    - /playlist/<n>?page=k   página de URLs de una playlist de n pistas
+    - /spotify/playlist/<n>?page=k   página de tracks estilo Spotify
+    - /search?q=...          resultados de búsqueda (URL de /track/<id>)
+
+    Los errores son deterministas: una ruta falla en su primer intento si su
+    CRC32 cae bajo `error_rate`, de modo que cada ejecución es reproducible.
+    """
+
+    def __init__(self, config: ServerConfig):
+        self.config = config
+        self.audio = silent_mp3(config.track_seconds)
+        self.requests = 0
+        self._attempts = {}
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_HEAD(self):
+                server._handle(self, head=True)
+
+            def do_GET(self):
+                server._handle(self, head=False)
+
+        self._httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._httpd.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self._httpd.server_port}"
+
+    def start(self) -> "FakeServer":
+        threading.Thread(target=self._httpd.serve_forever, name="fake-server", daemon=True).start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _should_fail(self, path: str) -> bool:
+        if self.config.error_rate <= 0:
+            return False
+        with self._lock:
+            attempt = self._attempts.get(path, 0)
+            self._attempts[path] = attempt + 1
+        return attempt == 0 and zlib.crc32(path.encode()) / 2 ** 32 < self.config.error_rate
+
+    def _handle(self, handler, head: bool):
+        with self._lock:
+            self.requests += 1
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        parsed = urlsplit(handler.path)
+        query = parse_qs(parsed.query)
+        if self._should_fail(handler.path):
+            return self._send(handler, 503, b"", "text/plain", head, {"Retry-After": "0"})
+
+        match = re.fullmatch(r"/track/(\d+)", parsed.path)
+        if match:
+            track_id = int(match.group(1))
+            body = {"id": track_id, "title": f"Track {track_id}", "artist": f"Artist {track_id % 97}",
+                    "audio_url": f"{self.base_url}/audio/{track_id}.mp3"}
+            return self._send(handler, 200, json.dumps(body).encode(), "application/json", head)
+
+        if re.fullmatch(r"/audio/\d+\.mp3", parsed.path):
+            return self._send_audio(handler, head)
+
+        match = re.fullmatch(r"/(spotify/)?playlist/(\d+)", parsed.path)
+        if match:
+            spotify, total = bool(match.group(1)), int(match.group(2))
+            page = int(query.get("page", ["0"])[0])
+            ids = range(page * PAGE_SIZE, min(total, (page + 1) * PAGE_SIZE))
+            if spotify:
+                items = [{"id": f"sp{i}", "name": f"Track {i}", "artists": [{"name": f"Artist {i % 97}"}]} for i in ids]
+            else:
+                items = [f"{self.base_url}/track/{i}" for i in ids]
+            has_next = (page + 1) * PAGE_SIZE < total
+            body = {"items": items, "next": page + 1 if has_next else None}
+            return self._send(handler, 200, json.dumps(body).encode(), "application/json", head)
+
+        if parsed.path == "/search":
+            match = re.search(r"Track (\d+)", query.get("q", [""])[0])
+            results = [{"url": f"{self.base_url}/track/{match.group(1)}"}] if match else []
+            return self._send(handler, 200, json.dumps(results).encode(), "application/json", head)
+
+        return self._send(handler, 404, b"", "text/plain", head)
+
+    def _send(self, handler, status: int, body: bytes, content_type: str, head: bool, headers: Optional[dict] = None):
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        if not head:
+            self._write(handler, body)
+
+    def _send_audio(self, handler, head: bool):
+        data, status = self.audio, 200
+        extra = {"Accept-Ranges": "bytes"}
+        match = re.fullmatch(r"bytes=(\d+)-(\d*)", handler.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else len(self.audio) - 1
+            data, status = self.audio[start:end + 1], 206
+            extra["Content-Range"] = f"bytes {start}-{end}/{len(self.audio)}"
+        self._send(handler, status, data, "audio/mpeg", head, extra)
+
+    def _write(self, handler, body: bytes):
+        """Escribe el cuerpo respetando el ancho de banda simulado."""
+        if not self.config.bandwidth:
+            handler.wfile.write(body)
+            return
+        chunk = max(1024, int(self.config.bandwidth / 20))
+        for start in range(0, len(body), chunk):
+            handler.wfile.write(body[start:start + chunk])
+            time.sleep(len(body[start:start + chunk]) / self.config.bandwidth)
+
+
+class FakeYouTubeSource(BaseSource):
+    """
+    Fuente estilo YouTube: resuelve los metadatos de cada pista (como la
+    página del video) y descarga su audio con `core.transfer`.
+    """
+    rate_limit = (1e6, 1e6)
+
+    def __init__(self, server: FakeServer, on_fetched: Optional[Callable[[dict], None]] = None):
+        self.server = server
+        self.on_fetched = on_fetched
+
+    def is_valid_url(self, url: str) -> bool:
+        return url.startswith(self.server.base_url) and "/spotify/" not in url
+
+    def get_source_name(self) -> str:
+        return "FakeYouTube"
+
+    def get_source_id(self, url: str) -> Optional[str]:
+        match = re.search(r"/track/(\d+)$", url)
+        return f"fake:{match.group(1)}" if match else None
+
+    def download(self, url: str, output_path: str) -> List[str]:
+        return [entry['path'] for entry in self.iter_download(url, output_path)]
+
+    def _get_json(self, url: str):
+        with self.http.get(url, preload=True) as response:
+            return json.loads(response.read())
+
+    def iter_download(self, url: str, output_path: str, skip: Optional[Callable[[str], bool]] = None) -> Iterator[dict]:
+        if "/playlist/" in url:
+            page = self._call(self._get_json, url)
+            while True:
+                for track_url in page["items"]:
+                    source_id = self.get_source_id(track_url)
+                    if skip is not None and skip(source_id):
+                        continue
+                    yield self._download_track(track_url, output_path)
+                if page["next"] is None:
+                    break
+                page = self._call(self._get_json, f"{url.split('?')[0]}?page={page['next']}")
+        else:
+            source_id = self.get_source_id(url)
+            if skip is not None and source_id is not None and skip(source_id):
+                return
+            yield self._download_track(url, output_path)
+
+    def _download_track(self, url: str, output_path: str) -> dict:
+        started = time.perf_counter()
+        try:
+            with metrics.span("resolve", source="FakeYouTube", item=url):
+                meta = self._call(self._get_json, url)
+            dest = os.path.join(output_path, f"{meta['artist']} - {meta['title']}.mp3")
+            transfer.download_file(meta["audio_url"], dest, pool=self.http)
+        except Exception as e:
+            raise DownloadError(f"FakeYouTube: {e}") from e
+        entry = {'path': dest, 'source_id': self.get_source_id(url), 'bench_started': started}
+        if self.on_fetched is not None:
+            self.on_fetched(entry)
+        return entry
+
+    def search(self, query: str) -> List[dict]:
+        results = self._call(self._get_json, f"{self.server.base_url}/search?q={quote(query)}")
+        return [{'title': query, 'artist': '', 'url': result['url']} for result in results]
+
+
+class FakeSpotifySource(BaseSource):
+    """
+    Fuente estilo Spotify: pagina los tracks de una playlist, resuelve cada
+    uno a una URL de la fuente de video mediante búsqueda y la caché de
+    resoluciones, y delega la descarga en ella.
+    """
+    rate_limit = (1e6, 1e6)
+
+    def __init__(self, server: FakeServer, youtube: FakeYouTubeSource):
+        self.server = server
+        self.youtube = youtube
+
+    def is_valid_url(self, url: str) -> bool:
+        return url.startswith(f"{self.server.base_url}/spotify/")
+
+    def get_source_name(self) -> str:
+        return "FakeSpotify"
+
+    def download(self, url: str, output_path: str) -> List[str]:
+        return [entry['path'] for entry in self.iter_download(url, output_path)]
+
+    def iter_download(self, url: str, output_path: str, skip: Optional[Callable[[str], bool]] = None) -> Iterator[dict]:
+        cache = get_resolution_cache()
+        page = self._call(self.youtube._get_json, url)
+        while True:
+            for track in page["items"]:
+                source_id = f"fakespotify:{track['id']}"
+                if skip is not None and skip(source_id):
+                    continue
+                artist, title = track["artists"][0]["name"], track["name"]
+                with metrics.span("resolve", source="FakeSpotify", item=source_id) as current:
+                    resolved = cache.get(source_id) or cache.get(query_key(artist, title))
+                    current.attrs['cached'] = resolved is not None
+                    if resolved is None:
+                        results = self.youtube.search(f"{artist} - {title}")
+                        if results:
+                            resolved = {'url': results[0]['url'], 'title': title, 'artist': artist}
+                            cache.set(source_id, resolved)
+                            cache.set(query_key(artist, title), resolved)
+                if resolved is None:
+                    continue
+                for entry in self.youtube.iter_download(resolved['url'], output_path):
+                    entry['source_id'] = source_id
+                    yield entry
+            if page["next"] is None:
+                break
+            page = self._call(self.youtube._get_json, f"{url.split('?')[0]}?page={page['next']}")
+
+    def search(self, query: str) -> List[dict]:
+        return []
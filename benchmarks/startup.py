@@ -0,0 +1,87 @@
+# benchmarks/startup.py
+"""
+Benchmark de arranque en frío de la CLI.
+
+Ejecuta varias veces `python src/cli.py <args>` en procesos nuevos, mide el
+tiempo de pared y, con `-X importtime`, desglosa el tiempo de importación por
+módulo. Termina con código 1 si la mediana supera `--max-ms`, para detectar
+regresiones en el arranque.
+
+Uso:
+    python benchmarks/startup.py                    # mide `--help`
+    python benchmarks/startup.py --args "--version" --runs 20 --max-ms 100
+"""
+
+import argparse
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CLI = os.path.join(ROOT, "src", "cli.py")
+
+
+def measure(args, runs):
+    """Retorna los tiempos de pared (ms) de `runs` arranques en frío."""
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, CLI] + args, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def import_breakdown(args, top):
+    """
+    Ejecuta una vez con `-X importtime` y retorna los `top` módulos con
+    mayor tiempo acumulado (µs), agrupados por paquete de primer nivel.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", CLI] + args,
+        stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=False,
+    )
+    packages = {}
+    for line in result.stderr.splitlines():
+        # Formato: "import time: self [us] | cumulative | imported package"
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        try:
+            _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        except ValueError:
+            continue
+        # Solo cuentan los módulos de primer nivel (sin sangría) para no sumar dos veces
+        if name != name.lstrip():
+            continue
+        package = name.split(".")[0]
+        packages[package] = packages.get(package, 0) + int(cumulative)
+    return sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mide el tiempo de arranque en frío de la CLI.")
+    parser.add_argument("--args", default="--help", help="Argumentos para la CLI (por defecto: --help).")
+    parser.add_argument("--runs", type=int, default=10, help="Número de arranques a medir.")
+    parser.add_argument("--top", type=int, default=15, help="Número de paquetes en el desglose de importaciones.")
+    parser.add_argument("--max-ms", type=float, default=None, help="Falla si la mediana supera este valor.")
+    options = parser.parse_args()
+
+    args = shlex.split(options.args)
+    timings = measure(args, options.runs)
+    median = statistics.median(timings)
+    print(f"cli.py {options.args}: mediana {median:.1f} ms, mín {min(timings):.1f} ms, máx {max(timings):.1f} ms ({options.runs} ejecuciones)")
+
+    print("\nImportaciones (tiempo acumulado por paquete de primer nivel):")
+    for package, micros in import_breakdown(args, options.top):
+        print(f"  {package:<30} {micros / 1000:8.1f} ms")
+
+    if options.max_ms is not None and median > options.max_ms:
+        print(f"\n❌ Regresión: la mediana ({median:.1f} ms) supera el límite de {options.max_ms:.1f} ms")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
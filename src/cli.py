@@ -1,46 +1,81 @@
 # src/cli.py
 
+import importlib
+import sys
+
 import click
-import pyfiglet
-from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
-from rich import box
-from commands import convert_command, download_command, interactive_command, search_command, organize_command
 
-console = Console()
+# --- Registro de comandos ---
+# Cada comando se declara como "módulo:atributo" junto con su ayuda corta. El
+# módulo (y con él pytube, spotipy, mutagen...) solo se importa cuando el
+# comando se ejecuta, de modo que `--help` y `--version` arrancan en frío.
+COMMANDS = {
+    "download": ("commands.download_command:download", "📥 Descarga una o varias URLs de música."),
+    "search": ("commands.search_command:search", "🔍 Busca música en las fuentes disponibles."),
+    "interactive": ("commands.interactive_command:interactive", "🤖 Inicia un modo interactivo de descarga."),
+    "convert": ("commands.convert_command:convert", "🎶 Convierte archivos de audio/video a MP3."),
+    "organize": ("commands.organize_command:organize", "📁 Renombra y organiza archivos de música en un directorio."),
+    "dedupe": ("commands.dedupe_command:dedupe", "🧬 Detecta canciones duplicadas por su huella acústica."),
+    "analyze": ("commands.analyze_command:analyze", "🔊 Mide la sonoridad (EBU R128) y escribe etiquetas ReplayGain."),
+    "cache": ("commands.cache_command:cache", "🗃️ Administra la caché de resoluciones Spotify → YouTube."),
+    "serve": ("commands.serve_command:serve", "🛰️ Inicia el daemon de descargas con una cola de trabajos persistente."),
+    "submit": ("commands.submit_command:submit", "📨 Envía URLs al daemon de descargas (`serve`)."),
+    "status": ("commands.submit_command:status", "📋 Muestra el estado del daemon y de sus trabajos."),
+}
 
-ascii_banner = pyfiglet.figlet_format("Music-CLI-PRO", font="slant")
-console.print(Panel(ascii_banner, style="bold magenta", expand=False),  justify="center")
-console.print("[bold cyan]By Diego Gonzales Soto.[/bold cyan]\n", justify="center")
 
-# --- Configuración de la CLI usando `click` ---
+class LazyGroup(click.Group):
+    """
+    Grupo de `click` que resuelve sus subcomandos bajo demanda a partir de
+    `COMMANDS`. La ayuda del grupo usa las descripciones registradas, sin importar nada.
+    """
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def list_commands(self, ctx):
+        return list(self.lazy_commands) + sorted(name for name in self.commands if name not in self.lazy_commands)
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+            module_name, attribute = self.lazy_commands[cmd_name][0].split(":")
+            command = getattr(importlib.import_module(module_name), attribute)
+            self.add_command(command, cmd_name)
+        return self.commands.get(cmd_name)
+
+    def format_commands(self, ctx, formatter):
+        rows = []
+        for name in self.list_commands(ctx):
+            if name in self.lazy_commands:
+                rows.append((name, self.lazy_commands[name][1]))
+            else:
+                rows.append((name, self.commands[name].get_short_help_str()))
+        if rows:
+            with formatter.section("Commands"):
+                formatter.write_dl(rows)
+
+
+def print_banner():
+    """Imprime el banner y la tabla de comandos. Solo se importa rich/pyfiglet si se muestra."""
+    import pyfiglet
+    from rich import box
+    from rich.console import Console
+    from rich.panel import Panel
+    from rich.table import Table
+
+    console = Console()
+    ascii_banner = pyfiglet.figlet_format("Music-CLI-PRO", font="slant")
+    console.print(Panel(ascii_banner, style="bold magenta", expand=False), justify="center")
+    console.print("[bold cyan]By Diego Gonzales Soto.[/bold cyan]\n", justify="center")
 
-@click.group(
-    help="CLI profesional para descargar, convertir y gestionar música.",
-    no_args_is_help=True
-)
-@click.version_option(version='3.0.0', prog_name='Music-CLI-PRO')
-def cli():
-    """Punto de entrada principal de la aplicación."""
     # Impresión de la tabla de comandos estilizada
     table = Table(title="Comandos Disponibles", show_header=True, header_style="bold magenta", box=box.ROUNDED)
     table.add_column("Comando", style="bold cyan")
     table.add_column("Descripción", style="dim")
-    
-    # Agrega los comandos y sus descripciones con iconos
-    commands = [
-        ("download", "📥 Descarga una o varias URLs de música."),
-        ("search", "🔍 Busca música en las fuentes disponibles."),
-        ("interactive", "🤖 Inicia un modo interactivo de descarga."),
-        ("convert", "🎶 Convierte un archivo de audio/video a MP3."),
-        ("organize", "📁 Renombra y organiza archivos de música en un directorio."),
-    ]
-
-    for name, help_text in commands:
+    for name, (_, help_text) in COMMANDS.items():
         table.add_row(name, help_text)
 
-    # Imprime el banner y la tabla de comandos
     console.print("\n", justify="center")
     console.print("[bold yellow]Music-CLI-PRO[/bold yellow]", justify="center")
     console.print("[dim]Herramienta de descarga y gestión de música[/dim]", justify="center")
@@ -48,13 +83,47 @@ def cli():
     console.print(table, justify="center")
     console.print("\n[bold]Para más detalles, usa:[/bold] [italic]python src/cli.py <comando> --help[/italic]", style="dim")
 
+# --- Configuración de la CLI usando `click` ---
+
+@click.group(
+    cls=LazyGroup,
+    lazy_commands=COMMANDS,
+    help="CLI profesional para descargar, convertir y gestionar música.",
+    no_args_is_help=True,
+    invoke_without_command=True
+)
+@click.version_option(version='3.0.0', prog_name='Music-CLI-PRO')
+@click.option('--banner', is_flag=True, envvar='MUSIC_CLI_BANNER', help='Muestra el banner y la tabla de comandos (solo en terminal).')
+@click.option('--metrics-out', type=click.Path(dir_okay=False, writable=True), envvar='MUSIC_CLI_METRICS_OUT', help="Al terminar, escribe los tiempos por etapa (JSON Lines, o Prometheus si termina en '.prom').")
+@click.option('--profile', is_flag=True, help='Perfila la ejecución por muestreo y muestra las funciones más frecuentes.')
+@click.option('--profile-out', type=click.Path(dir_okay=False, writable=True), default='music-cli-profile.folded', show_default=True, help='Archivo de pilas plegadas de --profile (flamegraph.pl, speedscope).')
+@click.pass_context
+def cli(ctx: click.Context, banner: bool, metrics_out: str, profile: bool, profile_out: str):
+    """Punto de entrada principal de la aplicación."""
+    # El banner es opcional y nunca se imprime en tuberías ni scripts
+    if banner and sys.stdout.isatty():
+        print_banner()
+    # Los módulos de instrumentación solo se importan si se piden
+    if metrics_out:
+        from core import metrics
+        ctx.call_on_close(lambda: metrics.export(metrics_out))
+    if profile:
+        from core.profiler import SamplingProfiler
+        profiler = SamplingProfiler().start()
+        ctx.call_on_close(lambda: finish_profile(profiler, profile_out))
+
+
+def finish_profile(profiler, path: str, limit: int = 15):
+    """Detiene el perfilador, guarda las pilas y muestra las funciones más frecuentes en stderr."""
+    profiler.stop()
+    profiler.write_folded(path)
+    # Porcentajes sobre las pilas de todos los hilos: incluyen las esperas (red, colas, disco)
+    total = max(profiler.thread_samples, 1)
+    print(f"\nPerfil: {profiler.samples} muestras cada {profiler.interval * 1000:.0f} ms → {path}", file=sys.stderr)
+    print(f"{'propio':>8} {'acumulado':>10}  función", file=sys.stderr)
+    for label, own, cumulative in profiler.top(limit):
+        print(f"{own / total:>8.1%} {cumulative / total:>10.1%}  {label}", file=sys.stderr)
 
-# Registra los comandos desde los módulos
-cli.add_command(download_command.download)
-cli.add_command(search_command.search)
-cli.add_command(interactive_command.interactive)
-cli.add_command(convert_command.convert)
-cli.add_command(organize_command.organize)
 
 if __name__ == '__main__':
-    cli()
\ No newline at end of file
+    cli()
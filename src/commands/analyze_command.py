@@ -0,0 +1,155 @@
+# src/commands/analyze_command.py
+
+import click
+import functools
+import numpy as np
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from rich.console import Console
+from rich.table import Table
+from typing import List
+
+from converters import audio_converter
+from core import organizer
+from core.loudness import REPLAYGAIN_REFERENCE, integrated_loudness
+from core.progress import task
+from metadata import id3_tagger
+
+console = Console()
+
+# Extensiones de audio que se analizan (formatos con etiquetas ReplayGain)
+SUPPORTED_EXTENSIONS = ['.mp3', '.m4a', '.flac', '.ogg', '.opus', '.wav']
+
+def analyze_job(path: str, write: bool = True) -> dict:
+    """
+    Unidad de trabajo del pool: mide la sonoridad de un archivo y, con
+    `write`, escribe sus etiquetas de pista. Nunca lanza excepciones.
+    Retorna {'path', 'loudness', 'gain', 'peak', 'duration', 'blocks', 'elapsed', 'error'}.
+    """
+    result = {'path': path, 'loudness': None, 'gain': None, 'peak': 0.0, 'duration': 0.0, 'blocks': None,
+              'elapsed': 0.0, 'error': None}
+    started = time.perf_counter()
+    try:
+        measured = audio_converter.analyze_loudness(path)
+        result.update(loudness=measured.integrated, gain=measured.gain(), peak=measured.peak, duration=measured.duration)
+        if write:
+            id3_tagger.write_replaygain(path, measured.gain(), measured.peak)
+        else:
+            # En modo álbum el proceso principal necesita los bloques para la ganancia del álbum
+            result['blocks'] = measured.blocks
+    except Exception as e:
+        result['error'] = str(e)
+    result['elapsed'] = time.perf_counter() - started
+    return result
+
+def _album_blocks(members: List[dict]) -> np.ndarray:
+    """Bloques de 400 ms de todas las pistas de un álbum, para su sonoridad conjunta."""
+    blocks = [member['blocks'] for member in members if member['blocks'] is not None and len(member['blocks'])]
+    return np.concatenate(blocks) if blocks else np.zeros(0)
+
+def _collect(inputs: List[str], jobs: int) -> List[str]:
+    paths = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            paths.extend(item.path for item in organizer.scan_tree(entry, SUPPORTED_EXTENSIONS, workers=jobs))
+        else:
+            paths.append(entry)
+    return sorted(set(paths))
+
+@click.command(name='analyze', help="🔊 Mide la sonoridad (EBU R128) y escribe etiquetas ReplayGain.")
+@click.argument('inputs', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--jobs', '-j', type=click.IntRange(1, 256), default=os.cpu_count() or 1, show_default=True, help='Procesos de análisis en paralelo.')
+@click.option('--album', is_flag=True, help='Calcula también la ganancia de álbum (un álbum por directorio).')
+@click.option('--force', is_flag=True, help='Vuelve a analizar aunque el archivo ya tenga etiquetas ReplayGain.')
+@click.option('--dry-run', is_flag=True, help='Mide y muestra los resultados sin escribir etiquetas.')
+def analyze(inputs: List[str], jobs: int, album: bool, force: bool, dry_run: bool):
+    """
+    Analiza una biblioteca existente: mide la sonoridad integrada y el pico
+    de cada archivo (decodificación en flujo, memoria acotada) en un pool de
+    procesos y escribe las etiquetas ReplayGain 2.0 (-18 LUFS). Los archivos
+    que ya tienen sus etiquetas se omiten; en modo álbum se vuelve a analizar
+    el directorio entero si alguno de sus archivos no las tiene.
+    Retorna los resultados (útil con `standalone_mode=False`).
+    """
+    with console.status("Buscando archivos..."):
+        paths = _collect(inputs, jobs)
+    if not paths:
+        console.log("[bold yellow]No se encontraron archivos de audio para analizar.[/bold yellow]")
+        return []
+
+    jobs = min(jobs, len(paths))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        if force:
+            pending = paths
+        else:
+            with console.status("Comprobando etiquetas ReplayGain..."):
+                current = list(pool.map(functools.partial(id3_tagger.has_replaygain, album=album), paths, chunksize=64))
+            if album:
+                stale = {os.path.dirname(path) for path, ok in zip(paths, current) if not ok}
+                pending = [path for path in paths if os.path.dirname(path) in stale]
+            else:
+                pending = [path for path, ok in zip(paths, current) if not ok]
+        console.log(f"{len(paths)} archivos: [green]{len(pending)} por analizar[/green], {len(paths) - len(pending)} con etiquetas al día.")
+
+        results = []
+        started = time.perf_counter()
+        if pending:
+            write = not album and not dry_run
+            with task("Midiendo sonoridad", total=len(pending)) as (progress, task_id):
+                futures = [pool.submit(analyze_job, path, write) for path in pending]
+                for future in as_completed(futures):
+                    result = future.result()
+                    results.append(result)
+                    if result['error']:
+                        progress.console.print(f"  [red]✘[/red] {os.path.basename(result['path'])}: {result['error']}")
+                    progress.advance(task_id)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+
+    analyzed = [r for r in results if not r['error']]
+    albums = {}
+    if album:
+        groups = defaultdict(list)
+        for result in analyzed:
+            groups[os.path.dirname(result['path'])].append(result)
+        for directory, members in groups.items():
+            loudness = integrated_loudness(_album_blocks(members))
+            peak = max(member['peak'] for member in members)
+            albums[directory] = (loudness, peak)
+            if dry_run or loudness is None:
+                continue
+            for member in members:
+                try:
+                    id3_tagger.write_replaygain(member['path'], member['gain'], member['peak'], REPLAYGAIN_REFERENCE - loudness, peak)
+                except Exception as e:
+                    member['error'] = str(e)
+                    console.log(f"  [red]✘[/red] {os.path.basename(member['path'])}: {e}")
+
+    if analyzed:
+        table = Table(title="Sonoridad", show_header=True, header_style="bold blue")
+        table.add_column("Archivo", style="cyan")
+        table.add_column("LUFS", justify="right")
+        table.add_column("Ganancia", justify="right")
+        table.add_column("Pico", justify="right")
+        for result in sorted(analyzed, key=lambda r: r['path'])[:50]:
+            table.add_row(
+                os.path.basename(result['path']),
+                f"{result['loudness']:.1f}" if result['loudness'] is not None else "silencio",
+                f"{result['gain']:+.2f} dB" if result['gain'] is not None else "—",
+                f"{result['peak']:.3f}",
+            )
+        console.print(table)
+        if len(analyzed) > 50:
+            console.print(f"[dim]... y {len(analyzed) - 50} archivos más.[/dim]")
+    for directory, (loudness, peak) in sorted(albums.items()):
+        label = f"{loudness:.1f} LUFS, ganancia {REPLAYGAIN_REFERENCE - loudness:+.2f} dB" if loudness is not None else "silencio"
+        console.log(f"[bold]Álbum[/bold] {os.path.basename(directory) or directory}: {label}, pico {peak:.3f}")
+
+    audio_seconds = sum(r['duration'] for r in analyzed)
+    errors = sum(1 for r in results if r['error'])
+    console.log(
+        f"{len(analyzed)} archivos analizados en {elapsed:.1f} s ({audio_seconds / elapsed:.0f} s de audio/s), {errors} errores."
+        + (" [dim]Simulación: no se escribieron etiquetas.[/dim]" if dry_run else "")
+    )
+    return results
@@ -0,0 +1,59 @@
+# src/commands/cache_command.py
+
+import click
+from rich.console import Console
+from rich.table import Table
+
+from core.cache import get_resolution_cache
+
+console = Console()
+
+@click.group(name='cache', help="🗃️ Administra la caché de resoluciones Spotify → YouTube.")
+def cache():
+    """Comandos para inspeccionar y mantener la caché de resoluciones."""
+    pass
+
+@cache.command(name='stats', help="Muestra el tamaño de la caché y sus aciertos/fallos.")
+def stats():
+    data = get_resolution_cache().stats()
+    table = Table(title="Caché de resoluciones", show_header=False)
+    table.add_column("Métrica", style="bold cyan")
+    table.add_column("Valor")
+    table.add_row("Entradas", f"{data['entries']} / {data['max_entries']}")
+    table.add_row("Fijadas", str(data['pinned']))
+    table.add_row("Aciertos", str(data['hits']))
+    table.add_row("Fallos", str(data['misses']))
+    table.add_row("Tasa de aciertos", f"{data['hit_ratio']:.1%}")
+    table.add_row("Desalojos (LRU)", str(data['evictions']))
+    table.add_row("TTL", f"{data['ttl'] / 86400:.1f} días")
+    console.print(table)
+
+@cache.command(name='pin', help="Fija una entrada para que no caduque ni se desaloje.")
+@click.argument('key')
+def pin(key: str):
+    if get_resolution_cache().pin(key):
+        console.log(f"[bold green]📌 Entrada fijada:[/bold green] {key}")
+    else:
+        console.log(f"[bold red]❌ No existe la entrada:[/bold red] {key}")
+
+@cache.command(name='unpin', help="Libera una entrada fijada.")
+@click.argument('key')
+def unpin(key: str):
+    if get_resolution_cache().pin(key, pinned=False):
+        console.log(f"[bold green]Entrada liberada:[/bold green] {key}")
+    else:
+        console.log(f"[bold red]❌ No existe la entrada:[/bold red] {key}")
+
+@cache.command(name='invalidate', help="Elimina una entrada (p. ej. 'spotify:<id>').")
+@click.argument('key')
+def invalidate(key: str):
+    if get_resolution_cache().invalidate(key):
+        console.log(f"[bold green]🗑️ Entrada eliminada:[/bold green] {key}")
+    else:
+        console.log(f"[bold red]❌ No existe la entrada:[/bold red] {key}")
+
+@cache.command(name='clear', help="Vacía la caché (las entradas fijadas se conservan salvo con --all).")
+@click.option('--all', 'include_pinned', is_flag=True, help='Elimina también las entradas fijadas.')
+def clear(include_pinned: bool):
+    removed = get_resolution_cache().clear(include_pinned=include_pinned)
+    console.log(f"[bold green]Caché vaciada:[/bold green] {removed} entradas eliminadas.")
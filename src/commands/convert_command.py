@@ -1,27 +1,147 @@
 # src/commands/convert_command.py
 
 import click
+import glob
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from rich.console import Console
+from rich.table import Table
 from pathlib import Path
+from typing import List, Tuple
 
 from converters import audio_converter
+from core import metrics
 
 
 console = Console()
 
-@click.command(name='convert', help="🎶 Convierte un archivo de audio/video a MP3.")
-@click.argument('input_file', type=click.Path(exists=True, dir_okay=False))
+def expand_inputs(inputs: List[str], output: str) -> List[Tuple[str, str, str]]:
+    """
+    Expande las entradas del comando en ternas (archivo, directorio de
+    salida, nombre de salida sin extensión). Acepta archivos, directorios
+    (recursivos; se replica su estructura en la salida), patrones glob y
+    listas de archivos con el prefijo '@' (una ruta por línea).
+    Dos entradas que producirían la misma salida ('a.wav' y 'a.flac' en el
+    mismo directorio) se distinguen con un sufijo " (2)", " (3)"...
+    """
+    jobs = []
+    seen = set()
+    claimed = set()
+
+    def add(file_path: str, output_dir: str):
+        key = os.path.abspath(file_path)
+        if key in seen:
+            return
+        seen.add(key)
+        stem = candidate = Path(file_path).stem
+        directory = os.path.abspath(output_dir)
+        n = 1
+        while (directory, candidate) in claimed:
+            n += 1
+            candidate = f"{stem} ({n})"
+        if candidate != stem:
+            console.log(f"[bold yellow]⚠️ Salida repetida, se renombra:[/bold yellow] {file_path} → {candidate}")
+        claimed.add((directory, candidate))
+        jobs.append((file_path, output_dir, candidate))
+
+    for entry in inputs:
+        if entry.startswith('@'):
+            with open(entry[1:], encoding='utf-8') as f:
+                paths = [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        elif glob.has_magic(entry):
+            paths = sorted(glob.glob(entry, recursive=True))
+        else:
+            paths = [entry]
+
+        for path in paths:
+            if os.path.isdir(path):
+                root = Path(path)
+                for file_path in sorted(root.rglob('*')):
+                    if file_path.is_file() and file_path.suffix.lower() in audio_converter.SUPPORTED_INPUT_EXTENSIONS:
+                        add(str(file_path), str(Path(output) / file_path.parent.relative_to(root)))
+            elif os.path.isfile(path):
+                add(path, output)
+            else:
+                console.log(f"[bold yellow]⚠️ Entrada omitida (no existe):[/bold yellow] {path}")
+    return jobs
+
+def _input_size(path: str) -> int:
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+@click.command(name='convert', help="🎶 Convierte archivos de audio/video a MP3 (archivos, directorios, globs o @lista).")
+@click.argument('inputs', nargs=-1, required=True)
 @click.option('--output', '-o', type=click.Path(file_okay=False, writable=True), default='./downloads', help='Directorio de salida para el archivo convertido.')
-def convert(input_file: str, output: str):
+@click.option('--jobs', '-j', type=click.IntRange(1, 256), default=os.cpu_count() or 1, show_default=True, help='Procesos de conversión en paralelo.')
+@click.option('--force', is_flag=True, help='Convierte aunque la salida sea más reciente que la entrada.')
+@click.option('--format', 'target', type=click.Choice(['mp3', 'auto']), default='mp3', show_default=True, help="'mp3' recodifica salvo que ya sea MP3; 'auto' conserva el códec original en su contenedor natural.")
+@click.option('--buffer-size', type=click.IntRange(4, 65536), default=audio_converter.DEFAULT_BUFFER_SIZE // 1024, show_default=True, help='Tamaño del búfer de conversión en flujo (KiB).')
+@click.option('--replaygain', is_flag=True, help='Mide la sonoridad (EBU R128) durante la conversión y escribe etiquetas ReplayGain.')
+def convert(inputs: List[str], output: str, jobs: int, force: bool, target: str, buffer_size: int, replaygain: bool):
     """
-    Comando para convertir un archivo a MP3.
-    Acepta una ruta de archivo de entrada y un directorio de salida.
+    Comando para convertir archivos a MP3.
+    Acepta archivos, directorios, patrones glob y listas de archivos, y
+    reparte el trabajo en un pool de procesos. Cada archivo se analiza antes
+    para solo renombrarlo o remultiplexarlo cuando no hace falta recodificar.
+    Con `--replaygain`, la sonoridad se mide en la misma pasada de FFmpeg
+    que recodifica (los archivos solo renombrados o remultiplexados se
+    decodifican aparte).
+    Retorna el resultado de cada archivo (útil con `standalone_mode=False`).
     """
     output_path = Path(output)
     output_path.mkdir(parents=True, exist_ok=True)
     console.log(f"El directorio de salida para la conversión es: [bold green]{output_path.resolve()}[/bold green]")
-    
-    audio_converter.convert_to_mp3(input_file, str(output_path))
-    
+
+    work = expand_inputs(inputs, str(output_path))
+    if not work:
+        console.log("[bold yellow]No se encontraron archivos para convertir.[/bold yellow]")
+        return
+
+    jobs = min(jobs, len(work))
+    console.log(f"[bold]Convirtiendo {len(work)} archivos con {jobs} procesos...[/bold]")
+    results = []
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(audio_converter.convert_job, input_file, output_dir, force, buffer_size * 1024, target, replaygain, stem)
+                   for input_file, output_dir, stem in work]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            # Cada archivo se convierte en otro proceso: su span se registra aquí
+            if result['status'] != 'skipped':
+                metrics.record('convert', result['elapsed'], bytes=_input_size(result['input']), ok=result['status'] == 'ok',
+                               item=result['input'], action=result['action'])
+            name = os.path.basename(result['input'])
+            if result['status'] == 'ok':
+                speed = result['duration'] / result['elapsed'] if result['elapsed'] else 0.0
+                label = audio_converter.ACTION_LABELS[result['action']]
+                loudness = f", {result['loudness']:.1f} LUFS" if result['loudness'] is not None else ""
+                console.log(f"  [green]✔[/green] {name} → {label} [dim]({result['codec'] or '?'}, {result['elapsed']:.2f} s, {speed:.1f}x tiempo real{loudness})[/dim]")
+            elif result['status'] == 'skipped':
+                console.log(f"  [dim]↷ {name} (salida al día)[/dim]")
+            else:
+                console.log(f"  [red]✘[/red] {name}: {result['error']}")
+    elapsed = max(time.perf_counter() - started, 1e-9)
+
+    converted = [r for r in results if r['status'] == 'ok']
+    summary = Table(title="Resumen de la conversión", show_header=False)
+    summary.add_column("Métrica", style="bold cyan")
+    summary.add_column("Valor")
+    summary.add_row("Convertidos", str(len(converted)))
+    for action, label in audio_converter.ACTION_LABELS.items():
+        summary.add_row(f"  {label}", str(sum(1 for r in converted if r['action'] == action)))
+    summary.add_row("Omitidos (al día)", str(sum(1 for r in results if r['status'] == 'skipped')))
+    summary.add_row("Errores", str(sum(1 for r in results if r['status'] == 'error')))
+    summary.add_row("Tiempo total", f"{elapsed:.1f} s")
+    summary.add_row("Archivos/s", f"{len(converted) / elapsed:.2f}")
+    summary.add_row("Segundos de audio/s", f"{sum(r['duration'] for r in converted) / elapsed:.1f}")
+    summary.add_row("Búfer máximo en tránsito", f"{max((r['peak_buffered'] for r in results), default=0) / 1024:.0f} KiB")
+    summary.add_row("Memoria pico de FFmpeg", f"{max((r['peak_rss'] for r in results), default=0) / 1_048_576:.1f} MiB")
+    console.print(summary)
+
     console.print("-" * 40)
     console.print("[bold cyan]✨ Proceso de conversión finalizado. ✨[/bold cyan]")
+    return results
@@ -0,0 +1,128 @@
+# src/commands/dedupe_command.py
+
+import click
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from rich.console import Console
+from rich.table import Table
+
+from core import fingerprint, organizer
+from core.progress import task
+
+console = Console()
+
+# Extensiones de audio que se analizan
+SUPPORTED_EXTENSIONS = ['.mp3', '.m4a', '.wav', '.flac', '.ogg', '.opus', '.webm', '.aac']
+
+def _format_size(size: int) -> str:
+    return f"{size / 1_048_576:.1f} MiB"
+
+def _print_clusters(clusters, root: str):
+    for number, members in enumerate(clusters, start=1):
+        keep = members[0]
+        table = Table(title=f"Grupo {number}", show_header=True, header_style="bold blue")
+        table.add_column("Acción")
+        table.add_column("Archivo", style="cyan")
+        table.add_column("Códec")
+        table.add_column("Bitrate", justify="right")
+        table.add_column("Duración", justify="right")
+        table.add_column("Tamaño", justify="right")
+        table.add_column("Similitud", justify="right")
+        for member in members:
+            action = "[bold green]CONSERVAR[/bold green]" if member is keep else "[bold red]ELIMINAR[/bold red]"
+            table.add_row(
+                action,
+                os.path.relpath(member.path, root),
+                member.codec or "?",
+                f"{member.bit_rate // 1000} kbps" if member.bit_rate else "?",
+                f"{member.duration:.0f} s" if member.duration else "?",
+                _format_size(member.size),
+                "—" if member is keep else f"{keep.similarity(member):.3f}",
+            )
+        console.print(table)
+        console.print(f"  [dim]Se conserva por: {fingerprint.recommendation_reason(keep, members[1])}[/dim]")
+
+@click.command(name='dedupe', help="🧬 Detecta canciones duplicadas por su huella acústica.")
+@click.argument('folder_path', type=click.Path(exists=True, file_okay=False))
+@click.option('--jobs', '-j', type=click.IntRange(1, 256), default=os.cpu_count() or 1, show_default=True, help='Procesos para calcular huellas en paralelo.')
+@click.option('--threshold', type=click.FloatRange(0.0, 1.0), default=0.92, show_default=True, help='Similitud mínima (coseno) para considerar dos archivos duplicados.')
+@click.option('--duration-tolerance', type=click.FloatRange(0.0), default=5.0, show_default=True, help='Diferencia máxima de duración entre duplicados (segundos).')
+@click.option('--window', type=click.FloatRange(10.0, 600.0), default=fingerprint.WINDOW_SECONDS, show_default=True, help='Segundos de audio decodificados por archivo.')
+@click.option('--full', is_flag=True, help='Ignora el índice y vuelve a calcular todas las huellas.')
+@click.option('--delete', is_flag=True, help='Elimina los archivos marcados como ELIMINAR (pide confirmación).')
+@click.option('--yes', '-y', is_flag=True, help='No pide confirmación al eliminar.')
+def dedupe(folder_path: str, jobs: int, threshold: float, duration_tolerance: float, window: float, full: bool, delete: bool, yes: bool):
+    """
+    Busca casi-duplicados en una biblioteca comparando huellas espectrales
+    en lugar de nombres. Las huellas se guardan en un índice persistente y
+    solo se recalculan para archivos nuevos o modificados; los candidatos se
+    obtienen de cubetas LSH, sin comparar todos los pares.
+    """
+    console.print(f"[bold]Buscando duplicados en:[/bold] [cyan]{folder_path}[/cyan]")
+
+    with console.status("Recorriendo directorios..."):
+        entries = organizer.scan_tree(folder_path, SUPPORTED_EXTENSIONS)
+    if not entries:
+        console.log("[bold yellow]No se encontraron archivos de música para analizar.[/bold yellow]")
+        return
+
+    index = fingerprint.FingerprintIndex(folder_path)
+    pruned = index.prune(entry.path for entry in entries)
+    pending = [entry.path for entry in entries if full or not index.is_current(entry)]
+    console.log(
+        f"{len(entries)} archivos: [green]{len(pending)} por analizar[/green], "
+        f"{len(entries) - len(pending)} con huella al día, {pruned} eliminados del índice."
+    )
+
+    errors = 0
+    if pending:
+        started = time.perf_counter()
+        results = []
+        with task("Calculando huellas", total=len(pending)) as (progress, task_id), \
+                ProcessPoolExecutor(max_workers=min(jobs, len(pending))) as pool:
+            futures = [pool.submit(fingerprint.fingerprint_file, path, window) for path in pending]
+            for future in as_completed(futures):
+                result = future.result()
+                if result['error']:
+                    errors += 1
+                    console.log(f"  [red]✘[/red] {os.path.basename(result['path'])}: {result['error']}")
+                else:
+                    results.append(result)
+                progress.advance(task_id)
+        index.store(results)
+        elapsed = max(time.perf_counter() - started, 1e-9)
+        console.log(f"Huellas calculadas: {len(results)} en {elapsed:.1f} s ({len(results) / elapsed:.1f} archivos/s), {errors} errores.")
+
+    with console.status("Buscando duplicados..."):
+        clusters = fingerprint.find_duplicates(index, threshold=threshold, duration_tolerance=duration_tolerance)
+    index.close()
+
+    if not clusters:
+        console.print("[bold green]✨ No se encontraron duplicados. ✨[/bold green]")
+        return
+
+    _print_clusters(clusters, folder_path)
+    redundant = [member for members in clusters for member in members[1:]]
+    reclaimable = sum(member.size for member in redundant)
+    console.print(
+        f"[bold]{len(clusters)} grupos de duplicados:[/bold] {len(redundant)} archivos sobrantes, "
+        f"[bold green]{_format_size(reclaimable)}[/bold green] recuperables."
+    )
+
+    if not delete:
+        console.print("[dim]Usa --delete para eliminar los archivos marcados.[/dim]")
+        return
+    if not yes and not click.confirm(f"¿Eliminar {len(redundant)} archivos?", default=False):
+        console.print("[bold cyan]No se eliminó ningún archivo.[/bold cyan]")
+        return
+
+    removed = 0
+    for member in redundant:
+        try:
+            os.remove(member.path)
+            removed += 1
+        except OSError as e:
+            console.log(f"[bold red]❌ Error al eliminar[/bold red] '{member.path}': {e}")
+    # El índice se depura en la próxima ejecución (los archivos ya no aparecen al recorrer)
+    console.log(f"[bold green]✅ {removed} archivos eliminados.[/bold green]")
@@ -1,14 +1,18 @@
 import click
 import os
-import sys
+from rich import box
 from rich.console import Console
-from rich.status import Status
+from rich.table import Table
 from pathlib import Path
-from typing import List
+from typing import Iterable, List, Optional, Tuple
 
-from metadata import id3_tagger
-from sources.soundcloud import SoundCloudSource
-from sources.youtube import YouTubeSource
+from core import connections, metrics, pipeline, progress, ratelimit
+from core.layout import PathLayout
+from core.manifest import DownloadManifest
+from core.streams import SelectionPolicy, parse_policy
+from metadata import id3_tagger, postprocess
+from sources.base_source import DownloadError
+from sources.registry import ProviderRegistry, get_registry
 #from ..sources.youtube import YouTubeSource
 #from ..sources.soundcloud import SoundCloudSource
 #from ..metadata import id3_tagger
@@ -16,68 +20,193 @@ from sources.youtube import YouTubeSource
 console = Console()
 
 
-def get_providers():
-    """Retorna una lista de todos los proveedores de descarga disponibles."""
-    return [YouTubeSource(), SoundCloudSource()]
-
-def rename_and_organize(file_path: str, title: str, artist: str, output_dir: str) -> str:
+def get_providers(segments: int = 1, transcode: bool = False, policy: Optional[SelectionPolicy] = None) -> ProviderRegistry:
     """
-    Renombra y organiza un archivo en un formato consistente.
-    Formato: "Artista - Título.mp3"
+    Retorna el registro de proveedores del proceso con estas opciones de
+    descarga. Los proveedores se crean al llegar la primera URL suya.
     """
-    file_extension = Path(file_path).suffix
-    valid_title = "".join(c for c in title if c.isalnum() or c.isspace()).strip()
-    valid_artist = "".join(c for c in artist if c.isalnum() or c.isspace()).strip()
-    new_name = f"{valid_artist} - {valid_title}{file_extension}"
-    new_path = Path(output_dir) / new_name
+    providers = get_registry()
+    providers.configure(segments=segments, transcode=transcode, policy=policy)
+    return providers
+
+def selection_policy(quality: str, codecs: List[str]) -> SelectionPolicy:
+    """Valida `--quality` y `--codec` y retorna la política de selección de streams."""
+    try:
+        return parse_policy(quality, codecs)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'--quality' / '--codec'")
 
+def path_layout(template: Optional[str], shard: int) -> Optional[PathLayout]:
+    """Valida `--layout` y `--shard`; None mantiene la salida plana "Artista - Título"."""
+    if not template:
+        if shard:
+            raise click.BadParameter("requiere --layout", param_hint="'--shard'")
+        return None
     try:
-        os.rename(file_path, new_path)
-        console.log(f"  [bold green]✅ Archivo renombrado a:[/bold green] {new_name}")
-        return str(new_path)
-    except Exception as e:
-        console.log(f"[bold red]❌ Error al renombrar el archivo:[/bold red] {e}")
-        return file_path
+        return PathLayout(template, shard)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'--layout'")
+
+def run_downloads(urls: Iterable[str], output_path: Path, providers: ProviderRegistry, manifest: DownloadManifest,
+                  jobs: int = 4, layout: Optional[PathLayout] = None,
+                  tracker: Optional[progress.Tracker] = None) -> Tuple[pipeline.PipelineStats, List[str]]:
+    """
+    Procesa `urls` con el pipeline descarga → posproceso usando el
+    registro de proveedores, cuyas instancias se crean una vez, de modo que
+    un proceso de larga duración (`serve`) las reutiliza entre lotes. Los
+    archivos se ubican en `output_path` según `layout`. Con `tracker`, el
+    progreso se le notifica (en lugar de a la barra compartida) y el lote
+    se detiene tras la pista en curso si se cancela. Retorna las
+    estadísticas y los IDs omitidos por figurar ya en el manifiesto.
+    """
+    skipped = []
+
+    def already_downloaded(source_id: str) -> bool:
+        if source_id in manifest:
+            skipped.append(source_id)
+            return True
+        return False
+
+    def fetch(item: dict):
+        provider = providers.for_url(item['url'])
+        if provider is None:
+            console.log(f"[bold red]❌ URL no soportada:[/bold red] {item['url']}")
+            raise DownloadError("URL no soportada")
+        console.log(f"[bold green]Fuente identificada:[/bold green] {provider.get_source_name()} → {item['url']}")
+        with progress.track(tracker):
+            for entry in provider.iter_download(item['url'], str(output_path), skip=already_downloaded):
+                yield {'url': item['url'], **entry}
+                if tracker is not None and tracker.cancelled:
+                    return
+
+    def post_process(item: dict):
+        # Etiquetado y renombrado en una sola pasada sobre el archivo, con los
+        # metadatos que trae la fuente (Spotify) o, si no, los del nombre
+        item.update(id3_tagger.get_metadata_from_source(item['path'], item))
+        item['path'] = postprocess.process_file(item['path'], item, str(output_path), layout)['path']
+        if item.get('source_id'):
+            manifest.record(item['source_id'], item['path'])
+        if tracker is not None:
+            tracker.add_file(item['path'])
+        yield item
+
+    engine = pipeline.Pipeline([
+        pipeline.Stage('descarga', fetch, workers=jobs),
+        pipeline.Stage('posproceso', post_process, workers=jobs),
+    ])
+    return engine.run({'url': url} for url in urls), skipped
+
+def _print_summary(stats, skipped: int = 0):
+    """Imprime el resumen agregado de rendimiento y fallos del lote."""
+    total_bytes = 0
+    for item in stats.completed:
+        try:
+            total_bytes += os.path.getsize(item['path'])
+        except OSError:
+            pass
+
+    summary = Table(title="Resumen de la descarga", show_header=False, box=box.ROUNDED)
+    summary.add_column("Métrica", style="bold cyan")
+    summary.add_column("Valor")
+    summary.add_row("URLs procesadas", str(stats.inputs))
+    summary.add_row("Archivos completados", str(len(stats.completed)))
+    summary.add_row("Omitidos (ya descargados)", str(skipped))
+    summary.add_row("Fallos", str(len(stats.failures)))
+    summary.add_row("Tiempo total", f"{stats.elapsed:.1f} s")
+    summary.add_row("Rendimiento", f"{len(stats.completed) / stats.elapsed * 60:.1f} pistas/min")
+    summary.add_row("Ancho de banda", f"{total_bytes / stats.elapsed / 1_000_000:.2f} MB/s")
+    for source, counters in ratelimit.all_stats().items():
+        if counters['calls']:
+            summary.add_row(
+                f"Límite {source}",
+                f"{counters['calls']} peticiones, {counters['throttled']} limitadas, {counters['retries']} reintentos, "
+                f"{counters['waited'] + counters['backoff']:.1f} s de espera",
+            )
+    http = connections.get_pool().stats
+    if http.requests:
+        summary.add_row(
+            f"Conexiones HTTP ({http.backend})",
+            f"{http.requests} peticiones, {http.connections} conexiones nuevas, "
+            f"{http.reuse_ratio:.0%} reutilizadas, handshake medio {http.mean_handshake * 1000:.0f} ms",
+        )
+    console.print(summary)
+
+    stages = metrics.summarize(metrics.spans(since=stats.started_at))
+    if stages:
+        # Tiempo sumado entre hilos: compara qué etapa domina (red, CPU o disco)
+        timing = Table(title="Tiempo por etapa", show_header=True, header_style="bold blue", box=box.ROUNDED)
+        timing.add_column("Etapa", style="bold cyan")
+        timing.add_column("Operaciones", justify="right")
+        timing.add_column("Tiempo acumulado", justify="right")
+        timing.add_column("p50", justify="right")
+        timing.add_column("p99", justify="right")
+        timing.add_column("Datos", justify="right")
+        timing.add_column("Velocidad", justify="right")
+        for stage, values in stages.items():
+            speed = values['bytes'] / values['total'] / 1_000_000 if values['bytes'] and values['total'] else None
+            timing.add_row(
+                stage,
+                f"{values['count']}" + (f" ({values['errors']} con error)" if values['errors'] else ""),
+                f"{values['total']:.1f} s",
+                f"{values['p50'] * 1000:.0f} ms",
+                f"{values['p99'] * 1000:.0f} ms",
+                f"{values['bytes'] / 1_000_000:.1f} MB" if values['bytes'] else "—",
+                f"{speed:.2f} MB/s" if speed is not None else "—",
+            )
+        console.print(timing)
+
+    if stats.failures:
+        failures = Table(title="Fallos", show_header=True, header_style="bold red", box=box.ROUNDED)
+        failures.add_column("Etapa", style="dim")
+        failures.add_column("Elemento", style="cyan")
+        failures.add_column("Error")
+        for failure in stats.failures:
+            failures.add_row(failure.stage, failure.item.get('path') or failure.item.get('url', ''), str(failure.error))
+        console.print(failures)
 
 @click.command(name='download', help="📥 Descarga una o varias URLs de música.")
 @click.argument('urls', nargs=-1)
 @click.option('--output', '-o', type=click.Path(file_okay=False, writable=True), default='./downloads', help='Directorio de salida.')
-def download(urls: List[str], output: str):
+@click.option('--jobs', '-j', type=click.IntRange(1, 64), default=4, show_default=True, help='Número de trabajadores por etapa (descarga, posproceso).')
+@click.option('--segments', type=click.IntRange(1, 16), default=1, show_default=True, help='Segmentos paralelos (HTTP Range) para archivos grandes.')
+@click.option('--verify', is_flag=True, help='Revalida el manifiesto de descargas contra el sistema de archivos antes de empezar.')
+@click.option('--transcode', is_flag=True, help='Convierte a MP3 en flujo durante la descarga, sin archivo intermedio.')
+@click.option('--quality', default='best', show_default=True, help="Stream de audio a elegir: best, smallest o max-bitrate=N (kbps).")
+@click.option('--codec', 'codecs', multiple=True, help='Códec preferido (aac, opus, vorbis...); repetible, por orden de preferencia.')
+@click.option('--layout', 'template', help="Plantilla de ruta relativa, p. ej. '{artist}/{album}/{track:02} {title}' (por defecto, 'Artista - Título' en un solo directorio).")
+@click.option('--shard', type=click.IntRange(0, 8), default=0, show_default=True, help='Con --layout, antepone un directorio con N caracteres del hash del artista (2 = 256 directorios).')
+def download(urls: List[str], output: str, jobs: int, segments: int, verify: bool, transcode: bool, quality: str, codecs: List[str],
+             template: Optional[str], shard: int):
     """
     Descarga una o varias URLs. Acepta URLs de canciones o listas de reproducción.
+    Las URLs se procesan en un pipeline concurrente: descarga → posproceso (etiquetado y renombrado).
+    Las pistas registradas en el manifiesto del directorio de salida se omiten.
+    Retorna las estadísticas del pipeline (útil con `standalone_mode=False`).
     """
-    if not urls:
+    if not urls and not verify:
         console.log("[bold red]❌ Error:[/bold red] Debes proporcionar al menos una URL.")
         return
+    policy = selection_policy(quality, codecs)
+    layout = path_layout(template, shard)
 
     output_path = Path(output)
     output_path.mkdir(parents=True, exist_ok=True)
     console.log(f"El directorio de descarga es: [bold green]{output_path.resolve()}[/bold green]")
-    
-    providers = get_providers()
-
-    for url in urls:
-        console.print("-" * 40)
-        source_found = False
-        with console.status("Analizando URL...") as status:
-            for provider in providers:
-                if provider.is_valid_url(url):
-                    status.stop()
-                    console.log(f"[bold green]Fuente identificada:[/bold green] {provider.get_source_name()}")
-                    print("XXX: ", provider, url, output_path)
-                    files = provider.download(url, str(output_path))
-                    print("YYY: ", files)
-                    for file_path in files:
-                        metadata = id3_tagger.get_metadata_from_source(file_path)
-                        if metadata:
-                            id3_tagger.apply_tags(file_path, metadata['title'], metadata['artist'])
-                            rename_and_organize(file_path, metadata['title'], metadata['artist'], str(output_path))
-                        
-                    source_found = True
-                    break
-        
-        if not source_found:
-            console.log(f"[bold red]❌ URL no soportada:[/bold red] {url}")
-    
+
+    manifest = DownloadManifest.for_output_dir(str(output_path))
+    if verify:
+        with console.status("Verificando el manifiesto de descargas..."):
+            valid, removed = manifest.verify()
+        console.log(f"[bold green]Manifiesto verificado:[/bold green] {valid} entradas válidas, {removed} eliminadas.")
+        if not urls:
+            manifest.close()
+            return
+
+    providers = get_providers(segments=segments, transcode=transcode, policy=policy)
+    stats, skipped = run_downloads(urls, output_path, providers, manifest, jobs=jobs, layout=layout)
+    manifest.close()
+
     console.print("-" * 40)
+    _print_summary(stats, skipped=len(skipped))
     console.print("[bold cyan]✨ Proceso de descarga finalizado. ✨[/bold cyan]")
+    return stats
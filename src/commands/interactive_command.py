@@ -1,48 +1,345 @@
 # src/commands/interactive_command.py
 
 import click
-from rich.console import Console
-from rich.prompt import Prompt
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+from rich import box
+from rich.console import Console, Group
+from rich.live import Live
+from rich.panel import Panel
+from rich.prompt import Confirm, IntPrompt, Prompt
 from rich.table import Table
+from rich.text import Text
+
+from commands import download_command, search_command, serve_command
+from core import daemon as daemon_service
+from core.jobqueue import Job, JobQueue
+from core.progress import Tracker
 
 console = Console()
 
+# Líneas de salida de los trabajos en segundo plano que se conservan
+LOG_LINES = 200
+# Trabajos que muestra el panel
+PANEL_JOBS = 15
+
+_STATUS_LABELS = {
+    'queued': "[dim]en cola[/dim]",
+    'running': "[cyan]descargando[/cyan]",
+    'done': "[green]✔ terminado[/green]",
+    'failed': "[red]✘ fallido[/red]",
+    'cancelled': "[yellow]cancelado[/yellow]",
+}
+
+
+class _BackgroundOutput:
+    """
+    Sustituto de `sys.stdout` durante la sesión: lo que escribe el hilo
+    principal (menú, prompts, panel) llega a la terminal, y lo que escriben
+    los trabajos en segundo plano se guarda en un registro en memoria para
+    no mezclarse con lo que el usuario está tecleando.
+    """
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lines = deque(maxlen=LOG_LINES)
+        self._partial = ""
+        self._lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        if threading.current_thread() is threading.main_thread():
+            return self.stream.write(text)
+        with self._lock:
+            lines = (self._partial + text).split("\n")
+            self._partial = lines.pop()
+            self.lines.extend(Text.from_ansi(line).plain.rstrip() for line in lines if line.strip())
+        return len(text)
+
+    def tail(self, limit: int) -> List[str]:
+        with self._lock:
+            return list(self.lines)[-limit:]
+
+    def flush(self):
+        self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def _duration(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "—"
+    minutes, seconds = divmod(int(seconds), 60)
+    return f"{minutes}:{seconds:02d}"
+
+
+class Session:
+    """
+    Sesión interactiva: proveedores calientes (el registro del proceso), una
+    cola de trabajos en memoria atendida en segundo plano por el mismo
+    `Daemon` que usa `serve`, y un `Tracker` por trabajo para el panel.
+    """
+
+    def __init__(self, providers, workers: int, jobs: int, layout=None):
+        self.providers = providers
+        self.queue = JobQueue(":memory:", max_attempts=1)
+        self.trackers: Dict[int, Tracker] = {}
+        self.notices: "queue.Queue[str]" = queue.Queue()
+        self.runner = serve_command.make_runner(providers, jobs, layout, tracker_for=self._tracker_for)
+        self.service = daemon_service.Daemon(self.queue, self.runner, workers=workers, on_event=self._on_event)
+
+    def _tracker_for(self, job: Job) -> Tracker:
+        return self.trackers.setdefault(job.id, Tracker())
+
+    def _on_event(self, event: str, job: Job):
+        if event == "start":
+            return
+        tracker = self.trackers.get(job.id)
+        if tracker is not None:
+            tracker.finish()
+        result = job.result or {}
+        if event == "done":
+            state = "detenido" if result.get('cancelled') else "terminado"
+            self.notices.put(
+                f"[bold green]✔ Trabajo {job.id} {state}:[/bold green] {len(result.get('files', []))} archivos, "
+                f"{result.get('skipped', 0)} omitidos, {len(result.get('errors', []))} errores"
+            )
+        else:
+            self.notices.put(f"[bold red]✘ Trabajo {job.id} fallido:[/bold red] {job.error}")
+
+    def start(self):
+        self.service.start()
+        # Calienta las fuentes de búsqueda sin bloquear el menú
+        threading.Thread(target=self.providers.searchable, name="warmup", daemon=True).start()
+
+    def submit(self, urls: List[str], output: str, priority: int = 0) -> List[int]:
+        ids = [self.queue.submit(url, output, priority) for url in urls]
+        self.service.wake()
+        return ids
+
+    def cancel(self, job_id: int) -> str:
+        if self.queue.cancel(job_id):
+            return "cancelled"
+        job = self.queue.get(job_id)
+        tracker = self.trackers.get(job_id)
+        if job is not None and job.status == "running" and tracker is not None:
+            tracker.cancel()
+            return "stopping"
+        return "missing"
+
+    def pending(self) -> int:
+        counts = self.queue.counts()
+        return counts['queued'] + counts['running']
+
+    def render(self, log: Optional[_BackgroundOutput] = None, log_lines: int = 0):
+        """Panel con el estado, la velocidad y el tiempo (transcurrido y restante) de cada trabajo."""
+        table = Table(show_header=True, header_style="bold blue", box=box.SIMPLE)
+        table.add_column("ID", style="dim", justify="right")
+        table.add_column("Estado")
+        table.add_column("Prio.", justify="right")
+        table.add_column("Progreso", justify="right")
+        table.add_column("Velocidad", justify="right")
+        table.add_column("Tiempo", justify="right")
+        table.add_column("URL", style="cyan", overflow="ellipsis", no_wrap=True, max_width=60)
+        jobs = sorted(self.queue.list(limit=PANEL_JOBS), key=lambda job: (job.status != "running", job.status != "queued", -job.priority, job.id))
+        for job in jobs:
+            tracker = self.trackers.get(job.id)
+            status = _STATUS_LABELS[job.status]
+            if tracker is not None and tracker.cancelled and job.status == "running":
+                status = "[yellow]deteniendo[/yellow]"
+            elif job.status == "done" and (job.result or {}).get('cancelled'):
+                status = "[yellow]detenido[/yellow]"
+            if tracker is None:
+                table.add_row(str(job.id), status, str(job.priority), "", "", "", job.url)
+                continue
+            done = f"{tracker.completed}/{tracker.total}" if tracker.total else f"{tracker.files} archivos"
+            elapsed = _duration(tracker.elapsed)
+            if tracker.eta is not None:
+                elapsed += f" (quedan {_duration(tracker.eta)})"
+            table.add_row(
+                str(job.id), status, str(job.priority), done,
+                f"{tracker.speed / 1_000_000:.2f} MB/s" if tracker.bytes else "—",
+                elapsed, job.url,
+            )
+        counts = self.queue.counts()
+        title = f"Descargas: {counts['running']} en curso, {counts['queued']} en cola, {counts['done']} terminadas"
+        if counts['failed']:
+            title += f", {counts['failed']} fallidas"
+        parts = [table]
+        if log is not None and log_lines:
+            lines = log.tail(log_lines)
+            if lines:
+                parts.append(Text("\n".join(lines), style="dim", overflow="ellipsis", no_wrap=True))
+        return Panel(Group(*parts), title=title, border_style="blue")
+
+    def close(self, wait: bool):
+        """Detiene la cola. Sin `wait`, cancela lo pendiente y detiene lo que está en curso tras su pista actual."""
+        if not wait:
+            for job in self.queue.list(status="queued", limit=10_000):
+                self.queue.cancel(job.id)
+            for tracker in list(self.trackers.values()):
+                tracker.cancel()
+        self.service.stop()
+        self.runner.close()
+        self.queue.close()
+
+
+def _print_notices(session: Session):
+    while True:
+        try:
+            console.print(session.notices.get_nowait())
+        except queue.Empty:
+            return
+
+
+def _watch(session: Session, log: _BackgroundOutput, until_idle: bool = False):
+    """Panel en vivo hasta Ctrl+C (o hasta que no quede trabajo, con `until_idle`)."""
+    console.print("[dim]Ctrl+C vuelve al menú.[/dim]")
+    try:
+        # Se redibuja desde este hilo: la salida de los hilos de fondo va al registro
+        with Live(session.render(log, 8), console=console, auto_refresh=False, redirect_stdout=False, redirect_stderr=False) as live:
+            while not (until_idle and not session.pending()):
+                time.sleep(0.5)
+                live.update(session.render(log, 8), refresh=True)
+    except KeyboardInterrupt:
+        pass
+
+
+def _ask_job_id(session: Session) -> Optional[int]:
+    console.print(session.render())
+    job_id = IntPrompt.ask("ID del trabajo (0 para volver)", default=0)
+    return job_id or None
+
+
 @click.command(name='interactive', help="🤖 Inicia un modo interactivo de descarga.")
-def interactive():
+@click.option('--output', '-o', type=click.Path(file_okay=False, writable=True), default='./downloads', show_default=True, help='Directorio de salida por defecto.')
+@click.option('--workers', '-w', type=click.IntRange(1, 16), default=2, show_default=True, help='Descargas que se procesan a la vez en segundo plano.')
+@click.option('--jobs', '-j', type=click.IntRange(1, 64), default=4, show_default=True, help='Trabajadores por etapa dentro de cada descarga.')
+@click.option('--quality', default='best', show_default=True, help="Stream de audio a elegir: best, smallest o max-bitrate=N (kbps).")
+@click.option('--codec', 'codecs', multiple=True, help='Códec preferido (aac, opus, vorbis...); repetible, por orden de preferencia.')
+@click.option('--layout', 'template', help="Plantilla de ruta relativa, p. ej. '{artist}/{album}/{track:02} {title}'.")
+@click.option('--shard', type=click.IntRange(0, 8), default=0, show_default=True, help='Con --layout, antepone un directorio con N caracteres del hash del artista.')
+def interactive(output: str, workers: int, jobs: int, quality: str, codecs: List[str], template: Optional[str], shard: int):
     """
     Inicia un modo interactivo para guiar al usuario.
+    Las descargas se encolan y se procesan en segundo plano con proveedores
+    que se crean una sola vez, así que se puede seguir buscando y encolando
+    mientras tanto; `jobs` y `watch` muestran su progreso, y `cancel` y
+    `priority` gestionan la cola.
     """
-    console.print("[bold cyan]Bienvenido al modo interactivo de Music-CLI-PRO.[/bold cyan]")
-    console.print("Ingresa 'q' para salir en cualquier momento.")
-    
+    policy = download_command.selection_policy(quality, codecs)
+    layout = download_command.path_layout(template, shard)
+    providers = download_command.get_providers(policy=policy)
+    session = Session(providers, workers, jobs, layout)
+
+    log = _BackgroundOutput(sys.stdout)
+    sys.stdout = log
+    try:
+        session.start()
+        console.print("[bold cyan]Bienvenido al modo interactivo de Music-CLI-PRO.[/bold cyan]")
+        console.print("Ingresa 'q' para salir en cualquier momento.")
+        try:
+            _session_loop(session, log, output)
+        except (KeyboardInterrupt, EOFError):
+            console.print()
+
+        wait = False
+        if session.pending():
+            wait = Confirm.ask(f"Quedan {session.pending()} descargas pendientes. ¿Esperar a que terminen?", default=True)
+            if wait:
+                _watch(session, log, until_idle=True)
+        with console.status("Deteniendo las descargas en curso..."):
+            session.close(wait)
+        _print_notices(session)
+    finally:
+        sys.stdout = log.stream
+
+    console.print("[bold green]¡Hasta la próxima![/bold green]")
+
+
+def _session_loop(session: Session, log: _BackgroundOutput, output: str):
+    choices = ["download", "search", "jobs", "watch", "cancel", "priority", "convert", "quit"]
     while True:
-        mode = Prompt.ask("¿Qué deseas hacer?", choices=["download", "convert", "search", "quit"], default="download")
+        _print_notices(session)
+        if session.pending():
+            console.print(session.render())
+        mode = Prompt.ask("¿Qué deseas hacer?", choices=choices, default="download")
         if mode == 'quit':
-            break
+            return
 
         if mode == 'download':
-            url = Prompt.ask("Ingresa la URL de la canción o lista de reproducción")
-            if url == 'q': break
-            output_dir = Prompt.ask("Ingresa el directorio de salida", default="./downloads")
-            
-            # Llama al comando de descarga a través del contexto
-            from ..cli import cli
-            ctx = click.Context(cli)
-            ctx.invoke(cli.commands['download'], urls=[url], output=output_dir)
+            urls = Prompt.ask("Ingresa la URL de la canción o lista de reproducción (varias, separadas por espacios)")
+            if urls == 'q':
+                return
+            output_dir = Prompt.ask("Ingresa el directorio de salida", default=output)
+            valid = []
+            for url in urls.split():
+                if session.providers.candidates(url):
+                    valid.append(url)
+                else:
+                    console.print(f"[bold red]❌ URL no soportada:[/bold red] {url}")
+            if valid:
+                ids = session.submit(valid, os.path.abspath(output_dir))
+                console.print(f"[bold green]📨 Encolado:[/bold green] trabajo {', '.join(map(str, ids))}")
 
         elif mode == 'search':
             query = Prompt.ask("Ingresa el término de búsqueda")
-            if query == 'q': break
-            from ..cli import cli
-            ctx = click.Context(cli)
-            ctx.invoke(cli.commands['search'], query=query)
+            if query == 'q':
+                return
+            results = search_command.live_search(query, session.providers.searchable())
+            if not results:
+                console.print("[bold red]No se encontraron resultados.[/bold red]")
+                continue
+            choice = Prompt.ask("IDs de los resultados para descargar (separados por comas), o Enter para volver", default="")
+            chosen = []
+            for part in choice.replace(",", " ").split():
+                if part.isdigit() and int(part) < len(results):
+                    chosen.append(results[int(part)])
+                else:
+                    console.print(f"[bold red]ID inválido:[/bold red] {part}")
+            for result in chosen:
+                search_command.remember_choice(result)
+            if chosen:
+                ids = session.submit([result['url'] for result in chosen], os.path.abspath(output))
+                console.print(f"[bold green]📨 Encolado:[/bold green] trabajo {', '.join(map(str, ids))}")
+
+        elif mode == 'jobs':
+            console.print(session.render(log, 10))
+
+        elif mode == 'watch':
+            _watch(session, log)
+
+        elif mode == 'cancel':
+            job_id = _ask_job_id(session)
+            if job_id is None:
+                continue
+            outcome = session.cancel(job_id)
+            if outcome == "cancelled":
+                console.print(f"[bold yellow]Trabajo {job_id} cancelado.[/bold yellow]")
+            elif outcome == "stopping":
+                console.print(f"[bold yellow]El trabajo {job_id} se detendrá tras la pista en curso.[/bold yellow]")
+            else:
+                console.print(f"[bold red]El trabajo {job_id} ya no está pendiente.[/bold red]")
+
+        elif mode == 'priority':
+            job_id = _ask_job_id(session)
+            if job_id is None:
+                continue
+            priority = IntPrompt.ask("Nueva prioridad (mayor = antes)", default=10)
+            if session.queue.reprioritize(job_id, priority):
+                console.print(f"[bold green]Trabajo {job_id}: prioridad {priority}.[/bold green]")
+            else:
+                console.print(f"[bold red]El trabajo {job_id} ya no está en la cola.[/bold red]")
 
         elif mode == 'convert':
             file_path = Prompt.ask("Ingresa la ruta del archivo a convertir")
-            if file_path == 'q': break
-            output_dir = Prompt.ask("Ingresa el directorio de salida", default="./downloads")
-            from ..cli import cli
-            ctx = click.Context(cli)
-            ctx.invoke(cli.commands['convert'], input_file=file_path, output=output_dir)
-            
-    console.print("[bold green]¡Hasta la próxima![/bold green]")
\ No newline at end of file
+            if file_path == 'q':
+                return
+            output_dir = Prompt.ask("Ingresa el directorio de salida", default=output)
+            from commands.convert_command import convert
+            click.get_current_context().invoke(convert, inputs=[file_path], output=output_dir)
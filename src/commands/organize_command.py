@@ -1,71 +1,196 @@
 import click
 import os
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from rich.console import Console
-from rich.prompt import Prompt
+from rich.table import Table
+from typing import Dict, List, Optional
+
+from core import organizer
+from core.layout import PathLayout
+from metadata.postprocess import target_path
 
 console = Console()
 
-def rename_and_organize(file_path: str, title: str, artist: str, output_dir: str) -> str:
+# Extensiones de audio que se organizan
+SUPPORTED_EXTENSIONS = ['.mp3', '.m4a', '.wav', '.flac', '.ogg', '.opus']
+
+def target_from_filename(file_path: str) -> Optional[str]:
     """
-    Renombra y organiza un archivo en un formato consistente.
-    Formato: "Artista - Título.mp3"
+    Destino de un archivo a partir de su nombre "Artista - Título", dentro de
+    su mismo directorio. Retorna None si el nombre no tiene ese formato.
     """
-    if not os.path.exists(file_path):
-        console.log(f"[bold red]❌ Error: El archivo '{file_path}' no existe.[/bold red]")
-        return file_path
-    
-    file_extension = Path(file_path).suffix
-    valid_title = "".join(c for c in title if c.isalnum() or c.isspace()).strip()
-    valid_artist = "".join(c for c in artist if c.isalnum() or c.isspace()).strip()
-    
-    # Maneja el caso de que la información sea inválida
-    if not valid_title or not valid_artist:
-        console.log(f"[bold yellow]⚠️ Advertencia:[/bold yellow] No se pudo obtener metadatos válidos para renombrar.")
-        return file_path
-        
-    new_name = f"{valid_artist} - {valid_title}{file_extension}"
-    new_path = Path(output_dir) / new_name
+    # Aquí puedes implementar una lógica de búsqueda de metadatos más avanzada
+    parts = Path(file_path).stem.split(" - ")
+    if len(parts) < 2:
+        return None
+    target = target_path(file_path, parts[1].strip(), parts[0].strip(), os.path.dirname(file_path))
+    return str(target) if target else None
 
+def fields_from_file(file_path: str) -> dict:
+    """
+    Metadatos para la plantilla de ruta: las etiquetas del archivo y, si
+    faltan, el artista y el título de un nombre "Artista - Título".
+    """
+    import mutagen
+
+    fields = {}
     try:
-        os.rename(file_path, new_path)
-        console.log(f"  [bold green]✅ Archivo renombrado a:[/bold green] {new_name}")
-        return str(new_path)
-    except Exception as e:
-        console.log(f"[bold red]❌ Error al renombrar el archivo:[/bold red] {e}")
-        return file_path
+        audio = mutagen.File(file_path, easy=True)
+    except Exception:
+        audio = None
+    if audio is not None:
+        for key, tag in (('title', 'title'), ('artist', 'artist'), ('album', 'album'), ('track', 'tracknumber'), ('year', 'date')):
+            values = audio.get(tag)
+            if values:
+                fields[key] = values[0]
+    if not fields.get('title') or not fields.get('artist'):
+        parts = Path(file_path).stem.split(" - ")
+        if len(parts) >= 2:
+            fields.setdefault('artist', parts[0].strip())
+            fields.setdefault('title', parts[1].strip())
+    return fields
+
+def layout_targets(entries: List[organizer.FileEntry], root: str, layout: PathLayout,
+                   index: Optional[organizer.OrganizeIndex], workers: int) -> Dict[str, Optional[str]]:
+    """
+    Destinos según `layout` de los archivos que hay que planificar. Las
+    etiquetas se leen en paralelo: en una biblioteca grande es lo más lento del plan.
+    """
+    def target(path: str) -> Optional[str]:
+        fields = fields_from_file(path)
+        result = target_path(path, fields.get('title', ''), fields.get('artist', ''), root, layout,
+                             album=fields.get('album'), track=fields.get('track'), year=fields.get('year'))
+        return str(result) if result else None
+
+    paths = [entry.path for entry in entries if index is None or not index.is_unchanged(entry)]
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="tags") as pool:
+        return dict(zip(paths, pool.map(target, paths)))
+
+def _print_plan(plan: organizer.RenamePlan, root: str):
+    table = Table(title="Plan de organización", show_header=True, header_style="bold blue")
+    table.add_column("Origen", style="cyan")
+    table.add_column("Destino", style="green")
+    for source, target in plan.moves:
+        table.add_row(os.path.relpath(source, root), os.path.relpath(target, root))
+    console.print(table)
 
 @click.command(name='organize', help="📁 Renombra y organiza archivos de música en un directorio.")
 @click.argument('folder_path', type=click.Path(exists=True, file_okay=False))
-def organize(folder_path: str):
+@click.option('--dry-run', is_flag=True, help='Muestra el plan de renombrado sin aplicarlo.')
+@click.option('--full', is_flag=True, help='Ignora el índice y vuelve a analizar todos los archivos.')
+@click.option('--jobs', '-j', type=click.IntRange(1, 64), default=8, show_default=True, help='Hilos para recorrer los directorios.')
+@click.option('--layout', 'template', help="Plantilla de ruta relativa, p. ej. '{artist}/{album}/{track:02} {title}'; mueve toda la biblioteca a esa estructura.")
+@click.option('--shard', type=click.IntRange(0, 8), default=0, show_default=True, help='Con --layout, antepone un directorio con N caracteres del hash del artista (2 = 256 directorios).')
+@click.option('--rollback', is_flag=True, help='Deshace la última reorganización registrada en el diario.')
+def organize(folder_path: str, dry_run: bool, full: bool, jobs: int, template: Optional[str], shard: int, rollback: bool):
     """
-    Renombra los archivos en una carpeta para seguir el formato "Artista - Título.mp3".
+    Renombra los archivos de una carpeta (y sus subcarpetas) para seguir el
+    formato "Artista - Título.mp3" en su mismo directorio o, con `--layout`,
+    los mueve a la estructura de la plantilla (migración de una biblioteca
+    plana a una jerárquica). El plan completo se calcula antes de aplicarlo,
+    con detección de colisiones y ciclos, y un índice de mtime/tamaño evita
+    volver a procesar archivos que no cambiaron.
+
+    Los movimientos se registran antes en un diario: si la ejecución se
+    interrumpe, la siguiente la completa, y `--rollback` la deshace.
+    Retorna los movimientos aplicados (útil con `standalone_mode=False`).
     """
+    folder_path = os.path.normpath(folder_path)
+    try:
+        layout = PathLayout(template, shard) if template else None
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint="'--layout'")
+    if shard and layout is None:
+        raise click.BadParameter("requiere --layout", param_hint="'--shard'")
+
+    def report(source: str, target: str, error: Exception):
+        if isinstance(error, FileExistsError):
+            console.log(f"[bold yellow]⚠️ Destino ocupado, se omite:[/bold yellow] '{source}' → '{target}'")
+        else:
+            console.log(f"[bold red]❌ Error al renombrar[/bold red] '{source}' → '{target}': {error}")
+
+    journal = organizer.MoveJournal(folder_path)
+    if rollback or journal.state in ("applying", "rolling-back"):
+        interrupted = journal.state
+        if rollback and interrupted in ("applying", "applied", "rolling-back"):
+            with console.status("Deshaciendo la última reorganización..."):
+                undone = journal.rollback(on_error=report)
+            console.log(f"[bold green]↩ {undone} movimientos deshechos.[/bold green]")
+        elif interrupted == "applying":
+            done, total = journal.counts()
+            console.log(f"[bold yellow]Reorganización interrumpida ({done} de {total} movimientos):[/bold yellow] se completa.")
+            with console.status("Completando los movimientos pendientes..."):
+                journal.resume(on_error=report)
+        elif interrupted == "rolling-back":
+            console.log("[bold yellow]Vuelta atrás interrumpida:[/bold yellow] se completa.")
+            with console.status("Deshaciendo los movimientos restantes..."):
+                journal.rollback(on_error=report)
+        else:
+            console.log("[bold yellow]No hay ninguna reorganización que deshacer.[/bold yellow]")
+        journal.close()
+        # El índice ya no describe la carpeta: la próxima ejecución la analiza entera
+        index = organizer.OrganizeIndex(folder_path, layout=layout.signature() if layout else "")
+        index.reset()
+        index.close()
+        return []
+
     console.print(f"[bold]Analizando y organizando la carpeta:[/bold] [cyan]{folder_path}[/cyan]")
-    
-    # Lógica para encontrar archivos de audio
-    supported_extensions = ['.mp3', '.m4a', '.wav', '.flac', '.ogg']
-    files_to_organize = [
-        f for f in Path(folder_path).iterdir()
-        if f.is_file() and f.suffix.lower() in supported_extensions
-    ]
-    
-    if not files_to_organize:
+
+    with console.status("Recorriendo directorios..."):
+        entries = organizer.scan_tree(folder_path, SUPPORTED_EXTENSIONS, workers=jobs)
+
+    if not entries:
         console.log("[bold yellow]No se encontraron archivos de música soportados para organizar.[/bold yellow]")
+        journal.close()
         return
 
-    # Procesa cada archivo
-    for file_path in files_to_organize:
-        # Aquí puedes implementar una lógica de búsqueda de metadatos más avanzada
-        file_name = file_path.stem
-        parts = file_name.split(" - ")
-        if len(parts) >= 2:
-            artist = parts[0].strip()
-            title = parts[1].strip()
-            
-            rename_and_organize(str(file_path), title, artist, folder_path)
-        else:
-            console.log(f"[bold yellow]⚠️ Archivo omitido:[/bold yellow] '{file_path.name}' no tiene el formato 'Artista - Título'.")
+    index = organizer.OrganizeIndex(folder_path, layout=layout.signature() if layout else "")
+    if layout is None:
+        target_for = target_from_filename
+    else:
+        with console.status("Leyendo etiquetas..."):
+            targets = layout_targets(entries, folder_path, layout, None if full else index, jobs)
+        target_for = targets.get
+    plan = organizer.build_plan(entries, target_for, index=None if full else index)
+
+    console.log(
+        f"{len(entries)} archivos: [green]{len(plan.moves)} movimientos[/green], "
+        f"{plan.unchanged} sin cambios desde la última ejecución, {len(plan.invalid)} sin formato 'Artista - Título'."
+    )
+    for path in plan.invalid[:20]:
+        console.log(f"[bold yellow]⚠️ Archivo omitido:[/bold yellow] '{os.path.basename(path)}' no tiene el formato 'Artista - Título'.")
+    if len(plan.invalid) > 20:
+        console.log(f"[bold yellow]⚠️ ... y {len(plan.invalid) - 20} archivos más omitidos.[/bold yellow]")
+    for source, target in plan.collisions:
+        console.log(f"[bold yellow]⚠️ Colisión:[/bold yellow] '{os.path.basename(source)}' se renombrará a '{os.path.basename(target)}'.")
+    if plan.cycles:
+        console.log(f"[bold yellow]⚠️ {plan.cycles} ciclos de renombrado resueltos con nombres temporales.[/bold yellow]")
+
+    if dry_run:
+        _print_plan(plan, folder_path)
+        index.close()
+        journal.close()
+        console.print("[bold cyan]Simulación: no se modificó ningún archivo.[/bold cyan]")
+        return
+
+    if plan.moves:
+        with console.status(f"Moviendo {len(plan.moves)} archivos..."):
+            applied = organizer.apply_plan(plan, on_error=report, journal=journal)
+    else:
+        applied = []
+    journal.close()
+
+    # Estado final para el índice: los archivos movidos con su nueva ruta
+    moved = organizer.final_paths(applied)
+    final = []
+    for entry in entries:
+        path = moved.get(entry.path, entry.path)
+        final.append(organizer.FileEntry(path, entry.size, os.path.getmtime(path) if path != entry.path else entry.mtime))
+    index.sync(final)
+    index.close()
 
+    console.log(f"[bold green]✅ {len(moved)} archivos renombrados.[/bold green]")
     console.print("-" * 40)
     console.print("[bold green]✨ Organización finalizada. ✨[/bold green]")
+    return applied
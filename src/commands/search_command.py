@@ -3,81 +3,127 @@
 import click
 import sys
 from rich.console import Console
+from rich.live import Live
 from rich.prompt import Prompt
 from rich.table import Table
-from rich.status import Status
 from typing import List
 
-from sources.soundcloud import SoundCloudSource
-from sources.youtube import YouTubeSource
+from core.cache import get_resolution_cache, get_search_cache, query_key
+from core.search import DEFAULT_TIMEOUT, ProviderResult, federated_search, merge_results
+from sources.registry import get_registry
 #from ..sources.youtube import YouTubeSource
 #from ..sources.soundcloud import SoundCloudSource
 #from ..metadata import id3_tagger
 
 console = Console()
 
-def get_providers():
-    """Retorna una lista de todos los proveedores de descarga disponibles."""
-    return [YouTubeSource(), SoundCloudSource()]
+# Marcas del estado de cada fuente en el pie de la tabla
+_STATUS_LABELS = {
+    'ok': "[green]✓[/green]",
+    'cached': "[cyan]⚡ caché[/cyan]",
+    'timeout': "[yellow]⏱ sin respuesta[/yellow]",
+    'error': "[red]✘ error[/red]",
+}
 
-def rename_and_organize(file_path: str, title: str, artist: str, output_dir: str) -> str:
+def _render(query: str, results: List[dict], responses: List[ProviderResult], waiting: List[str], limit: int, resolved: dict) -> Table:
     """
-    Renombra y organiza un archivo en un formato consistente.
-    Formato: "Artista - Título.mp3"
+    Tabla de resultados ordenados por relevancia, con el estado de cada fuente
+    en el pie. `resolved` memoriza qué resultados están en la caché de
+    resoluciones, para consultarla una sola vez por resultado.
     """
-    # Lógica de renombrado (copiada del comando download)
-    pass
+    cache = get_resolution_cache()
+    table = Table(title=f"Resultados de la búsqueda para '{query}'", show_header=True, header_style="bold blue")
+    table.add_column("ID", style="dim", width=5)
+    table.add_column("Título", style="cyan")
+    table.add_column("Artista", style="magenta")
+    table.add_column("Fuente")
+    table.add_column("Relevancia", justify="right")
+    table.add_column("URL")
+    table.add_column("Caché", justify="center")
+
+    for i, result in enumerate(results[:limit]):
+        key = query_key(result['artist'], result['title'])
+        if key not in resolved:
+            resolved[key] = cache.contains(key)
+        cached = resolved[key]
+        table.add_row(str(i), result['title'], result['artist'], ", ".join(result['sources']),
+                      f"{result['score']:.0%}", result['url'], "✓" if cached else "")
+
+    status = []
+    for response in responses:
+        label = _STATUS_LABELS[response.status]
+        if response.status == 'ok':
+            label += f" {len(response.results)} en {response.elapsed:.1f} s"
+        status.append(f"{response.source}: {label}")
+    status.extend(f"{name}: [dim]buscando...[/dim]" for name in waiting)
+    table.caption = " · ".join(status)
+    return table
+
+def live_search(query: str, providers, timeout: float = DEFAULT_TIMEOUT, limit: int = 20, use_cache: bool = True) -> List[dict]:
+    """
+    Búsqueda federada con la tabla de resultados en vivo. La tabla solo se
+    redibuja al llegar cada respuesta, desde el hilo que llama (así convive
+    con la salida de fondo del modo interactivo). Retorna los resultados
+    mostrados, como mucho `limit`.
+    """
+    waiting = [provider.get_source_name() for provider in providers]
+    responses: List[ProviderResult] = []
+    all_results: List[dict] = []
+    resolved = {}
+
+    with Live(_render(query, all_results, responses, waiting, limit, resolved), console=console, auto_refresh=False) as live:
+        for response in federated_search(query, providers, timeout=timeout, cache=get_search_cache() if use_cache else None):
+            responses.append(response)
+            waiting.remove(response.source)
+            all_results = merge_results(query, responses)
+            live.update(_render(query, all_results, responses, waiting, limit, resolved), refresh=True)
+    return all_results[:limit]
+
+def remember_choice(chosen: dict):
+    """
+    La elección del usuario es la mejor resolución para 'artista - título':
+    se guarda en la caché de resoluciones, la misma que usa Spotify → YouTube.
+    """
+    get_resolution_cache().set(query_key(chosen['artist'], chosen['title']), {
+        'url': chosen['url'], 'title': chosen['title'], 'artist': chosen['artist'],
+    })
 
 @click.command(name='search', help="🔍 Busca música en las fuentes disponibles.")
 @click.argument('query', type=str)
-def search(query: str):
+@click.option('--timeout', type=click.FloatRange(0.5), default=DEFAULT_TIMEOUT, show_default=True, help='Plazo máximo de cada fuente (segundos).')
+@click.option('--limit', type=click.IntRange(1), default=20, show_default=True, help='Número máximo de resultados mostrados.')
+@click.option('--no-cache', is_flag=True, help='Ignora la caché de búsquedas y consulta todas las fuentes.')
+def search(query: str, timeout: float, limit: int, no_cache: bool):
     """
     Busca música en las fuentes disponibles.
+    Las fuentes se consultan a la vez, cada una con su propio plazo, y los
+    resultados aparecen en la tabla a medida que llegan, unidos, sin
+    duplicados y ordenados por similitud con la consulta.
     """
-    providers = get_providers()
-    
-    with Status("Buscando...", spinner="dots") as status:
-        all_results = []
-        for provider in providers:
-            status.update(f"Buscando '{query}' en [bold cyan]{provider.get_source_name()}[/bold cyan]...")
-            results = provider.search(query)
-            all_results.extend(results)
-    
+    registry = get_registry()
+    all_results = live_search(query, registry.searchable(), timeout=timeout, limit=limit, use_cache=not no_cache)
     if not all_results:
         console.log("[bold red]No se encontraron resultados.[/bold red]")
         sys.exit(1)
 
-    table = Table(title=f"Resultados de la búsqueda para '{query}'", show_header=True, header_style="bold blue")
-    table.add_column("ID", style="dim", width=5)
-    table.add_column("Título", style="cyan")
-    table.add_column("Artista", style="magenta")
-    table.add_column("URL")
-    
-    for i, result in enumerate(all_results):
-        table.add_row(str(i), result['title'], result['artist'], result['url'])
-    
-    console.print(table)
-    
     choice = Prompt.ask("Ingresa el ID del resultado para descargar, o cualquier otra cosa para cancelar")
     try:
         index = int(choice)
         if 0 <= index < len(all_results):
-            download_url = all_results[index]['url']
+            chosen = all_results[index]
+            download_url = chosen['url']
             
-            # Instancia el downloader y descarga
-            providers_for_download = get_providers()
-            source_found = False
-            for provider in providers_for_download:
-                if provider.is_valid_url(download_url):
-                    console.log(f"[bold green]Fuente identificada:[/bold green] {provider.get_source_name()}")
-                    # Llama al comando download del otro archivo
-                    import commands.download_command
+            # Los proveedores de la búsqueda ya están creados: el registro los reutiliza
+            provider = registry.for_url(download_url)
+            if provider is not None:
+                console.log(f"[bold green]Fuente identificada:[/bold green] {provider.get_source_name()}")
+                remember_choice(chosen)
+                # Llama al comando download del otro archivo
+                import commands.download_command
 
-                    ctx = click.get_current_context()
-                    ctx.invoke(commands.download_command.download, urls=[download_url], output='./downloads')
-                    source_found = True
-                    break
-            if not source_found:
+                ctx = click.get_current_context()
+                ctx.invoke(commands.download_command.download, urls=[download_url], output='./downloads')
+            else:
                  console.log("[bold red]❌ La URL seleccionada no es soportada para la descarga.[/bold red]")
         else:
             console.log("[bold red]ID inválido. Cancelando.[/bold red]")
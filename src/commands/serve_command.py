@@ -0,0 +1,169 @@
+# src/commands/serve_command.py
+
+import click
+import os
+import signal
+import threading
+from pathlib import Path
+from typing import Callable, List, Optional
+from rich.console import Console
+
+from commands import download_command
+from core import daemon as daemon_service
+from core.jobqueue import MAX_ATTEMPTS, Job, JobQueue
+from core.layout import PathLayout
+from core.manifest import DownloadManifest
+from core.progress import Tracker
+from core.ratelimit import RETRYABLE_STATUS, error_details
+from sources.base_source import DownloadError
+
+console = Console()
+
+def _pid_alive(pid: int) -> bool:
+    # os.kill(0, ...) señala al grupo del propio proceso: un PID ausente no es un daemon vivo
+    if not isinstance(pid, int) or pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+def _is_permanent(error: BaseException) -> bool:
+    """True si reintentar no cambiará el resultado: el servidor respondió 4xx (salvo 408, 425, 429)."""
+    status, _ = error_details(error)
+    return status is not None and 400 <= status < 500 and status not in RETRYABLE_STATUS
+
+def make_runner(providers, jobs: int, layout: Optional[PathLayout] = None,
+                tracker_for: Optional[Callable[[Job], Tracker]] = None):
+    """
+    Ejecutor de trabajos que reutiliza los proveedores ya creados y mantiene
+    abierto un manifiesto por directorio de salida, de modo que cada trabajo
+    solo paga su propia descarga. Un trabajo sin ningún archivo completado ni
+    omitido se considera fallido y se reintenta, salvo que su URL no esté
+    soportada o todos sus fallos sean definitivos (4xx): entonces falla sin
+    reintentos (`PermanentError`). `tracker_for(job)` retorna
+    el `Tracker` que sigue el progreso del trabajo (modo interactivo).
+    """
+    manifests = {}
+    lock = threading.Lock()
+
+    def manifest_for(output: str) -> DownloadManifest:
+        with lock:
+            if output not in manifests:
+                Path(output).mkdir(parents=True, exist_ok=True)
+                manifests[output] = DownloadManifest.for_output_dir(output)
+            return manifests[output]
+
+    def run(job: Job) -> dict:
+        if providers.for_url(job.url) is None:
+            raise daemon_service.PermanentError("URL no soportada")
+        manifest = manifest_for(job.output)
+        tracker = tracker_for(job) if tracker_for is not None else None
+        stats, skipped = download_command.run_downloads([job.url], Path(job.output), providers, manifest, jobs=jobs, layout=layout,
+                                                        tracker=tracker)
+        errors = [f"{failure.stage}: {failure.error}" for failure in stats.failures]
+        cancelled = tracker is not None and tracker.cancelled
+        if errors and not stats.completed and not skipped and not cancelled:
+            if all(_is_permanent(failure.error) for failure in stats.failures):
+                raise daemon_service.PermanentError(errors[0])
+            raise DownloadError(errors[0])
+        return {
+            'files': [item['path'] for item in stats.completed],
+            'skipped': len(skipped),
+            'errors': errors,
+            'elapsed': stats.elapsed,
+            'cancelled': cancelled,
+        }
+
+    def close():
+        with lock:
+            for manifest in manifests.values():
+                manifest.close()
+            manifests.clear()
+
+    run.close = close
+    return run
+
+def _log_event(event: str, job: Job):
+    if event == "start":
+        console.log(f"[bold]▶ Trabajo {job.id}[/bold] (prioridad {job.priority}, intento {job.attempts}): {job.url}")
+    elif event == "done":
+        result = job.result or {}
+        console.log(
+            f"[bold green]✔ Trabajo {job.id}[/bold green]: {len(result.get('files', []))} archivos, "
+            f"{result.get('skipped', 0)} omitidos, {len(result.get('errors', []))} errores en {result.get('elapsed', 0):.1f} s"
+        )
+    elif event == "retry":
+        console.log(f"[bold yellow]↻ Trabajo {job.id}[/bold yellow] se reintentará: {job.error}")
+    else:
+        console.log(f"[bold red]✘ Trabajo {job.id}[/bold red] fallido tras {job.attempts} intentos: {job.error}")
+
+@click.command(name='serve', help="🛰️ Inicia el daemon de descargas con una cola de trabajos persistente.")
+@click.option('--host', default=daemon_service.DEFAULT_HOST, show_default=True, help='Dirección de escucha de la API local.')
+@click.option('--port', type=click.IntRange(0, 65535), default=daemon_service.DEFAULT_PORT, show_default=True, help='Puerto de la API local (0 = uno libre).')
+@click.option('--workers', '-w', type=click.IntRange(1, 64), default=2, show_default=True, help='Trabajos que se procesan a la vez.')
+@click.option('--jobs', '-j', type=click.IntRange(1, 64), default=4, show_default=True, help='Trabajadores por etapa dentro de cada trabajo.')
+@click.option('--segments', type=click.IntRange(1, 16), default=1, show_default=True, help='Segmentos paralelos (HTTP Range) para archivos grandes.')
+@click.option('--transcode', is_flag=True, help='Convierte a MP3 en flujo durante la descarga, sin archivo intermedio.')
+@click.option('--quality', default='best', show_default=True, help="Stream de audio a elegir: best, smallest o max-bitrate=N (kbps).")
+@click.option('--codec', 'codecs', multiple=True, help='Códec preferido (aac, opus, vorbis...); repetible, por orden de preferencia.')
+@click.option('--layout', 'template', help="Plantilla de ruta relativa, p. ej. '{artist}/{album}/{track:02} {title}'.")
+@click.option('--shard', type=click.IntRange(0, 8), default=0, show_default=True, help='Con --layout, antepone un directorio con N caracteres del hash del artista.')
+@click.option('--max-attempts', type=click.IntRange(1, 100), default=MAX_ATTEMPTS, show_default=True, help='Intentos por trabajo antes de darlo por fallido.')
+def serve(host: str, port: int, workers: int, jobs: int, segments: int, transcode: bool, quality: str, codecs: List[str],
+          template: Optional[str], shard: int, max_attempts: int):
+    """
+    Proceso de larga duración: crea cada proveedor una sola vez, con su
+    primer trabajo (sesiones, pools de conexiones, autenticación), y
+    atiende los trabajos de una cola persistente en SQLite, con
+    prioridades. Los trabajos encolados con `submit` sobreviven a los
+    reinicios, y los que quedaron en curso tras una caída se reanudan al
+    arrancar.
+    """
+    policy = download_command.selection_policy(quality, codecs)
+    layout = download_command.path_layout(template, shard)
+    state = daemon_service.read_state()
+    if state and state.get("pid") != os.getpid() and _pid_alive(state.get("pid", 0)):
+        console.log(f"[bold red]❌ Ya hay un daemon en marcha[/bold red] (PID {state['pid']}, {state['url']}).")
+        raise SystemExit(1)
+
+    providers = download_command.get_providers(segments=segments, transcode=transcode, policy=policy)
+    queue = JobQueue(max_attempts=max_attempts)
+    runner = make_runner(providers, jobs, layout)
+    service = daemon_service.Daemon(queue, runner, workers=workers, on_event=_log_event)
+    try:
+        api = daemon_service.ApiServer(service, host=host, port=port, accepts=lambda url: bool(providers.candidates(url)))
+    except OSError as e:
+        console.log(f"[bold red]❌ No se pudo escuchar en {host}:{port}:[/bold red] {e}")
+        raise SystemExit(1)
+
+    recovered = service.start()
+    daemon_service.write_state(api.url, api.token)
+    threading.Thread(target=api.serve_forever, name="api", daemon=True).start()
+    counts = queue.counts()
+    console.log(f"[bold green]🛰️ Daemon escuchando en[/bold green] {api.url} (PID {os.getpid()}, {workers} trabajos a la vez)")
+    console.log(f"Cola: {counts['queued']} pendientes, {recovered} recuperados tras una interrupción.")
+
+    stop = threading.Event()
+    # SIGTERM (systemd, kill) se trata igual que Ctrl+C: parada ordenada
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        while not stop.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        pass
+
+    console.log("[bold]Deteniendo: no se aceptan trabajos nuevos, se esperan los que están en curso...[/bold]")
+    api.shutdown()
+    try:
+        service.stop()
+    except KeyboardInterrupt:
+        # Los trabajos interrumpidos se reanudan en el próximo arranque
+        console.log("[bold yellow]Salida inmediata: los trabajos en curso se reanudarán al reiniciar.[/bold yellow]")
+    daemon_service.clear_state()
+    runner.close()
+    queue.close()
+    console.print("[bold cyan]✨ Daemon detenido. ✨[/bold cyan]")
@@ -0,0 +1,172 @@
+# src/commands/submit_command.py
+
+import click
+import json
+import os
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime
+from typing import List, Optional
+
+# Cliente ligero del daemon: solo usa la librería estándar (sin rich ni los
+# proveedores), para que cada invocación desde cron arranque al instante.
+
+FINISHED = ("done", "failed", "cancelled")
+
+
+class DaemonUnavailable(Exception):
+    """No hay un daemon en marcha o no responde."""
+    pass
+
+
+def _endpoint(url: Optional[str]) -> tuple:
+    """URL y token del daemon: `--url`/MUSIC_CLI_DAEMON_URL o el archivo de estado del daemon."""
+    from core import daemon as daemon_service
+
+    state = daemon_service.read_state() or {}
+    url = url or os.environ.get("MUSIC_CLI_DAEMON_URL") or state.get("url")
+    token = os.environ.get("MUSIC_CLI_DAEMON_TOKEN") or state.get("token")
+    if not url or not token:
+        raise DaemonUnavailable("no hay un daemon registrado")
+    return url.rstrip("/"), token
+
+
+def api_request(method: str, path: str, body: Optional[dict] = None, url: Optional[str] = None, timeout: float = 10.0) -> dict:
+    """Llama a la API local del daemon y retorna la respuesta JSON."""
+    base, token = _endpoint(url)
+    data = json.dumps(body).encode("utf-8") if body is not None else None
+    request = urllib.request.Request(f"{base}{path}", data=data, method=method, headers={
+        "Authorization": f"Bearer {token}",
+        "Content-Type": "application/json",
+    })
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        try:
+            message = json.loads(e.read()).get("error", str(e))
+        except ValueError:
+            message = str(e)
+        raise click.ClickException(f"El daemon rechazó la petición ({e.code}): {message}")
+    except (urllib.error.URLError, ConnectionError, TimeoutError) as e:
+        raise DaemonUnavailable(str(getattr(e, "reason", e)))
+
+
+def _read_urls(urls: List[str], from_file: Optional[str]) -> List[str]:
+    collected = list(urls)
+    if from_file:
+        with click.open_file(from_file, encoding="utf-8") as f:
+            collected += [line.strip() for line in f if line.strip() and not line.startswith("#")]
+    return collected
+
+
+def _format_job(job: dict) -> str:
+    submitted = datetime.fromtimestamp(job['submitted_at']).strftime("%Y-%m-%d %H:%M:%S")
+    line = f"{job['id']:>6}  {job['status']:<9}  p{job['priority']:<3}  {submitted}  {job['url']}"
+    result = job.get('result') or {}
+    if job['status'] == 'done':
+        line += f"  → {len(result.get('files', []))} archivos, {result.get('skipped', 0)} omitidos"
+        if result.get('errors'):
+            line += f", {len(result['errors'])} errores"
+    elif job.get('error'):
+        line += f"  ({job['error']})"
+    return line
+
+
+@click.command(name='submit', help="📨 Envía URLs al daemon de descargas (`serve`).")
+@click.argument('urls', nargs=-1)
+@click.option('--file', '-f', 'from_file', type=click.Path(dir_okay=False, allow_dash=True), help="Archivo con una URL por línea ('-' para stdin).")
+@click.option('--output', '-o', type=click.Path(file_okay=False), default='./downloads', show_default=True, help='Directorio de salida.')
+@click.option('--priority', '-p', type=int, default=0, show_default=True, help='Prioridad (mayor = antes).')
+@click.option('--wait', is_flag=True, help='Espera a que terminen los trabajos; termina con código 1 si alguno falla.')
+@click.option('--url', 'daemon_url', help='URL de la API del daemon (por defecto, la del daemon en marcha).')
+def submit(urls: List[str], from_file: Optional[str], output: str, priority: int, wait: bool, daemon_url: Optional[str]):
+    """
+    Encola URLs en el daemon. Si el daemon no está en marcha, los trabajos se
+    escriben directamente en la cola persistente y se procesarán al iniciarlo.
+    """
+    urls = _read_urls(urls, from_file)
+    if not urls:
+        raise click.UsageError("Debes proporcionar al menos una URL.")
+    body = {"urls": urls, "output": os.path.abspath(output), "priority": priority}
+    try:
+        ids = api_request("POST", "/jobs", body, url=daemon_url)["ids"]
+    except DaemonUnavailable as e:
+        if wait or daemon_url:
+            raise click.ClickException(f"El daemon no está disponible: {e}")
+        from core.jobqueue import JobQueue
+
+        queue = JobQueue()
+        ids = [queue.submit(url, body["output"], priority) for url in urls]
+        queue.close()
+        click.echo(f"El daemon no está en marcha ({e}); trabajos encolados para cuando se inicie `serve`.", err=True)
+    click.echo(" ".join(str(job_id) for job_id in ids))
+
+    if wait:
+        pending = set(ids)
+        failed = 0
+        while pending:
+            time.sleep(0.5)
+            for job_id in sorted(pending):
+                job = api_request("GET", f"/jobs/{job_id}", url=daemon_url)
+                if job['status'] in FINISHED:
+                    pending.discard(job_id)
+                    failed += job['status'] != 'done'
+                    click.echo(_format_job(job))
+        if failed:
+            sys.exit(1)
+
+
+@click.command(name='status', help="📋 Muestra el estado del daemon y de sus trabajos.")
+@click.argument('job_ids', nargs=-1, type=int)
+@click.option('--status', 'status_filter', type=click.Choice(["queued", "running", "done", "failed", "cancelled"]), help='Filtra por estado.')
+@click.option('--limit', type=click.IntRange(1, 10000), default=20, show_default=True, help='Número de trabajos recientes a mostrar.')
+@click.option('--cancel', is_flag=True, help='Cancela los trabajos indicados si aún están pendientes.')
+@click.option('--json', 'as_json', is_flag=True, help='Salida en JSON.')
+@click.option('--url', 'daemon_url', help='URL de la API del daemon (por defecto, la del daemon en marcha).')
+def status(job_ids: List[int], status_filter: Optional[str], limit: int, cancel: bool, as_json: bool, daemon_url: Optional[str]):
+    """
+    Consulta el daemon. Si no está en marcha, lee la cola persistente
+    directamente (los trabajos pendientes siguen ahí).
+    """
+    try:
+        if cancel:
+            for job_id in job_ids:
+                api_request("DELETE", f"/jobs/{job_id}", url=daemon_url)
+                click.echo(f"Trabajo {job_id} cancelado.")
+            return
+        health = api_request("GET", "/health", url=daemon_url)
+        if job_ids:
+            jobs = [api_request("GET", f"/jobs/{job_id}", url=daemon_url) for job_id in job_ids]
+        else:
+            query = f"?limit={limit}" + (f"&status={status_filter}" if status_filter else "")
+            jobs = api_request("GET", f"/jobs{query}", url=daemon_url)["jobs"]
+    except DaemonUnavailable as e:
+        if daemon_url:
+            raise click.ClickException(f"El daemon no está disponible: {e}")
+        from core.jobqueue import JobQueue
+
+        queue = JobQueue()
+        if cancel:
+            for job_id in job_ids:
+                click.echo(f"Trabajo {job_id} {'cancelado' if queue.cancel(job_id) else 'no está pendiente'}.")
+            queue.close()
+            return
+        health = {"counts": queue.counts()}
+        found = [queue.get(job_id) for job_id in job_ids] if job_ids else queue.list(status_filter, limit)
+        jobs = [job.to_dict() for job in found if job is not None]
+        queue.close()
+
+    if as_json:
+        click.echo(json.dumps({"daemon": health, "jobs": jobs}, indent=2))
+        return
+    if "pid" in health:
+        click.echo(f"Daemon en marcha (PID {health['pid']}, {health['uptime'] / 60:.0f} min, "
+                   f"{health['workers']} trabajos a la vez, en curso: {', '.join(map(str, health['active'])) or 'ninguno'})")
+    else:
+        click.echo("Daemon detenido; cola leída del disco.")
+    click.echo("Cola: " + ", ".join(f"{count} {name}" for name, count in health["counts"].items()))
+    for job in jobs:
+        click.echo(_format_job(job))
@@ -1,31 +1,514 @@
 # src/converters/audio_converter.py
 
 import click
+import json
 import os
-from pydub import AudioSegment
+import shutil
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import dataclass
 from pathlib import Path
+from typing import Any, BinaryIO, Optional, Tuple, Union
 from rich.console import Console
 
+from metadata import id3_tagger
+
 console = Console()
 
-def convert_to_mp3(input_file: str, output_dir: str):
+# Tamaño de los bloques que se mueven entre la fuente, FFmpeg y el archivo de salida.
+DEFAULT_BUFFER_SIZE = 256 * 1024
+DEFAULT_BITRATE = "192k"
+
+# Extensiones de entrada que se aceptan al convertir directorios completos.
+SUPPORTED_INPUT_EXTENSIONS = ['.mp3', '.m4a', '.wav', '.flac', '.ogg', '.opus', '.aac', '.wma', '.mp4', '.webm', '.mkv', '.mov']
+
+def output_path_for(input_file: str, output_dir: str, extension: str = ".mp3", stem: Optional[str] = None) -> Path:
+    """Ruta del archivo resultante para un archivo de entrada (`stem` reemplaza su nombre)."""
+    return Path(output_dir) / f"{stem or Path(input_file).stem}{extension}"
+
+def is_up_to_date(input_file: str, output_file: str) -> bool:
+    """True si la salida existe y es más reciente que la entrada."""
+    try:
+        return os.path.getmtime(output_file) >= os.path.getmtime(input_file)
+    except OSError:
+        return False
+
+@dataclass
+class StreamStats:
+    """Métricas de una conversión en flujo."""
+    bytes_in: int = 0
+    bytes_out: int = 0
+    duration: float = 0.0
+    # Máximo de bytes retenidos a la vez por este proceso (bloques en tránsito)
+    peak_buffered: int = 0
+    # Memoria residente máxima del proceso FFmpeg de esta conversión (bytes)
+    peak_rss: int = 0
+    # Sonoridad medida en la misma pasada (`core.loudness.LoudnessResult`), si se pidió
+    loudness: Optional[Any] = None
+
+def _wait_with_rss(process: subprocess.Popen) -> Tuple[int, int]:
+    """
+    Espera a que termine `process` y retorna (código de salida, memoria
+    residente máxima de ese proceso en bytes; 0 si no se puede medir).
+    `os.wait4` da el uso de recursos del hijo concreto, no el máximo de
+    todos los hijos del proceso como `RUSAGE_CHILDREN`.
+    """
+    if not hasattr(os, "wait4"):  # Windows
+        return process.wait(), 0
+    try:
+        _, status, usage = os.wait4(process.pid, 0)
+    except ChildProcessError:
+        return process.wait(), 0
+    process.returncode = os.waitstatus_to_exitcode(status)
+    # Linux informa ru_maxrss en KiB; macOS en bytes
+    value = usage.ru_maxrss
+    return process.returncode, value if sys.platform == "darwin" else value * 1024
+
+def stream_to_mp3(source: Union[str, BinaryIO], output_path: Union[str, Path], buffer_size: int = DEFAULT_BUFFER_SIZE,
+                  bitrate: str = DEFAULT_BITRATE, analyze: bool = False, channels: int = 2) -> StreamStats:
+    """
+    Convierte a MP3 en flujo con FFmpeg, sin cargar el audio en memoria.
+
+    `source` puede ser una ruta o un objeto tipo archivo (por ejemplo, la
+    respuesta HTTP de una descarga); en ese caso se envía a FFmpeg por stdin
+    en bloques de `buffer_size`. La salida se escribe por bloques en un
+    `.part` que se renombra al terminar, así que la memoria pico no depende
+    de la duración de la pista.
+
+    Con `analyze`, la misma decodificación alimenta también una segunda
+    salida PCM (por un pipe aparte) que mide la sonoridad EBU R128 y el pico
+    mientras se codifica; el resultado queda en `stats.loudness`.
+    """
+    output_path = Path(output_path)
+    part = output_path.with_name(output_path.name + ".part")
+    from_pipe = not isinstance(source, (str, os.PathLike))
+    command = ["ffmpeg", "-hide_banner", "-loglevel", "error", "-nostats", "-progress", "pipe:2"]
+    if not from_pipe:
+        command.append("-nostdin")
+    command += ["-i", "pipe:0" if from_pipe else str(source), "-vn", "-f", "mp3", "-b:a", bitrate, "pipe:1"]
+    meter = None
+    pcm_read = pcm_write = None
+    if analyze:
+        from core.loudness import SAMPLE_RATE, LoudnessMeter
+
+        meter = LoudnessMeter(channels)
+        pcm_read, pcm_write = os.pipe()
+        command += ["-vn", "-f", "f32le", "-ac", str(meter.channels), "-ar", str(SAMPLE_RATE), f"pipe:{pcm_write}"]
+    stats = StreamStats()
+    lock = threading.Lock()
+    in_flight = 0
+    errors = []
+    stderr_tail = []
+
+    def hold(amount: int):
+        nonlocal in_flight
+        with lock:
+            in_flight += amount
+            stats.peak_buffered = max(stats.peak_buffered, in_flight)
+
+    def feed():
+        try:
+            while True:
+                chunk = source.read(buffer_size)
+                if not chunk:
+                    break
+                hold(len(chunk))
+                process.stdin.write(chunk)
+                stats.bytes_in += len(chunk)
+                hold(-len(chunk))
+        except BrokenPipeError:
+            pass
+        except Exception as e:
+            errors.append(e)
+        finally:
+            try:
+                process.stdin.close()
+            except OSError:
+                pass
+
+    def watch_stderr():
+        # `-progress` emite 'out_time_us=' periódicamente; el resto son errores.
+        for raw in process.stderr:
+            line = raw.decode("utf-8", "replace").strip()
+            if line.startswith("out_time_us="):
+                try:
+                    stats.duration = max(stats.duration, int(line.split("=", 1)[1]) / 1_000_000)
+                except ValueError:
+                    pass
+            elif "=" not in line and line:
+                stderr_tail.append(line)
+                del stderr_tail[:-20]
+
+    def measure():
+        # El pipe PCM debe vaciarse a la par que stdout o FFmpeg se bloquea
+        with os.fdopen(pcm_read, "rb", buffering=0) as pcm:
+            while True:
+                chunk = pcm.read(buffer_size)
+                if not chunk:
+                    break
+                hold(len(chunk))
+                meter.feed(chunk)
+                hold(-len(chunk))
+
+    try:
+        process = subprocess.Popen(
+            command,
+            stdin=subprocess.PIPE if from_pipe else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            bufsize=0,
+            pass_fds=(pcm_write,) if analyze else (),
+        )
+    finally:
+        if analyze:
+            os.close(pcm_write)
+    threads = [threading.Thread(target=watch_stderr, daemon=True)]
+    if from_pipe:
+        threads.append(threading.Thread(target=feed, daemon=True))
+    if analyze:
+        threads.append(threading.Thread(target=measure, daemon=True))
+    for thread in threads:
+        thread.start()
+
+    try:
+        with open(part, "wb") as out:
+            while True:
+                chunk = process.stdout.read(buffer_size)
+                if not chunk:
+                    break
+                hold(len(chunk))
+                out.write(chunk)
+                stats.bytes_out += len(chunk)
+                hold(-len(chunk))
+        returncode, stats.peak_rss = _wait_with_rss(process)
+        for thread in threads:
+            thread.join()
+    except BaseException:
+        process.kill()
+        process.wait()
+        if os.path.exists(part):
+            os.remove(part)
+        raise
+
+    if errors or returncode != 0:
+        os.remove(part)
+        detail = errors[0] if errors else " | ".join(stderr_tail) or f"código {returncode}"
+        raise RuntimeError(f"FFmpeg falló: {detail}")
+    os.replace(part, output_path)
+    if meter is not None:
+        stats.loudness = meter.result()
+    return stats
+
+def _transcode(input_file: str, output_path: Path, buffer_size: int = DEFAULT_BUFFER_SIZE,
+               analyze: bool = False, channels: int = 2) -> StreamStats:
+    """Convierte a MP3 en flujo. FFmpeg detecta automáticamente el formato de entrada."""
+    return stream_to_mp3(input_file, output_path, buffer_size=buffer_size, analyze=analyze, channels=channels)
+
+# Contenedor natural de cada códec de audio: (extensión, muxer de FFmpeg).
+_NATIVE_CONTAINERS = {
+    'mp3': ('.mp3', 'mp3'),
+    'aac': ('.m4a', 'ipod'),
+    'alac': ('.m4a', 'ipod'),
+    'opus': ('.opus', 'opus'),
+    'vorbis': ('.ogg', 'ogg'),
+    'flac': ('.flac', 'flac'),
+}
+
+# Extensión de salida que se espera, con `target='auto'`, según la de entrada
+# (solo para saltar sin ffprobe las salidas al día; si no acierta, decide `probe`).
+_EXPECTED_EXTENSIONS = {'.mp3': '.mp3', '.m4a': '.m4a', '.opus': '.opus', '.ogg': '.ogg', '.flac': '.flac'}
+
+# Nombre con el que ffprobe informa (en `format_name`) el contenedor de cada muxer.
+_CONTAINER_FAMILY = {'mp3': 'mp3', 'ipod': 'mp4', 'opus': 'ogg', 'ogg': 'ogg', 'flac': 'flac'}
+
+# Descripción legible de cada acción para la consola.
+ACTION_LABELS = {'rename': 'solo renombrado', 'remux': 'remultiplexado sin recodificar', 'transcode': 'recodificado'}
+
+@dataclass
+class ConversionPlan:
+    """
+    Acción más barata para obtener el formato pedido:
+    'rename' (el contenido ya es correcto), 'remux' (copia del audio a otro
+    contenedor, sin recodificar) o 'transcode' (decodificación y codificación).
+    """
+    action: str
+    extension: str
+    muxer: str
+
+def probe(input_file: str) -> Optional[dict]:
+    """
+    Identifica el contenedor y el códec real con ffprobe (solo lee la cabecera).
+    Retorna {'container', 'codec', 'has_video', 'duration', 'bit_rate', 'channels'} o None si no se puede analizar.
+    """
+    command = [
+        "ffprobe", "-v", "error", "-of", "json",
+        "-show_entries", "format=format_name,duration,bit_rate:stream=codec_name,codec_type,channels:stream_disposition=attached_pic",
+        input_file,
+    ]
+    try:
+        output = subprocess.run(command, capture_output=True, check=True, timeout=30).stdout
+        data = json.loads(output or b"{}")
+    except (OSError, subprocess.SubprocessError, ValueError):
+        return None
+
+    streams = data.get("streams", [])
+    audio = [stream for stream in streams if stream.get("codec_type") == "audio"]
+    if not audio:
+        return None
+    # Las carátulas incrustadas aparecen como streams de video 'attached_pic'
+    has_video = any(
+        stream.get("codec_type") == "video" and not stream.get("disposition", {}).get("attached_pic")
+        for stream in streams
+    )
+    fmt = data.get("format", {})
+    try:
+        duration = float(fmt.get("duration", 0.0))
+    except ValueError:
+        duration = 0.0
+    try:
+        bit_rate = int(fmt.get("bit_rate", 0))
+    except ValueError:
+        bit_rate = 0
+    return {
+        "container": fmt.get("format_name", ""),
+        "codec": audio[0].get("codec_name", ""),
+        "has_video": has_video,
+        "duration": duration,
+        "bit_rate": bit_rate,
+        "channels": int(audio[0].get("channels") or 2),
+    }
+
+def decode_pcm(input_file: str, sample_rate: int = 11025, seconds: float = 120.0, offset: float = 0.0) -> bytes:
+    """
+    Decodifica como máximo `seconds` segundos de audio (a partir de `offset`)
+    a PCM mono de 16 bits con FFmpeg. La ventana acotada limita el trabajo y
+    la memoria a ~2 bytes por muestra, sea cual sea la duración del archivo.
+    """
+    command = [
+        "ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error",
+        "-ss", f"{offset:.3f}", "-t", f"{seconds:.3f}", "-i", str(input_file),
+        "-vn", "-ac", "1", "-ar", str(sample_rate), "-f", "s16le", "pipe:1",
+    ]
+    result = subprocess.run(command, capture_output=True, check=False)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.decode(errors="replace").strip() or f"FFmpeg terminó con código {result.returncode}")
+    return result.stdout
+
+def analysis_channels(info: Optional[dict]) -> int:
+    """
+    Canales con los que se mide la sonoridad: el mono se mide como mono (un
+    mono duplicado en estéreo sonaría 3 dB más fuerte) y el multicanal se
+    reduce a estéreo.
+    """
+    return 1 if info and info.get("channels") == 1 else 2
+
+def analyze_loudness(input_file: str, buffer_size: int = DEFAULT_BUFFER_SIZE):
+    """
+    Mide la sonoridad integrada (EBU R128) y el pico de un archivo
+    decodificándolo en flujo a PCM de 48 kHz; la memoria no depende de su
+    duración. Retorna un `core.loudness.LoudnessResult`.
+    """
+    from core.loudness import SAMPLE_RATE, LoudnessMeter
+
+    meter = LoudnessMeter(analysis_channels(probe(input_file)))
+    command = [
+        "ffmpeg", "-hide_banner", "-nostdin", "-loglevel", "error", "-i", str(input_file),
+        "-vn", "-f", "f32le", "-ac", str(meter.channels), "-ar", str(SAMPLE_RATE), "pipe:1",
+    ]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=0)
+    stderr = []
+    reader = threading.Thread(target=lambda: stderr.append(process.stderr.read()), daemon=True)
+    reader.start()
+    try:
+        while True:
+            chunk = process.stdout.read(buffer_size)
+            if not chunk:
+                break
+            meter.feed(chunk)
+        returncode = process.wait()
+        reader.join()
+    except BaseException:
+        process.kill()
+        process.wait()
+        raise
+    if returncode != 0:
+        detail = b"".join(stderr).decode("utf-8", "replace").strip()
+        raise RuntimeError(detail or f"FFmpeg terminó con código {returncode}")
+    return meter.result()
+
+def plan_conversion(info: Optional[dict], target: str = "mp3") -> ConversionPlan:
+    """
+    Decide la acción a partir del resultado de `probe`. Con `target='mp3'` solo
+    se evita la recodificación si el audio ya es MP3; con `target='auto'` se
+    conserva cualquier códec conocido en su contenedor natural.
+    """
+    if info is None:
+        return ConversionPlan("transcode", ".mp3", "mp3")
+    codec = info["codec"]
+    if target == "mp3":
+        native = _NATIVE_CONTAINERS["mp3"] if codec == "mp3" else None
+    else:
+        native = _NATIVE_CONTAINERS.get(codec)
+    if native is None:
+        return ConversionPlan("transcode", ".mp3", "mp3")
+
+    extension, muxer = native
+    if not info["has_video"] and _CONTAINER_FAMILY[muxer] in info["container"].split(","):
+        return ConversionPlan("rename", extension, muxer)
+    return ConversionPlan("remux", extension, muxer)
+
+def _remux(input_file: str, output_path: Path, muxer: str):
+    """Copia el primer stream de audio a otro contenedor sin recodificarlo."""
+    part = output_path.with_name(output_path.name + ".part")
+    command = [
+        "ffmpeg", "-hide_banner", "-loglevel", "error", "-nostdin", "-y",
+        "-i", input_file, "-map", "0:a:0", "-c:a", "copy", "-f", muxer, str(part),
+    ]
+    result = subprocess.run(command, capture_output=True)
+    if result.returncode != 0:
+        if part.exists():
+            part.unlink()
+        raise RuntimeError(f"FFmpeg falló al remultiplexar: {result.stderr.decode('utf-8', 'replace').strip()}")
+    os.replace(part, output_path)
+
+def _copy(input_file: str, output_path: Path):
+    """Coloca el archivo en la salida sin tocar su contenido (enlace duro si es posible)."""
+    part = output_path.with_name(output_path.name + ".part")
+    if part.exists():
+        part.unlink()
+    try:
+        os.link(input_file, part)
+    except OSError:
+        shutil.copyfile(input_file, part)
+    os.replace(part, output_path)
+
+def convert_file(input_file: str, output_dir: str, target: str = "mp3", buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 force: bool = False, replaygain: bool = False, stem: Optional[str] = None) -> dict:
+    """
+    Convierte un archivo eligiendo la acción más barata (ver `plan_conversion`).
+    Con `replaygain`, mide la sonoridad (en la misma pasada si se recodifica)
+    y la escribe como etiquetas ReplayGain en la salida. `stem` fija el
+    nombre de salida (sin extensión) en lugar del de la entrada.
+    Las salidas al día se detectan por mtime antes de analizar la entrada,
+    así que una nueva ejecución sobre archivos ya convertidos no lanza ffprobe.
+    Retorna {'output', 'action', 'codec', 'container', 'duration', 'skipped', 'stats'}.
+    """
+    if not force:
+        extension = ".mp3" if target == "mp3" else _EXPECTED_EXTENSIONS.get(Path(input_file).suffix.lower(), ".mp3")
+        expected = output_path_for(input_file, output_dir, extension, stem)
+        if is_up_to_date(input_file, str(expected)):
+            return {'output': str(expected), 'action': None, 'codec': None, 'container': None, 'duration': 0.0,
+                    'skipped': True, 'stats': StreamStats()}
+
+    info = probe(input_file)
+    plan = plan_conversion(info, target)
+    output_path = output_path_for(input_file, output_dir, plan.extension, stem)
+    decision = {
+        'output': str(output_path),
+        'action': plan.action,
+        'codec': info["codec"] if info else None,
+        'container': info["container"] if info else None,
+        'duration': info["duration"] if info else 0.0,
+        'skipped': False,
+        'stats': StreamStats(),
+    }
+
+    if not force and is_up_to_date(input_file, str(output_path)):
+        decision['skipped'] = True
+        return decision
+
+    if os.path.abspath(input_file) == os.path.abspath(output_path):
+        pass
+    elif plan.action == "rename":
+        _copy(input_file, output_path)
+    elif plan.action == "remux":
+        _remux(input_file, output_path, plan.muxer)
+    else:
+        decision['stats'] = _transcode(input_file, output_path, buffer_size=buffer_size,
+                                       analyze=replaygain, channels=analysis_channels(info))
+
+    if replaygain:
+        stats = decision['stats']
+        if stats.loudness is None:
+            # Sin recodificar no hubo decodificación: se analiza aparte
+            stats.loudness = analyze_loudness(str(output_path), buffer_size=buffer_size)
+        id3_tagger.write_replaygain(str(output_path), stats.loudness.gain(), stats.loudness.peak)
+    return decision
+
+def normalize_container(file_path: str) -> Tuple[str, str]:
+    """
+    Corrige en el sitio un archivo descargado cuyo nombre no refleja su
+    contenido (p. ej. AAC en MP4 o Opus en WebM guardados como '.mp3'):
+    lo renombra o lo remultiplexa a su contenedor natural, nunca lo recodifica.
+    Retorna (ruta final, acción).
+    """
+    info = probe(file_path)
+    plan = plan_conversion(info, target="auto")
+    if plan.action == "transcode":
+        # Códec desconocido: se deja tal cual para no gastar CPU en la descarga
+        return file_path, "none"
+
+    output_path = Path(file_path).with_suffix(plan.extension)
+    if plan.action == "rename":
+        if str(output_path) != file_path:
+            os.replace(file_path, output_path)
+    else:
+        _remux(file_path, output_path, plan.muxer)
+        if str(output_path) != file_path:
+            os.remove(file_path)
+    return str(output_path), plan.action
+
+def convert_to_mp3(input_file: str, output_dir: str, target: str = "mp3") -> Optional[str]:
     """
     Convierte un archivo de audio o video a formato MP3.
-    Requiere la instalación de FFmpeg.
+    Requiere la instalación de FFmpeg. Retorna la ruta resultante o None si falla.
     """
     if not os.path.exists(input_file):
         console.log(f"[bold red]❌ Error: El archivo de entrada no existe: {input_file}[/bold red]")
-        return
-    
-    file_name = Path(input_file).stem
-    output_path = Path(output_dir) / f"{file_name}.mp3"
+        return None
 
     try:
-        console.log(f"  [bold]Convirtiendo:[/bold] {os.path.basename(input_file)} a MP3...")
-        # Detecta automáticamente el formato de entrada
-        audio = AudioSegment.from_file(input_file)
-        audio.export(output_path, format="mp3")
-        console.log(f"  [bold green]✅ Conversión completada:[/bold green] {output_path.name}")
+        console.log(f"  [bold]Convirtiendo:[/bold] {os.path.basename(input_file)}...")
+        decision = convert_file(input_file, output_dir, target=target, force=True)
+        console.log(f"  [bold green]✅ Conversión completada ({ACTION_LABELS[decision['action']]}):[/bold green] {Path(decision['output']).name}")
+        return decision['output']
     except Exception as e:
         console.log(f"  [bold red]❌ Error durante la conversión:[/bold red] {e}")
-        console.log("[bold yellow]  Asegúrate de que FFmpeg esté instalado y en tu PATH.[/bold yellow]")
\ No newline at end of file
+        console.log("[bold yellow]  Asegúrate de que FFmpeg esté instalado y en tu PATH.[/bold yellow]")
+        return None
+
+def convert_job(input_file: str, output_dir: str, force: bool = False, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                target: str = "mp3", replaygain: bool = False, stem: Optional[str] = None) -> dict:
+    """
+    Unidad de trabajo para el modo por lotes: se ejecuta en un proceso del
+    pool, no escribe en la consola y nunca lanza excepciones.
+    Retorna un diccionario con 'input', 'output', 'status' ('ok', 'skipped'
+    o 'error'), 'action', 'codec', 'elapsed', 'duration', 'peak_buffered',
+    'peak_rss', 'loudness' (LUFS, con `replaygain`) y 'error'.
+    """
+    result = {'input': input_file, 'output': None, 'status': 'ok', 'action': None, 'codec': None, 'elapsed': 0.0,
+              'duration': 0.0, 'peak_buffered': 0, 'peak_rss': 0, 'loudness': None, 'error': None}
+
+    started = time.perf_counter()
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        decision = convert_file(input_file, output_dir, target=target, buffer_size=buffer_size, force=force,
+                                replaygain=replaygain, stem=stem)
+        stats = decision['stats']
+        result.update({
+            'output': decision['output'],
+            'action': decision['action'],
+            'codec': decision['codec'],
+            'status': 'skipped' if decision['skipped'] else 'ok',
+            'duration': stats.duration or decision['duration'],
+            'peak_buffered': stats.peak_buffered,
+            'peak_rss': stats.peak_rss,
+            'loudness': stats.loudness.integrated if stats.loudness is not None else None,
+        })
+    except Exception as e:
+        result['status'] = 'error'
+        result['error'] = str(e)
+    result['elapsed'] = time.perf_counter() - started
+    return result
@@ -0,0 +1,229 @@
+# src/core/cache.py
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+# Valores por defecto, configurables con variables de entorno.
+DEFAULT_TTL = int(os.environ.get("MUSIC_CLI_RESOLUTION_TTL", 30 * 24 * 3600))
+DEFAULT_MAX_ENTRIES = int(os.environ.get("MUSIC_CLI_RESOLUTION_MAX", 50_000))
+# Las búsquedas cambian con frecuencia: caché corta y pequeña.
+SEARCH_TTL = int(os.environ.get("MUSIC_CLI_SEARCH_TTL", 15 * 60))
+SEARCH_MAX_ENTRIES = int(os.environ.get("MUSIC_CLI_SEARCH_MAX", 2_000))
+# Los manifiestos de streams llevan URLs firmadas que caducan en horas; el TTL es
+# solo un tope, cada entrada se descarta antes si caduca su URL.
+MANIFEST_TTL = int(os.environ.get("MUSIC_CLI_MANIFEST_TTL", 6 * 3600))
+MANIFEST_MAX_ENTRIES = int(os.environ.get("MUSIC_CLI_MANIFEST_MAX", 20_000))
+
+_shared = None
+_shared_search = None
+_shared_manifests = None
+_shared_lock = threading.Lock()
+
+
+def default_cache_dir() -> Path:
+    """Directorio de caché del usuario (`MUSIC_CLI_CACHE_DIR` o `~/.cache/music_downloader`)."""
+    base = os.environ.get("MUSIC_CLI_CACHE_DIR") or os.path.join(
+        os.environ.get("XDG_CACHE_HOME") or os.path.join(Path.home(), ".cache"), "music_downloader"
+    )
+    path = Path(base)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def normalize(text: str) -> str:
+    """Texto en minúsculas, sin signos de puntuación y con espacios simples."""
+    normalized = "".join(c if c.isalnum() else " " for c in text.lower())
+    return " ".join(normalized.split())
+
+
+def query_key(artist: str, title: str) -> str:
+    """Clave normalizada para una búsqueda 'artista - título'."""
+    return "query:" + normalize(f"{artist} - {title}")
+
+
+def search_key(source_name: str, query: str) -> str:
+    """Clave de la caché de búsquedas para una fuente y una consulta."""
+    return f"search:{normalize(source_name)}:{normalize(query)}"
+
+
+def manifest_key(source_id: str) -> str:
+    """Clave de la caché de manifiestos de streams para una pista ('youtube:<id>')."""
+    return f"manifest:{source_id}"
+
+
+class ResolutionCache:
+    """
+    Caché persistente (SQLite) de resoluciones de pistas, por ejemplo
+    'spotify:<track_id>' → URL de YouTube elegida.
+
+    Las entradas caducan tras `ttl` segundos y, al superar `max_entries`, se
+    desalojan las menos usadas recientemente (LRU). Las entradas fijadas
+    (`pin`) no caducan ni se desalojan.
+    """
+
+    def __init__(self, db_path: str, ttl: int = DEFAULT_TTL, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.db_path = str(db_path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS resolutions (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                pinned INTEGER NOT NULL DEFAULT 0
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS resolutions_lru ON resolutions (pinned, last_access)")
+        # Contadores acumulados entre ejecuciones (los atributos hits/misses son de la sesión)
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.executemany(
+            "INSERT OR IGNORE INTO counters (name, value) VALUES (?, 0)", [("hits",), ("misses",), ("evictions",)]
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at, pinned FROM resolutions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self._count("misses")
+                self._conn.commit()
+                return None
+            value, created_at, pinned = row
+            if not pinned and self.ttl and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM resolutions WHERE key = ?", (key,))
+                self._count("misses")
+                self._conn.commit()
+                return None
+            self._conn.execute("UPDATE resolutions SET last_access = ? WHERE key = ?", (now, key))
+            self._count("hits")
+            self._conn.commit()
+        return json.loads(value)
+
+    def contains(self, key: str) -> bool:
+        """
+        True si hay una entrada vigente para `key`. A diferencia de `get`, no
+        cuenta aciertos ni fallos ni actualiza su uso (LRU): sirve para
+        mostrar el estado de la caché sin alterarlo.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT created_at, pinned FROM resolutions WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return False
+        created_at, pinned = row
+        return bool(pinned) or not self.ttl or time.time() - created_at <= self.ttl
+
+    def _count(self, name: str, amount: int = 1):
+        setattr(self, name, getattr(self, name) + amount)
+        self._conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (amount, name))
+
+    def set(self, key: str, value: Any):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                """INSERT INTO resolutions (key, value, created_at, last_access) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(key) DO UPDATE SET value = excluded.value,
+                       created_at = excluded.created_at, last_access = excluded.last_access""",
+                (key, json.dumps(value), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM resolutions").fetchone()
+        excess = count - self.max_entries
+        if excess > 0:
+            cursor = self._conn.execute(
+                """DELETE FROM resolutions WHERE key IN (
+                       SELECT key FROM resolutions WHERE pinned = 0 ORDER BY last_access LIMIT ?)""",
+                (excess,),
+            )
+            self._count("evictions", cursor.rowcount)
+
+    def pin(self, key: str, pinned: bool = True) -> bool:
+        """Fija (o libera) una entrada; retorna False si no existe."""
+        with self._lock:
+            cursor = self._conn.execute("UPDATE resolutions SET pinned = ? WHERE key = ?", (int(pinned), key))
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def invalidate(self, key: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM resolutions WHERE key = ?", (key,))
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def clear(self, include_pinned: bool = False) -> int:
+        with self._lock:
+            if include_pinned:
+                cursor = self._conn.execute("DELETE FROM resolutions")
+            else:
+                cursor = self._conn.execute("DELETE FROM resolutions WHERE pinned = 0")
+            self._conn.commit()
+        return cursor.rowcount
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, pinned = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(pinned), 0) FROM resolutions"
+            ).fetchone()
+            totals = dict(self._conn.execute("SELECT name, value FROM counters"))
+        lookups = totals["hits"] + totals["misses"]
+        return {
+            "entries": count,
+            "pinned": pinned,
+            "hits": totals["hits"],
+            "misses": totals["misses"],
+            "hit_ratio": totals["hits"] / lookups if lookups else 0.0,
+            "evictions": totals["evictions"],
+            "session_hits": self.hits,
+            "session_misses": self.misses,
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+        }
+
+
+def get_resolution_cache() -> ResolutionCache:
+    """Instancia compartida por todo el proceso (fuentes y comandos)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ResolutionCache(str(default_cache_dir() / "resolutions.sqlite3"))
+        return _shared
+
+
+def get_search_cache() -> ResolutionCache:
+    """Caché de resultados de búsqueda por fuente, con TTL corto, compartida por el proceso."""
+    global _shared_search
+    with _shared_lock:
+        if _shared_search is None:
+            _shared_search = ResolutionCache(
+                str(default_cache_dir() / "searches.sqlite3"), ttl=SEARCH_TTL, max_entries=SEARCH_MAX_ENTRIES
+            )
+        return _shared_search
+
+
+def get_manifest_cache() -> ResolutionCache:
+    """Caché de manifiestos de streams por video, compartida por el proceso."""
+    global _shared_manifests
+    with _shared_lock:
+        if _shared_manifests is None:
+            _shared_manifests = ResolutionCache(
+                str(default_cache_dir() / "manifests.sqlite3"), ttl=MANIFEST_TTL, max_entries=MANIFEST_MAX_ENTRIES
+            )
+        return _shared_manifests
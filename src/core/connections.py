@@ -0,0 +1,387 @@
+# src/core/connections.py
+
+import importlib.util
+import os
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional
+from urllib.parse import urlsplit
+
+# Backends opcionales, del más al menos capaz: httpx (HTTP/2 si está `h2`),
+# urllib3 (keep-alive) y, como último recurso, urllib sin reutilización.
+try:
+    import httpx
+except ImportError:
+    httpx = None
+# httpx solo negocia HTTP/2 si el paquete `h2` está instalado
+HTTP2 = httpx is not None and importlib.util.find_spec("h2") is not None
+try:
+    import urllib3
+except ImportError:
+    urllib3 = None
+
+# Conexiones simultáneas por host y caché de DNS (0 = desactivada), configurables con variables de entorno.
+PER_HOST = int(os.environ.get("MUSIC_CLI_HTTP_PER_HOST", 8))
+DNS_TTL = float(os.environ.get("MUSIC_CLI_DNS_TTL", 0))
+BACKEND = os.environ.get("MUSIC_CLI_HTTP_BACKEND", "")
+DEFAULT_TIMEOUT = 30.0
+
+# `Accept-Encoding: identity` mantiene los tamaños y rangos en bytes reales, como urllib.
+HEADERS = {"User-Agent": "Mozilla/5.0", "accept-language": "en-US,en", "Accept-Encoding": "identity"}
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+@dataclass
+class PoolStats:
+    """Contadores de reutilización de conexiones del pool compartido."""
+    backend: str = ""
+    requests: int = 0
+    connections: int = 0
+    handshake_time: float = 0.0
+    dns_hits: int = 0
+    dns_misses: int = 0
+
+    @property
+    def reuse_ratio(self) -> float:
+        """Fracción de peticiones servidas por una conexión ya abierta."""
+        return max(0, self.requests - self.connections) / self.requests if self.requests else 0.0
+
+    @property
+    def mean_handshake(self) -> float:
+        """Tiempo medio de conexión TCP + TLS por conexión nueva (segundos)."""
+        return self.handshake_time / self.connections if self.connections else 0.0
+
+
+class Response:
+    """
+    Respuesta HTTP común a todos los backends, compatible con lo que usan
+    `core.transfer` y pytube de `urlopen`: `status`, `headers`, `info()`,
+    `read(n)` y uso como gestor de contexto.
+    """
+
+    def __init__(self, status: int, headers, read: Callable[[Optional[int]], bytes], close: Callable[[], None]):
+        self.status = status
+        self.headers = headers
+        self._read = read
+        self._close = close
+        self._closed = False
+
+    def getcode(self) -> int:
+        return self.status
+
+    def info(self):
+        return self.headers
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        try:
+            return self._read(amt)
+        except Exception as e:
+            raise _network_error(e) from e
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _network_error(error: Exception) -> Exception:
+    """Traduce los errores de red de httpx/urllib3 a ConnectionError/TimeoutError (OSError)."""
+    if isinstance(error, OSError):
+        return error
+    reason = getattr(error, "reason", None)
+    if "Timeout" in type(error).__name__ or "Timeout" in type(reason).__name__:
+        return TimeoutError(str(error))
+    return ConnectionError(str(error))
+
+
+def _http_error(url: str, status: int, reason: str, headers) -> urllib.error.HTTPError:
+    return urllib.error.HTTPError(url, status, reason or f"HTTP {status}", headers, None)
+
+
+class _Urllib3Backend:
+    name = "urllib3"
+
+    def __init__(self, pool: "HttpPool"):
+        self.manager = urllib3.PoolManager(num_pools=64, maxsize=pool.per_host, block=True)
+        # Las clases de pool se sustituyen por versiones que miden cada conexión nueva
+        self.manager.pool_classes_by_scheme = {
+            "http": _timed_pool(urllib3.HTTPConnectionPool, pool),
+            "https": _timed_pool(urllib3.HTTPSConnectionPool, pool),
+        }
+        self.retries = urllib3.Retry(total=None, connect=0, read=0, status=0, redirect=5, raise_on_status=False)
+
+    def open(self, method, url, headers, body, timeout, preload) -> Response:
+        try:
+            response = self.manager.request(
+                method, url, headers=headers, body=body, preload_content=preload,
+                timeout=urllib3.Timeout(connect=timeout, read=timeout), retries=self.retries,
+            )
+        except urllib3.exceptions.HTTPError as e:
+            raise _network_error(e) from e
+        if response.status >= 400:
+            # El cuerpo del error es pequeño: se consume para poder reutilizar la conexión
+            response.drain_conn()
+            response.release_conn()
+            raise _http_error(url, response.status, response.reason, response.headers)
+
+        if preload:
+            body_bytes = response.data
+            buffer = [body_bytes]
+            response.release_conn()
+            return Response(response.status, response.headers, lambda amt: _take(buffer, amt), lambda: None)
+
+        finished = [False]
+
+        def read(amt: Optional[int]) -> bytes:
+            data = response.read(amt)
+            if amt is None or not data:
+                finished[0] = True
+            return data
+
+        def close():
+            # Solo vuelve al pool una conexión cuyo cuerpo se leyó entero; si no, se cierra
+            if not finished[0]:
+                response.close()
+            response.release_conn()
+
+        return Response(response.status, response.headers, read, close)
+
+
+def _take(buffer: list, amt: Optional[int]) -> bytes:
+    """Lee de un cuerpo ya descargado (lista con un único `bytes`)."""
+    data = buffer[0]
+    if amt is None or amt >= len(data):
+        buffer[0] = b""
+        return data
+    buffer[0] = data[amt:]
+    return data[:amt]
+
+
+def _timed_pool(pool_cls, pool: "HttpPool"):
+    """Subclase de un pool de urllib3 cuyas conexiones registran su tiempo de conexión (TCP + TLS)."""
+    base = pool_cls.ConnectionCls
+
+    class TimedConnection(base):
+        def connect(self):
+            started = time.perf_counter()
+            super().connect()
+            pool._record_connection(time.perf_counter() - started)
+
+    return type(pool_cls.__name__, (pool_cls,), {"ConnectionCls": TimedConnection})
+
+
+class _HttpxBackend:
+    name = "httpx"
+
+    def __init__(self, pool: "HttpPool"):
+        self.pool = pool
+        self.client = httpx.Client(
+            http2=HTTP2, follow_redirects=True,
+            limits=httpx.Limits(max_connections=None, max_keepalive_connections=pool.per_host * 8),
+        )
+        self._local = threading.local()
+        # httpx no limita por host: un semáforo por host, liberado al cerrar la respuesta
+        self._slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._slots_lock = threading.Lock()
+
+    def _slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._slots_lock:
+            if host not in self._slots:
+                self._slots[host] = threading.BoundedSemaphore(self.pool.per_host)
+            return self._slots[host]
+
+    def _trace(self, event: str, info: dict):
+        # Eventos de httpcore: se mide desde el inicio de TCP hasta el final de TLS
+        if event == "connection.connect_tcp.started":
+            self._local.started = time.perf_counter()
+        elif event == "connection.connect_tcp.complete":
+            self.pool._record_connection(time.perf_counter() - self._local.started)
+            self._local.started = time.perf_counter()
+        elif event == "connection.start_tls.complete":
+            self.pool._record_connection(time.perf_counter() - self._local.started, new=False)
+
+    def open(self, method, url, headers, body, timeout, preload) -> Response:
+        request = self.client.build_request(
+            method, url, headers=headers, content=body, timeout=timeout, extensions={"trace": self._trace}
+        )
+        slot = self._slot(url)
+        slot.acquire()
+        try:
+            response = self.client.send(request, stream=True)
+            if preload:
+                response.read()
+        except httpx.HTTPError as e:
+            slot.release()
+            raise _network_error(e) from e
+        if response.status_code >= 400 or preload:
+            response.close()
+            slot.release()
+        if response.status_code >= 400:
+            raise _http_error(url, response.status_code, response.reason_phrase, response.headers)
+
+        if preload:
+            buffer = [response.content]
+            return Response(response.status_code, response.headers, lambda amt: _take(buffer, amt), lambda: None)
+
+        chunks = response.iter_bytes()
+        buffer = [b""]
+
+        def read(amt: Optional[int]) -> bytes:
+            if amt is None:
+                data = buffer[0] + b"".join(chunks)
+                buffer[0] = b""
+                return data
+            while len(buffer[0]) < amt:
+                chunk = next(chunks, b"")
+                if not chunk:
+                    break
+                buffer[0] += chunk
+            return _take(buffer, amt)
+
+        def close():
+            response.close()
+            slot.release()
+
+        return Response(response.status_code, response.headers, read, close)
+
+
+class _UrllibBackend:
+    name = "urllib"
+
+    def __init__(self, pool: "HttpPool"):
+        self.pool = pool
+
+    def open(self, method, url, headers, body, timeout, preload) -> Response:
+        # Sin pool: cada petición abre su propia conexión
+        started = time.perf_counter()
+        response = urllib.request.urlopen(urllib.request.Request(url, data=body, headers=headers, method=method), timeout=timeout)
+        self.pool._record_connection(time.perf_counter() - started)
+        return Response(response.status, response.headers, lambda amt: response.read(amt), response.close)
+
+
+_BACKENDS = {"httpx": (httpx, _HttpxBackend), "urllib3": (urllib3, _Urllib3Backend), "urllib": (True, _UrllibBackend)}
+
+
+class HttpPool:
+    """
+    Pool de conexiones HTTP persistentes compartido por todas las fuentes.
+    Reutiliza las conexiones (keep-alive, HTTP/2 con httpx + h2) en lugar de
+    repetir el handshake TCP/TLS en cada petición, limita las conexiones
+    simultáneas por host y acumula estadísticas de reutilización.
+    """
+
+    def __init__(self, per_host: int = PER_HOST, backend: str = BACKEND, timeout: float = DEFAULT_TIMEOUT):
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        name = backend or next(name for name, (module, _) in _BACKENDS.items() if module)
+        module, backend_cls = _BACKENDS[name]
+        if not module:
+            raise ValueError(f"El backend HTTP '{name}' no está instalado.")
+        self.stats = PoolStats(backend=name + (" (HTTP/2)" if name == "httpx" and HTTP2 else ""))
+        self._backend = backend_cls(self)
+
+    def _record_connection(self, seconds: float, new: bool = True):
+        with self._lock:
+            self.stats.connections += int(new)
+            self.stats.handshake_time += seconds
+
+    def request(self, method: str, url: str, headers: Optional[Dict[str, str]] = None, body: Optional[bytes] = None,
+                timeout: Optional[float] = None, preload: bool = False) -> Response:
+        """
+        Envía una petición y retorna la respuesta. Con `preload`, el cuerpo se
+        lee completo y la conexión vuelve al pool de inmediato; si no, vuelve
+        al cerrar la respuesta. Los códigos >= 400 lanzan `urllib.error.HTTPError`.
+        """
+        merged = dict(HEADERS)
+        merged.update(headers or {})
+        with self._lock:
+            self.stats.requests += 1
+        return self._backend.open(method, url, merged, body, timeout or self.timeout, preload)
+
+    def get(self, url: str, **kwargs) -> Response:
+        return self.request("GET", url, **kwargs)
+
+    def requests_session(self):
+        """
+        Sesión de `requests` (la usa spotipy) con conexiones persistentes,
+        límite por host y las mismas estadísticas que el pool.
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        pool = self
+
+        class PooledAdapter(HTTPAdapter):
+            def init_poolmanager(self, *args, **kwargs):
+                super().init_poolmanager(*args, **kwargs)
+                self.poolmanager.pool_classes_by_scheme = {
+                    "http": _timed_pool(urllib3.HTTPConnectionPool, pool),
+                    "https": _timed_pool(urllib3.HTTPSConnectionPool, pool),
+                }
+
+            def send(self, request, *args, **kwargs):
+                with pool._lock:
+                    pool.stats.requests += 1
+                return super().send(request, *args, **kwargs)
+
+        session = requests.Session()
+        adapter = PooledAdapter(pool_connections=16, pool_maxsize=self.per_host, pool_block=True)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+
+def enable_dns_cache(ttl: float, stats: Optional[PoolStats] = None):
+    """
+    Memoriza las resoluciones de `socket.getaddrinfo` durante `ttl` segundos
+    en todo el proceso (también para las librerías que no usan el pool).
+    """
+    if getattr(socket.getaddrinfo, "_cached", False):
+        return
+    resolve = socket.getaddrinfo
+    cache: Dict[tuple, tuple] = {}
+    lock = threading.Lock()
+
+    def getaddrinfo(*args, **kwargs):
+        key = args + tuple(sorted(kwargs.items()))
+        now = time.monotonic()
+        with lock:
+            entry = cache.get(key)
+        if entry is not None and entry[0] > now:
+            if stats is not None:
+                stats.dns_hits += 1
+            return entry[1]
+        result = resolve(*args, **kwargs)
+        with lock:
+            cache[key] = (now + ttl, result)
+        if stats is not None:
+            stats.dns_misses += 1
+        return result
+
+    getaddrinfo._cached = True
+    socket.getaddrinfo = getaddrinfo
+
+
+def get_pool() -> HttpPool:
+    """Pool compartido por todo el proceso (fuentes, transferencias y spotipy)."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = HttpPool()
+            if DNS_TTL > 0:
+                enable_dns_cache(DNS_TTL, _shared.stats)
+        return _shared
@@ -0,0 +1,87 @@
+# src/core/covers.py
+
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Optional
+
+from core import connections, metrics
+from core.cache import ResolutionCache, default_cache_dir
+
+# Las URLs de portada de Spotify no cambian: el índice URL → imagen puede durar meses.
+COVER_TTL = int(os.environ.get("MUSIC_CLI_COVER_TTL", 180 * 24 * 3600))
+COVER_MAX_ENTRIES = int(os.environ.get("MUSIC_CLI_COVER_MAX", 20_000))
+# Extensión de la imagen según sus primeros bytes (las portadas son JPEG casi siempre).
+_SIGNATURES = ((b"\x89PNG", ".png"), (b"\xff\xd8\xff", ".jpg"))
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def image_extension(data: bytes) -> str:
+    for signature, extension in _SIGNATURES:
+        if data.startswith(signature):
+            return extension
+    return ".jpg"
+
+
+class CoverCache:
+    """
+    Caché de portadas direccionada por contenido: cada imagen se guarda una
+    sola vez como `<sha256[:2]>/<sha256>.<ext>`, y un índice URL → archivo
+    evita volver a descargarla. Todas las pistas de un álbum comparten la
+    URL de su portada, así que se descarga una vez por álbum; si llegan
+    varias a la vez, solo una la descarga y las demás esperan su resultado.
+    """
+
+    def __init__(self, root: Optional[str] = None, pool: Optional[connections.HttpPool] = None):
+        self.root = Path(root or default_cache_dir() / "covers")
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.index = ResolutionCache(str(self.root / "index.sqlite3"), ttl=COVER_TTL, max_entries=COVER_MAX_ENTRIES)
+        self.pool = pool
+        self.downloads = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, threading.Lock] = {}
+
+    def get(self, url: Optional[str]) -> Optional[str]:
+        """Ruta local de la portada de `url`, descargándola solo si no está en caché. Lanza si la descarga falla."""
+        if not url:
+            return None
+        with self._lock:
+            lock = self._inflight.setdefault(url, threading.Lock())
+        with lock:
+            cached = self.index.get(url)
+            if cached and os.path.exists(cached['path']):
+                return cached['path']
+            pool = self.pool or connections.get_pool()
+            with metrics.span("fetch", item=url) as current:
+                with pool.get(url, preload=True) as response:
+                    data = response.read()
+                current.bytes = len(data)
+            path = self.store(data)
+            self.index.set(url, {'path': path})
+            with self._lock:
+                self.downloads += 1
+            return path
+
+    def store(self, data: bytes) -> str:
+        """Guarda la imagen bajo su hash (si no estaba ya) y retorna su ruta."""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.root / digest[:2] / f"{digest}{image_extension(data)}"
+        if not path.exists():
+            path.parent.mkdir(exist_ok=True)
+            part = path.with_name(f"{path.name}.{threading.get_ident()}.part")
+            with open(part, "wb") as f:
+                f.write(data)
+            os.replace(part, path)
+        return str(path)
+
+
+def get_cover_cache() -> CoverCache:
+    """Caché de portadas compartida por todo el proceso."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = CoverCache()
+        return _shared
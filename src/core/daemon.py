@@ -0,0 +1,244 @@
+# src/core/daemon.py
+
+import http.server
+import json
+import os
+import re
+import secrets
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Optional
+from urllib.parse import parse_qs, urlsplit
+
+from core.cache import default_cache_dir
+from core.jobqueue import STATUSES, Job, JobQueue
+
+# Dirección por defecto de la API local (solo loopback).
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = int(os.environ.get("MUSIC_CLI_DAEMON_PORT", 8765))
+# Cada cuánto se revisa la cola por si otro proceso encoló trabajos directamente.
+POLL_INTERVAL = 1.0
+
+
+class PermanentError(Exception):
+    """
+    Fallo de un trabajo que no se resuelve reintentando (URL no soportada,
+    4xx distinto de 429...): el trabajo se marca fallido sin agotar sus intentos.
+    """
+    pass
+
+
+def state_path() -> Path:
+    """Archivo con la URL, el token y el PID del daemon en marcha."""
+    return default_cache_dir() / "daemon.json"
+
+
+def write_state(url: str, token: str):
+    """Publica la dirección y el token del daemon, legibles solo por el usuario."""
+    path = state_path()
+    part = path.with_suffix(".tmp")
+    fd = os.open(part, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump({"url": url, "token": token, "pid": os.getpid(), "started_at": time.time()}, f)
+    os.replace(part, path)
+
+
+def read_state() -> Optional[dict]:
+    try:
+        with open(state_path()) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def clear_state():
+    state = read_state()
+    if state and state.get("pid") == os.getpid():
+        try:
+            os.remove(state_path())
+        except OSError:
+            pass
+
+
+class Daemon:
+    """
+    Ejecuta los trabajos de la cola con `workers` hilos. `runner(job)`
+    retorna el resultado del trabajo o lanza una excepción para que se
+    reintente (o se marque como fallido al agotar sus intentos, o al
+    instante si es un `PermanentError`). Los
+    recursos caros (proveedores, sesiones, pools) viven en el `runner` y se
+    reutilizan entre trabajos.
+    """
+
+    def __init__(self, queue: JobQueue, runner: Callable[[Job], dict], workers: int = 2,
+                 poll_interval: float = POLL_INTERVAL, on_event: Optional[Callable[[str, Job], None]] = None):
+        self.queue = queue
+        self.runner = runner
+        self.workers = max(1, workers)
+        self.poll_interval = poll_interval
+        self.on_event = on_event
+        self.started_at = time.time()
+        self.active: Dict[int, Job] = {}
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def start(self) -> int:
+        """Recupera los trabajos interrumpidos y arranca los hilos. Retorna cuántos se recuperaron."""
+        recovered = self.queue.recover()
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return recovered
+
+    def wake(self):
+        """Avisa a los hilos de que hay trabajo nuevo sin esperar al sondeo."""
+        self._wakeup.set()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Deja de reclamar trabajos y espera a que terminen los que están en curso."""
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _emit(self, event: str, job: Job):
+        if self.on_event is not None:
+            self.on_event(event, job)
+
+    def _work(self):
+        while not self._stop.is_set():
+            job = self.queue.claim()
+            if job is None:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+                continue
+            with self._lock:
+                self.active[job.id] = job
+            self._emit("start", job)
+            try:
+                result = self.runner(job)
+            except Exception as e:
+                retry = self.queue.fail(job.id, str(e), retry=not isinstance(e, PermanentError))
+                self._emit("retry" if retry else "failed", self.queue.get(job.id) or job)
+            else:
+                self.queue.complete(job.id, result)
+                self._emit("done", self.queue.get(job.id) or job)
+            finally:
+                with self._lock:
+                    self.active.pop(job.id, None)
+
+    def health(self) -> dict:
+        with self._lock:
+            active = sorted(self.active)
+        return {
+            "pid": os.getpid(),
+            "uptime": time.time() - self.started_at,
+            "workers": self.workers,
+            "active": active,
+            "counts": self.queue.counts(),
+        }
+
+
+class ApiServer:
+    """
+    API HTTP local del daemon (JSON, solo en loopback, con token):
+
+    - GET    /health            estado del daemon y conteo de la cola
+    - POST   /jobs              {"urls": [...], "output": "...", "priority": 0} → {"ids": [...]}
+    - GET    /jobs?status=&limit=   trabajos recientes
+    - GET    /jobs/<id>         un trabajo
+    - DELETE /jobs/<id>         cancela un trabajo pendiente
+
+    Con `accepts(url)`, POST /jobs rechaza (400, sin encolar nada) las
+    peticiones con alguna URL que ningún proveedor atiende.
+    """
+
+    def __init__(self, daemon: Daemon, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, token: Optional[str] = None,
+                 accepts: Optional[Callable[[str], bool]] = None):
+        self.daemon = daemon
+        self.accepts = accepts
+        self.token = token or secrets.token_urlsafe(24)
+        api = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                api._dispatch(self, "GET")
+
+            def do_POST(self):
+                api._dispatch(self, "POST")
+
+            def do_DELETE(self):
+                api._dispatch(self, "DELETE")
+
+        self._httpd = http.server.ThreadingHTTPServer((host, port), Handler)
+        self._httpd.daemon_threads = True
+        self.url = f"http://{host}:{self._httpd.server_port}"
+
+    def serve_forever(self):
+        self._httpd.serve_forever(poll_interval=0.2)
+
+    def shutdown(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _dispatch(self, handler, method: str):
+        if not secrets.compare_digest(handler.headers.get("Authorization", ""), f"Bearer {self.token}"):
+            # El cuerpo no se lee: la conexión no puede reutilizarse
+            handler.close_connection = True
+            return self._reply(handler, 401, {"error": "Token inválido"})
+        parsed = urlsplit(handler.path)
+        try:
+            length = int(handler.headers.get("Content-Length") or 0)
+            body = json.loads(handler.rfile.read(length) or b"{}") if length else {}
+            status, payload = self._route(method, parsed.path, parse_qs(parsed.query), body)
+        except (ValueError, KeyError, TypeError) as e:
+            status, payload = 400, {"error": str(e)}
+        self._reply(handler, status, payload)
+
+    def _route(self, method: str, path: str, query: dict, body: dict):
+        queue = self.daemon.queue
+        if path == "/health" and method == "GET":
+            return 200, self.daemon.health()
+        if path == "/jobs" and method == "POST":
+            urls = body["urls"]
+            if not urls or not all(isinstance(url, str) and url for url in urls):
+                raise ValueError("'urls' debe ser una lista de URLs")
+            unsupported = [url for url in urls if self.accepts is not None and not self.accepts(url)]
+            if unsupported:
+                raise ValueError(f"URL no soportada: {', '.join(unsupported)}")
+            output = os.path.abspath(body.get("output") or "./downloads")
+            ids = [queue.submit(url, output, int(body.get("priority", 0))) for url in urls]
+            self.daemon.wake()
+            return 201, {"ids": ids}
+        if path == "/jobs" and method == "GET":
+            status = query.get("status", [None])[0]
+            if status is not None and status not in STATUSES:
+                raise ValueError(f"Estado desconocido: {status}")
+            jobs = queue.list(status, int(query.get("limit", ["50"])[0]))
+            return 200, {"jobs": [job.to_dict() for job in jobs]}
+        match = re.fullmatch(r"/jobs/(\d+)", path)
+        if match and method == "GET":
+            job = queue.get(int(match.group(1)))
+            return (200, job.to_dict()) if job else (404, {"error": "No existe el trabajo"})
+        if match and method == "DELETE":
+            if queue.cancel(int(match.group(1))):
+                return 200, {"cancelled": True}
+            return 409, {"error": "El trabajo no está pendiente"}
+        return 404, {"error": "Ruta desconocida"}
+
+    def _reply(self, handler, status: int, payload: dict):
+        data = json.dumps(payload).encode("utf-8")
+        handler.send_response(status)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(data)))
+        handler.end_headers()
+        handler.wfile.write(data)
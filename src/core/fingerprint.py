@@ -0,0 +1,360 @@
+# src/core/fingerprint.py
+
+import os
+import sqlite3
+from dataclasses import dataclass
+from itertools import combinations
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from converters import audio_converter
+from core.organizer import FileEntry
+
+# Nombre del índice de huellas dentro de la biblioteca.
+INDEX_NAME = ".music_fingerprints.sqlite3"
+
+# Se incrementa cuando cambia el algoritmo: invalida las huellas guardadas.
+FINGERPRINT_VERSION = 2
+
+# Parámetros del análisis: audio mono a 11 025 Hz (hasta ~5,5 kHz, donde las
+# distintas codificaciones de una misma pista apenas difieren), tramas de 2048
+# muestras (~186 ms) con salto de 512 (~21,5 tramas/s) y una ventana acotada
+# de audio decodificado.
+SAMPLE_RATE = 11025
+FRAME_SIZE = 2048
+HOP_SIZE = 512
+WINDOW_SECONDS = 90.0
+MIN_FRAMES = 128
+BANDS = 16
+SILENCE_THRESHOLD = 1e-5
+NOISE_FLOOR = 1e-2
+# Segmentos de ~6 s del flujo espectral para el espectro de modulación (ritmo).
+MODULATION_SEGMENT = 128
+MODULATION_BINS = 16
+
+# SimHash de 128 bits dividido en 16 bandas de 8 bits para el LSH: dos pistas
+# son candidatas si coinciden por completo en al menos una banda. Con similitud
+# coseno s cada bit coincide con probabilidad p = 1 - acos(s)/π, y el par es
+# candidato con probabilidad 1 - (1 - p^8)^16: ≥ 0,998 con el umbral por
+# defecto (0,92), frente a ~0,61 con 8 bandas de 16 bits.
+HASH_BITS = 128
+LSH_BANDS = 16
+LSH_BAND_BITS = HASH_BITS // LSH_BANDS
+
+# Códecs sin pérdida, preferidos al recomendar qué copia conservar.
+LOSSLESS_CODECS = {'flac', 'alac', 'wavpack', 'ape', 'tta'}
+
+
+def _band_edges() -> np.ndarray:
+    """Límites (en bins de la FFT) de las bandas logarítmicas entre 60 Hz y 5 kHz."""
+    frequencies = np.geomspace(60.0, 5000.0, BANDS + 1)
+    return np.round(frequencies * FRAME_SIZE / SAMPLE_RATE).astype(int)
+
+
+def _band_matrix() -> np.ndarray:
+    """Matriz (bins × bandas) que suma la potencia espectral de cada banda."""
+    edges = _band_edges()
+    matrix = np.zeros((FRAME_SIZE // 2 + 1, BANDS), dtype=np.float32)
+    for band in range(BANDS):
+        low, high = edges[band], max(edges[band + 1], edges[band] + 1)
+        matrix[low:high, band] = 1.0
+    return matrix
+
+
+_WINDOW = np.hanning(FRAME_SIZE).astype(np.float32)
+_BANDS = _band_matrix()
+_TRIU = np.triu_indices(BANDS, k=1)
+FEATURES = BANDS + len(_TRIU[0]) + MODULATION_BINS
+# Hiperplanos aleatorios con semilla fija: la misma huella da siempre el mismo hash.
+_HYPERPLANES = np.random.default_rng(20240613).standard_normal((FEATURES, HASH_BITS)).astype(np.float32)
+
+
+@dataclass
+class Fingerprint:
+    path: str
+    size: int
+    mtime: float
+    duration: float
+    bit_rate: int
+    codec: str
+    vector: np.ndarray
+    simhash: int
+
+    def similarity(self, other: "Fingerprint") -> float:
+        """Similitud coseno entre huellas (los vectores están normalizados)."""
+        return float(np.dot(self.vector, other.vector))
+
+
+def _normalize(block: np.ndarray) -> np.ndarray:
+    block = block - block.mean()
+    norm = np.linalg.norm(block)
+    return block / norm if norm > 0 else block
+
+
+def compute_vector(samples: np.ndarray) -> Optional[np.ndarray]:
+    """
+    Huella espectral compacta de una señal mono (float32). Combina tres
+    descriptores independientes del volumen y de la alineación temporal:
+
+    - la forma media del espectro (timbre),
+    - la correlación entre bandas a lo largo del tiempo (arreglo e instrumentos),
+    - el espectro de modulación de la envolvente (ritmo y tempo).
+
+    Retorna un vector normalizado o None si no hay suficiente audio útil.
+    """
+    if len(samples) < FRAME_SIZE + MIN_FRAMES * HOP_SIZE:
+        return None
+    frames = np.lib.stride_tricks.sliding_window_view(samples, FRAME_SIZE)[::HOP_SIZE]
+
+    # Recorta el silencio inicial y final, que varía entre fuentes
+    active = np.flatnonzero(np.mean(frames ** 2, axis=1) > SILENCE_THRESHOLD)
+    if len(active) < MIN_FRAMES:
+        return None
+    frames = frames[active[0]:active[-1] + 1]
+
+    power = np.abs(np.fft.rfft(frames * _WINDOW, axis=1)) ** 2 @ _BANDS
+    # Suelo a -20 dB de la energía media: el ruido y los artefactos de
+    # compresión en las bandas casi vacías no deben pesar en la huella
+    bands = np.log10(power + NOISE_FLOOR * power.mean() + 1e-12)
+    # Restar la media de cada trama elimina la ganancia global
+    shape = bands - bands.mean(axis=1, keepdims=True)
+
+    timbre = shape.mean(axis=0)
+    correlation = np.nan_to_num(np.corrcoef(shape, rowvar=False))[_TRIU]
+
+    # Espectro de modulación del flujo espectral (ataques), promediado sobre
+    # segmentos solapados para que la resolución no dependa de la duración
+    flux = np.maximum(np.diff(bands, axis=0), 0.0).sum(axis=1)
+    if len(flux) < MODULATION_SEGMENT:
+        flux = np.pad(flux, (0, MODULATION_SEGMENT - len(flux)))
+    segments = np.lib.stride_tricks.sliding_window_view(flux, MODULATION_SEGMENT)[::MODULATION_SEGMENT // 2]
+    segments = segments - segments.mean(axis=1, keepdims=True)
+    modulation = np.abs(np.fft.rfft(segments, axis=1)).mean(axis=0)[1:]
+    modulation = np.log(modulation.reshape(MODULATION_BINS, -1).mean(axis=1) + 1e-9)
+    # Se elimina la pendiente común a toda la música: quedan los picos de tempo
+    position = np.arange(MODULATION_BINS)
+    rhythm = modulation - np.polyval(np.polyfit(position, modulation, 1), position)
+
+    vector = np.concatenate([_normalize(timbre), _normalize(correlation), _normalize(rhythm)])
+    return _normalize(vector).astype(np.float32)
+
+
+def simhash(vector: np.ndarray) -> int:
+    """SimHash por hiperplanos aleatorios: vectores cercanos difieren en pocos bits."""
+    bits = (vector @ _HYPERPLANES) > 0
+    return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+
+def lsh_keys(value: int) -> List[int]:
+    """Divide el SimHash en `LSH_BANDS` claves de `LSH_BAND_BITS` bits."""
+    mask = (1 << LSH_BAND_BITS) - 1
+    return [(value >> (band * LSH_BAND_BITS)) & mask for band in range(LSH_BANDS)]
+
+
+def fingerprint_file(path: str, window: float = WINDOW_SECONDS) -> dict:
+    """
+    Calcula la huella de un archivo decodificando como máximo `window`
+    segundos de audio. Pensada para ejecutarse en un pool de procesos: retorna
+    un diccionario serializable con 'error' en lugar de lanzar excepciones.
+    """
+    result = {'path': path, 'error': None}
+    try:
+        stat = os.stat(path)
+        info = audio_converter.probe(path) or {}
+        pcm = audio_converter.decode_pcm(path, SAMPLE_RATE, window)
+        samples = np.frombuffer(pcm, dtype='<i2').astype(np.float32) / 32768.0
+        vector = compute_vector(samples)
+        if vector is None:
+            result['error'] = "audio insuficiente para calcular la huella"
+            return result
+        result.update(
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            duration=info.get('duration', 0.0),
+            bit_rate=info.get('bit_rate', 0),
+            codec=info.get('codec', ''),
+            vector=vector.tobytes(),
+            simhash=simhash(vector),
+        )
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+class FingerprintIndex:
+    """
+    Índice persistente (SQLite) de huellas acústicas de una biblioteca, con
+    una tabla de cubetas LSH para encontrar candidatos a duplicado sin
+    comparar todos los pares. Las huellas se reutilizan mientras el tamaño y
+    el mtime del archivo no cambien.
+    """
+
+    def __init__(self, root: str):
+        self._conn = sqlite3.connect(str(Path(root) / INDEX_NAME))
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+            CREATE TABLE IF NOT EXISTS fingerprints (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime REAL NOT NULL,
+                duration REAL NOT NULL,
+                bit_rate INTEGER NOT NULL,
+                codec TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                simhash TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS buckets (band INTEGER NOT NULL, key INTEGER NOT NULL, path TEXT NOT NULL);
+            CREATE INDEX IF NOT EXISTS buckets_key ON buckets (band, key);
+            CREATE INDEX IF NOT EXISTS buckets_path ON buckets (path);
+            """
+        )
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+        if row is None or int(row[0]) != FINGERPRINT_VERSION:
+            with self._conn:
+                self._conn.execute("DELETE FROM fingerprints")
+                self._conn.execute("DELETE FROM buckets")
+                self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('version', ?)", (str(FINGERPRINT_VERSION),))
+        self._known: Dict[str, Tuple[int, float]] = {
+            path: (size, mtime) for path, size, mtime in self._conn.execute("SELECT path, size, mtime FROM fingerprints")
+        }
+
+    def __len__(self) -> int:
+        return len(self._known)
+
+    def is_current(self, entry: FileEntry) -> bool:
+        return self._known.get(entry.path) == (entry.size, entry.mtime)
+
+    def store(self, results: Iterable[dict]):
+        """Guarda (o reemplaza) huellas calculadas por `fingerprint_file` en una transacción."""
+        with self._conn:
+            for result in results:
+                path = result['path']
+                self._conn.execute("DELETE FROM buckets WHERE path = ?", (path,))
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO fingerprints (path, size, mtime, duration, bit_rate, codec, vector, simhash) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (path, result['size'], result['mtime'], result['duration'], result['bit_rate'],
+                     result['codec'], result['vector'], format(result['simhash'], 'x')),
+                )
+                self._conn.executemany(
+                    "INSERT INTO buckets (band, key, path) VALUES (?, ?, ?)",
+                    [(band, key, path) for band, key in enumerate(lsh_keys(result['simhash']))],
+                )
+                self._known[path] = (result['size'], result['mtime'])
+
+    def prune(self, present: Iterable[str]) -> int:
+        """Elimina del índice los archivos que ya no existen. Retorna cuántos se eliminaron."""
+        present = set(present)
+        removed = [(path,) for path in self._known if path not in present]
+        with self._conn:
+            self._conn.executemany("DELETE FROM fingerprints WHERE path = ?", removed)
+            self._conn.executemany("DELETE FROM buckets WHERE path = ?", removed)
+        for (path,) in removed:
+            del self._known[path]
+        return len(removed)
+
+    def get(self, path: str) -> Optional[Fingerprint]:
+        row = self._conn.execute(
+            "SELECT path, size, mtime, duration, bit_rate, codec, vector, simhash FROM fingerprints WHERE path = ?",
+            (path,),
+        ).fetchone()
+        if row is None:
+            return None
+        path, size, mtime, duration, bit_rate, codec, vector, hashed = row
+        return Fingerprint(path, size, mtime, duration, bit_rate, codec, np.frombuffer(vector, dtype=np.float32), int(hashed, 16))
+
+    def candidate_groups(self, max_bucket: int = 256) -> Iterator[List[str]]:
+        """
+        Grupos de archivos que comparten alguna cubeta LSH. Las cubetas
+        anormalmente grandes (p. ej. archivos casi en silencio) se limitan a
+        `max_bucket` elementos para no degenerar en una comparación O(n²).
+        """
+        rows = self._conn.execute(
+            "SELECT group_concat(path, char(0)) FROM buckets GROUP BY band, key HAVING count(*) > 1"
+        )
+        for (paths,) in rows:
+            yield sorted(paths.split("\0"))[:max_bucket]
+
+    def close(self):
+        self._conn.close()
+
+
+def _quality(fp: Fingerprint) -> Tuple[bool, int, int, int]:
+    """Orden de preferencia: sin pérdida, mayor bitrate, mayor tamaño y ruta más corta."""
+    return (fp.codec in LOSSLESS_CODECS or fp.codec.startswith('pcm_'), fp.bit_rate, fp.size, -len(fp.path))
+
+
+def find_duplicates(index: FingerprintIndex, threshold: float = 0.92, duration_tolerance: float = 5.0) -> List[List[Fingerprint]]:
+    """
+    Agrupa los casi-duplicados del índice. Solo se comparan los pares que
+    comparten una cubeta LSH; un par se confirma si la similitud coseno de
+    sus huellas supera `threshold` y sus duraciones difieren menos de
+    `duration_tolerance` segundos. Los pares confirmados se unen en clústeres
+    (unión-búsqueda) y cada clúster se parte después alrededor de su mejor
+    copia: la unión es transitiva, y un archivo solo parecido a otro miembro
+    no debe darse por duplicado de la copia que se conserva. Cada grupo se
+    retorna ordenado de mejor a peor copia, y todos sus miembros superan
+    `threshold` frente al primero.
+    """
+    cache: Dict[str, Optional[Fingerprint]] = {}
+    parent: Dict[str, str] = {}
+    compared: Set[Tuple[str, str]] = set()
+
+    def load(path: str) -> Optional[Fingerprint]:
+        if path not in cache:
+            cache[path] = index.get(path)
+        return cache[path]
+
+    def matches(first: Fingerprint, second: Fingerprint) -> bool:
+        if first.duration and second.duration and abs(first.duration - second.duration) > duration_tolerance:
+            return False
+        return first.similarity(second) >= threshold
+
+    def find(path: str) -> str:
+        while parent.setdefault(path, path) != path:
+            parent[path] = parent[parent[path]]
+            path = parent[path]
+        return path
+
+    for group in index.candidate_groups():
+        for a, b in combinations(group, 2):
+            if (a, b) in compared or find(a) == find(b):
+                continue
+            compared.add((a, b))
+            first, second = load(a), load(b)
+            if first is None or second is None:
+                continue
+            if matches(first, second):
+                parent[find(a)] = find(b)
+
+    clusters: Dict[str, List[Fingerprint]] = {}
+    for path in parent:
+        clusters.setdefault(find(path), []).append(cache[path])
+
+    groups = []
+    for members in clusters.values():
+        remaining = sorted(members, key=_quality, reverse=True)
+        while len(remaining) > 1:
+            keep, rest = remaining[0], remaining[1:]
+            group = [keep] + [member for member in rest if matches(keep, member)]
+            if len(group) > 1:
+                groups.append(group)
+            grouped = {id(member) for member in group}
+            remaining = [member for member in rest if id(member) not in grouped]
+    return groups
+
+
+def recommendation_reason(keep: Fingerprint, other: Fingerprint) -> str:
+    """Explica por qué se conserva `keep` frente a `other`."""
+    keep_lossless, keep_rate, keep_size, _ = _quality(keep)
+    other_lossless, other_rate, other_size, _ = _quality(other)
+    if keep_lossless and not other_lossless:
+        return f"sin pérdida ({keep.codec})"
+    if keep_rate != other_rate:
+        return f"mayor bitrate ({keep_rate // 1000} kbps)"
+    if keep_size != other_size:
+        return "archivo más grande"
+    return "ruta más corta"
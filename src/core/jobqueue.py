@@ -0,0 +1,197 @@
+# src/core/jobqueue.py
+
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from core.cache import default_cache_dir
+
+# Estados de un trabajo. 'running' solo sobrevive a un reinicio si el daemon murió.
+STATUSES = ("queued", "running", "done", "failed", "cancelled")
+# Intentos por defecto antes de dar un trabajo por fallido.
+MAX_ATTEMPTS = 3
+
+_COLUMNS = ("id", "url", "output", "priority", "status", "attempts", "submitted_at", "started_at", "finished_at", "result", "error")
+
+
+@dataclass
+class Job:
+    """Trabajo de descarga persistido en la cola."""
+    id: int
+    url: str
+    output: str
+    priority: int = 0
+    status: str = "queued"
+    attempts: int = 0
+    submitted_at: float = 0.0
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[dict] = None
+    error: Optional[str] = None
+
+    @classmethod
+    def from_row(cls, row) -> "Job":
+        data = dict(zip(_COLUMNS, row))
+        data['result'] = json.loads(data['result']) if data['result'] else None
+        return cls(**data)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def default_queue_path() -> Path:
+    """Base de datos de la cola (`MUSIC_CLI_CACHE_DIR/jobs.sqlite3`)."""
+    return default_cache_dir() / "jobs.sqlite3"
+
+
+class JobQueue:
+    """
+    Cola de trabajos persistente (SQLite en modo WAL) con prioridades: se
+    atiende primero la prioridad más alta y, a igualdad, el trabajo más
+    antiguo. Los trabajos sobreviven a los reinicios; `recover` devuelve a la
+    cola los que quedaron en curso si el proceso murió a mitad. Varios
+    procesos pueden encolar a la vez (por ejemplo, `submit` con el daemon
+    detenido); solo el daemon los reclama.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_attempts: int = MAX_ATTEMPTS):
+        self.db_path = str(db_path or default_queue_path())
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=30.0)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                url TEXT NOT NULL,
+                output TEXT NOT NULL,
+                priority INTEGER NOT NULL DEFAULT 0,
+                status TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                submitted_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                result TEXT,
+                error TEXT
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_pending ON jobs (status, priority DESC, id)")
+        self._conn.commit()
+
+    def submit(self, url: str, output: str, priority: int = 0) -> int:
+        """Encola una URL y retorna el ID del trabajo."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO jobs (url, output, priority, submitted_at) VALUES (?, ?, ?, ?)",
+                (url, output, priority, time.time()),
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def claim(self) -> Optional[Job]:
+        """Toma el siguiente trabajo pendiente y lo marca en curso; None si la cola está vacía."""
+        with self._lock:
+            while True:
+                row = self._conn.execute(
+                    "SELECT id FROM jobs WHERE status = 'queued' ORDER BY priority DESC, id LIMIT 1"
+                ).fetchone()
+                if row is None:
+                    return None
+                # La condición sobre el estado hace la reclamación atómica entre procesos
+                cursor = self._conn.execute(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, started_at = ?, error = NULL "
+                    "WHERE id = ? AND status = 'queued'",
+                    (time.time(), row[0]),
+                )
+                self._conn.commit()
+                if cursor.rowcount:
+                    return self._get(row[0])
+
+    def complete(self, job_id: int, result: dict):
+        self._finish(job_id, "done", result=result)
+
+    def fail(self, job_id: int, error: str, retry: bool = True) -> bool:
+        """
+        Registra el fallo de un intento. El trabajo vuelve a la cola si le
+        quedan intentos (y `retry`); retorna True si se reintentará.
+        """
+        job = self.get(job_id)
+        if retry and job is not None and job.attempts < self.max_attempts:
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE jobs SET status = 'queued', error = ? WHERE id = ? AND status = 'running'", (error, job_id)
+                )
+                self._conn.commit()
+            return True
+        self._finish(job_id, "failed", error=error)
+        return False
+
+    def _finish(self, job_id: int, status: str, result: Optional[dict] = None, error: Optional[str] = None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ? WHERE id = ?",
+                (status, time.time(), json.dumps(result) if result is not None else None, error, job_id),
+            )
+            self._conn.commit()
+
+    def cancel(self, job_id: int) -> bool:
+        """Cancela un trabajo que aún no empezó; retorna False si ya no está en la cola."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def reprioritize(self, job_id: int, priority: int) -> bool:
+        """Cambia la prioridad de un trabajo pendiente; retorna False si ya no está en la cola."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET priority = ? WHERE id = ? AND status = 'queued'", (priority, job_id)
+            )
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def recover(self) -> int:
+        """
+        Devuelve a la cola los trabajos que quedaron 'running' tras una caída.
+        Solo debe llamarse al arrancar el único proceso que reclama trabajos.
+        """
+        with self._lock:
+            cursor = self._conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+            self._conn.commit()
+            return cursor.rowcount
+
+    def _get(self, job_id: int) -> Optional[Job]:
+        row = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return Job.from_row(row) if row else None
+
+    def get(self, job_id: int) -> Optional[Job]:
+        with self._lock:
+            return self._get(job_id)
+
+    def list(self, status: Optional[str] = None, limit: int = 50) -> List[Job]:
+        """Trabajos más recientes primero, opcionalmente filtrados por estado."""
+        query = f"SELECT {', '.join(_COLUMNS)} FROM jobs"
+        params: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        query += " ORDER BY id DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(query, params + (limit,)).fetchall()
+        return [Job.from_row(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            rows = dict(self._conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: rows.get(status, 0) for status in STATUSES}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
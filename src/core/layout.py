@@ -0,0 +1,114 @@
+# src/core/layout.py
+
+import hashlib
+import string
+from typing import Optional
+
+# Disposición histórica: todos los archivos en un único directorio.
+DEFAULT_TEMPLATE = "{artist} - {title}"
+# Campos disponibles en las plantillas de ruta.
+FIELDS = ("artist", "album", "title", "track", "year")
+# Campos obligatorios: sin ellos el archivo no se puede ubicar.
+REQUIRED = ("artist", "title")
+
+
+def clean(text: str) -> str:
+    """Deja solo caracteres alfanuméricos y espacios simples (como `postprocess.sanitize`)."""
+    return " ".join("".join(c if c.isalnum() else " " if c.isspace() else "" for c in text).split())
+
+
+def _trim(component: str) -> str:
+    """Quita los separadores que quedan colgando cuando un campo está vacío ('{track:02} - {title}')."""
+    return " ".join(component.split()).strip(" -_.")
+
+
+def _number(value) -> Optional[int]:
+    """'3', '3/12' o 3 → 3; None si no es un número."""
+    if isinstance(value, int):
+        return value
+    try:
+        return int(str(value).split("/")[0].strip())
+    except (TypeError, ValueError):
+        return None
+
+
+class _Formatter(string.Formatter):
+    """Formateador que deja vacíos los campos ausentes en lugar de fallar."""
+
+    def get_value(self, key, args, kwargs):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return kwargs.get(key)
+
+    def format_field(self, value, format_spec):
+        if value is None or value == "":
+            return ""
+        return super().format_field(value, format_spec)
+
+
+_FORMATTER = _Formatter()
+
+
+class PathLayout:
+    """
+    Disposición de los archivos dentro del directorio de salida, descrita por
+    una plantilla de ruta relativa sin extensión, por ejemplo
+    `{artist}/{album}/{track:02} {title}`. Los componentes que quedan vacíos
+    (un álbum desconocido) se omiten.
+
+    Con `shard` > 0 se antepone un directorio con los primeros `shard`
+    caracteres del hash del primer componente (normalmente el artista): los
+    archivos de un mismo artista quedan juntos y ningún directorio crece sin
+    límite aunque la biblioteca tenga cientos de miles de pistas.
+    """
+
+    def __init__(self, template: str = DEFAULT_TEMPLATE, shard: int = 0):
+        self.template = template.strip().strip("/")
+        self.shard = max(0, shard)
+        validate_template(self.template)
+
+    @property
+    def is_flat(self) -> bool:
+        return "/" not in self.template and not self.shard
+
+    def signature(self) -> str:
+        """Identifica la disposición (para saber si una biblioteca ya la sigue)."""
+        return f"{self.template}|shard={self.shard}"
+
+    def relative_path(self, fields: dict, extension: str) -> Optional[str]:
+        """
+        Ruta relativa (con `/`) de un archivo con esos metadatos, o None si
+        faltan los campos obligatorios.
+        """
+        values = {key: clean(str(fields[key])) if fields.get(key) else None for key in ("artist", "album", "title")}
+        if not all(values[key] for key in REQUIRED):
+            return None
+        values['track'] = _number(fields.get('track'))
+        values['year'] = _number(str(fields['year'])[:4]) if fields.get('year') else None
+        parts = []
+        for component in self.template.split("/"):
+            rendered = _trim(_FORMATTER.format(component, **values))
+            if rendered:
+                parts.append(rendered)
+        if not parts:
+            return None
+        if self.shard:
+            digest = hashlib.sha1(parts[0].lower().encode("utf-8")).hexdigest()
+            parts.insert(0, digest[:self.shard])
+        return "/".join(parts) + extension
+
+
+def validate_template(template: str):
+    """Lanza ValueError si la plantilla usa campos desconocidos o está mal formada."""
+    try:
+        names = [name for _, name, _, _ in _FORMATTER.parse(template) if name is not None]
+    except ValueError as e:
+        raise ValueError(f"Plantilla no válida '{template}': {e}")
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown:
+        raise ValueError(f"Campo desconocido en la plantilla: {{{unknown[0]}}} (usa {', '.join(FIELDS)})")
+    for key in REQUIRED:
+        if key not in names:
+            raise ValueError(f"La plantilla debe incluir {{{key}}}")
+    if any(not part.strip() for part in template.split("/")):
+        raise ValueError(f"Plantilla no válida '{template}': componente vacío")
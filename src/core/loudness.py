@@ -0,0 +1,162 @@
+# src/core/loudness.py
+
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+
+# Análisis según ITU-R BS.1770-4 / EBU R128: audio a 48 kHz, bloques de
+# 400 ms con un solapamiento del 75 % (saltos de 100 ms), umbral absoluto de
+# -70 LUFS y relativo de -10 LU.
+SAMPLE_RATE = 48000
+SUBBLOCK = SAMPLE_RATE // 10
+ABSOLUTE_GATE = -70.0
+RELATIVE_GATE = -10.0
+# ReplayGain 2.0 normaliza a -18 LUFS; R128_TRACK_GAIN (Opus), a -23 LUFS.
+REPLAYGAIN_REFERENCE = -18.0
+R128_REFERENCE = -23.0
+
+# Coeficientes del filtro de ponderación K a 48 kHz (estante de alta
+# frecuencia + paso alto RLB), tal como los publica la norma.
+_SHELF = ([1.53512485958697, -2.69169618940638, 1.19839281085285], [1.0, -1.69065929318241, 0.73248077421585])
+_HIGHPASS = ([1.0, -2.0, 1.0], [1.0, -1.99004745483398, 0.99007225036621])
+# Longitud de la respuesta al impulso truncada: a 4096 muestras la cola del
+# paso alto ya cayó por debajo de 1e-9.
+FIR_TAPS = 4096
+# Muestras por canal filtradas de una vez (~1 s): acota la memoria del análisis.
+CHUNK_FRAMES = SAMPLE_RATE
+
+
+def _biquad_impulse(b, a, signal: np.ndarray) -> np.ndarray:
+    """Aplica un biquad muestra a muestra (solo para obtener la respuesta al impulso)."""
+    out = np.zeros_like(signal)
+    x1 = x2 = y1 = y2 = 0.0
+    for n, x0 in enumerate(signal):
+        y0 = b[0] * x0 + b[1] * x1 + b[2] * x2 - a[1] * y1 - a[2] * y2
+        out[n] = y0
+        x2, x1, y2, y1 = x1, x0, y1, y0
+    return out
+
+
+def _k_weighting_fir() -> np.ndarray:
+    impulse = np.zeros(FIR_TAPS)
+    impulse[0] = 1.0
+    return _biquad_impulse(*_HIGHPASS, _biquad_impulse(*_SHELF, impulse))
+
+
+_FIR = _k_weighting_fir()
+
+
+def block_loudness(power: np.ndarray) -> np.ndarray:
+    """Sonoridad (LUFS) de cada bloque a partir de su potencia media ponderada."""
+    with np.errstate(divide="ignore"):
+        return -0.691 + 10.0 * np.log10(power)
+
+
+def integrated_loudness(blocks: np.ndarray) -> Optional[float]:
+    """
+    Sonoridad integrada (LUFS) de un conjunto de bloques de 400 ms, con los
+    dos umbrales de la norma; None si todo es silencio. Sirve igual para una
+    pista que para un álbum (concatenando los bloques de sus pistas).
+    """
+    if blocks.size == 0:
+        return None
+    loudness = block_loudness(blocks)
+    above = blocks[loudness > ABSOLUTE_GATE]
+    if above.size == 0:
+        return None
+    threshold = block_loudness(np.array([above.mean()]))[0] + RELATIVE_GATE
+    gated = blocks[(loudness > ABSOLUTE_GATE) & (loudness > threshold)]
+    return float(block_loudness(np.array([gated.mean()]))[0])
+
+
+@dataclass
+class LoudnessResult:
+    """Sonoridad integrada (LUFS, None si es silencio), pico de muestra y potencia de cada bloque."""
+    integrated: Optional[float]
+    peak: float
+    duration: float
+    blocks: np.ndarray = field(repr=False, default_factory=lambda: np.zeros(0))
+
+    def gain(self, reference: float = REPLAYGAIN_REFERENCE) -> Optional[float]:
+        """Ganancia (dB) para llevar la pista a `reference` LUFS."""
+        return None if self.integrated is None else reference - self.integrated
+
+
+class LoudnessMeter:
+    """
+    Medidor de sonoridad en flujo: recibe PCM float32 intercalado a 48 kHz
+    en bloques de cualquier tamaño y procesa ~1 s cada vez con NumPy. La
+    ponderación K se aplica por convolución FFT con solapamiento y suma (el
+    estado entre bloques es la cola del filtro), así que la memoria no
+    depende de la duración de la pista: solo se guarda la potencia de cada
+    subbloque de 100 ms.
+    """
+
+    def __init__(self, channels: int = 2):
+        self.channels = max(1, channels)
+        self.peak = 0.0
+        self.frames = 0
+        self._pending = b""
+        self._buffer = []
+        self._buffered = 0
+        self._tail = np.zeros((FIR_TAPS - 1, self.channels))
+        self._carry = np.zeros((0, self.channels))
+        self._subblocks = []
+        size = 1
+        while size < CHUNK_FRAMES + FIR_TAPS - 1:
+            size *= 2
+        self._fft_size = size
+        self._fir_spectrum = np.fft.rfft(_FIR, size)[:, None]
+
+    def feed(self, data: bytes):
+        """Añade PCM (`f32le`, canales intercalados)."""
+        frame_bytes = 4 * self.channels
+        data = self._pending + data
+        usable = len(data) - len(data) % frame_bytes
+        self._pending = data[usable:]
+        if not usable:
+            return
+        samples = np.frombuffer(data[:usable], dtype="<f4").reshape(-1, self.channels)
+        self._buffer.append(samples)
+        self._buffered += len(samples)
+        while self._buffered >= CHUNK_FRAMES:
+            joined = np.concatenate(self._buffer)
+            self._process(joined[:CHUNK_FRAMES])
+            rest = joined[CHUNK_FRAMES:]
+            self._buffer = [rest] if len(rest) else []
+            self._buffered = len(rest)
+
+    def _process(self, samples: np.ndarray):
+        samples = samples.astype(np.float64)
+        if len(samples):
+            self.peak = max(self.peak, float(np.abs(samples).max()))
+        self.frames += len(samples)
+        # Convolución de este bloque más la cola que dejó el anterior
+        spectrum = np.fft.rfft(samples, self._fft_size, axis=0) * self._fir_spectrum
+        filtered = np.fft.irfft(spectrum, self._fft_size, axis=0)[:len(samples) + FIR_TAPS - 1]
+        filtered[:FIR_TAPS - 1] += self._tail
+        weighted = filtered[:len(samples)]
+        self._tail = filtered[len(samples):].copy()
+
+        # Energía por subbloque de 100 ms (los canales L/R/C pesan 1)
+        weighted = np.vstack([self._carry, weighted])
+        complete = len(weighted) // SUBBLOCK * SUBBLOCK
+        if complete:
+            squares = (weighted[:complete] ** 2).sum(axis=1)
+            self._subblocks.extend(squares.reshape(-1, SUBBLOCK).mean(axis=1).tolist())
+        self._carry = weighted[complete:]
+
+    def result(self) -> LoudnessResult:
+        """Cierra el análisis. Los subbloques incompletos del final se descartan, como en la norma."""
+        if self._buffered:
+            self._process(np.concatenate(self._buffer))
+            self._buffer, self._buffered = [], 0
+        subblocks = np.asarray(self._subblocks)
+        if len(subblocks) >= 4:
+            # Bloques de 400 ms con salto de 100 ms: media de 4 subbloques consecutivos
+            windows = np.lib.stride_tricks.sliding_window_view(subblocks, 4)
+            blocks = windows.mean(axis=1)
+        else:
+            blocks = np.zeros(0)
+        return LoudnessResult(integrated_loudness(blocks), self.peak, self.frames / SAMPLE_RATE, blocks)
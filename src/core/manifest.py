@@ -0,0 +1,114 @@
+# src/core/manifest.py
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+# Nombre del manifiesto dentro del directorio de salida.
+MANIFEST_NAME = ".music_downloader.sqlite3"
+
+
+def file_sha256(path: str, chunk_size: int = 1024 * 1024) -> str:
+    """Calcula el SHA-256 de un archivo leyéndolo por bloques."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DownloadManifest:
+    """
+    Registro persistente (SQLite) de las pistas ya descargadas, indexado por
+    el ID de la fuente ('youtube:<video_id>', 'spotify:<track_id>').
+
+    Al abrirse carga todas las claves en memoria, de modo que comprobar si
+    una pista ya existe es O(1) y no requiere ninguna llamada de red.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = str(db_path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS downloads (
+                source_id TEXT PRIMARY KEY,
+                path TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                sha256 TEXT NOT NULL,
+                completed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.commit()
+        self._ids = {row[0] for row in self._conn.execute("SELECT source_id FROM downloads")}
+
+    @classmethod
+    def for_output_dir(cls, output_dir: str) -> "DownloadManifest":
+        """Abre (o crea) el manifiesto asociado a un directorio de salida."""
+        return cls(str(Path(output_dir) / MANIFEST_NAME))
+
+    def __contains__(self, source_id: Optional[str]) -> bool:
+        return source_id is not None and source_id in self._ids
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def get(self, source_id: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT source_id, path, size, sha256, completed_at FROM downloads WHERE source_id = ?",
+                (source_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("source_id", "path", "size", "sha256", "completed_at"), row))
+
+    def record(self, source_id: str, path: str):
+        """Registra una pista completada con su ruta final, tamaño y hash."""
+        size = os.path.getsize(path)
+        sha256 = file_sha256(path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO downloads (source_id, path, size, sha256, completed_at) VALUES (?, ?, ?, ?, ?)",
+                (source_id, os.path.abspath(path), size, sha256, time.time()),
+            )
+            self._conn.commit()
+            self._ids.add(source_id)
+
+    def forget(self, source_id: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM downloads WHERE source_id = ?", (source_id,))
+            self._conn.commit()
+            self._ids.discard(source_id)
+
+    def verify(self, deep: bool = False) -> Tuple[int, int]:
+        """
+        Revalida todas las entradas contra el sistema de archivos en una sola
+        pasada. Se descartan las entradas cuyo archivo no existe o cambió de
+        tamaño; con `deep=True` también se recalcula el hash.
+        Retorna `(válidas, eliminadas)`.
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT source_id, path, size, sha256 FROM downloads").fetchall()
+
+        stale = []
+        for source_id, path, size, sha256 in rows:
+            try:
+                if os.path.getsize(path) != size or (deep and file_sha256(path) != sha256):
+                    stale.append(source_id)
+            except OSError:
+                stale.append(source_id)
+
+        with self._lock:
+            self._conn.executemany("DELETE FROM downloads WHERE source_id = ?", [(s,) for s in stale])
+            self._conn.commit()
+            self._ids.difference_update(stale)
+        return len(rows) - len(stale), len(stale)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
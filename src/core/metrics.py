@@ -0,0 +1,181 @@
+# src/core/metrics.py
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional
+
+# Etapas instrumentadas, en el orden en que recorre una pista el pipeline.
+STAGES = ("resolve", "stream-select", "fetch", "convert", "tag", "rename")
+
+# Límites (segundos) de los buckets del histograma de Prometheus.
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+@dataclass
+class Span:
+    """Medición de una etapa sobre un elemento: duración, bytes y atributos libres."""
+    stage: str
+    started: float                 # time.monotonic() al empezar
+    timestamp: float               # hora de reloj (epoch) al empezar
+    duration: float = 0.0
+    bytes: int = 0
+    ok: bool = True
+    thread: str = ""
+    attrs: Dict[str, object] = field(default_factory=dict)
+
+
+class Recorder:
+    """Acumula los spans de la sesión; seguro entre hilos."""
+
+    def __init__(self):
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span):
+        with self._lock:
+            self._spans.append(span)
+
+    def spans(self, since: Optional[float] = None) -> List[Span]:
+        """Spans registrados, opcionalmente solo los iniciados desde `since` (monotónico)."""
+        with self._lock:
+            if since is None:
+                return list(self._spans)
+            return [span for span in self._spans if span.started >= since]
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+
+_recorder = Recorder()
+
+
+def get_recorder() -> Recorder:
+    """Registro de spans compartido por todo el proceso."""
+    return _recorder
+
+
+@contextmanager
+def span(stage: str, **attrs) -> Iterator[Span]:
+    """
+    Mide el bloque como una etapa. El span producido permite anotar los
+    bytes procesados (`current.bytes = ...`) y más atributos; si el bloque
+    lanza una excepción, el span se registra igualmente con `ok=False`.
+    """
+    current = Span(stage, time.monotonic(), time.time(), thread=threading.current_thread().name, attrs=attrs)
+    try:
+        yield current
+    except BaseException:
+        current.ok = False
+        raise
+    finally:
+        current.duration = time.monotonic() - current.started
+        _recorder.add(current)
+
+
+def record(stage: str, duration: float, bytes: int = 0, ok: bool = True, **attrs) -> Span:
+    """Registra una etapa medida en otro lugar (por ejemplo, en un proceso del pool)."""
+    now = time.monotonic()
+    current = Span(stage, now - duration, time.time() - duration, duration, bytes, ok,
+                   threading.current_thread().name, attrs)
+    _recorder.add(current)
+    return current
+
+
+def spans(since: Optional[float] = None) -> List[Span]:
+    return _recorder.spans(since)
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def summarize(items: List[Span]) -> Dict[str, dict]:
+    """
+    Agregado por etapa: número de operaciones, errores, tiempo acumulado
+    (sumado entre hilos), p50/p99 y bytes. Las etapas conocidas van primero,
+    en el orden de `STAGES`.
+    """
+    grouped: Dict[str, List[Span]] = {}
+    for item in items:
+        grouped.setdefault(item.stage, []).append(item)
+    order = [stage for stage in STAGES if stage in grouped] + sorted(set(grouped) - set(STAGES))
+    summary = {}
+    for stage in order:
+        durations = sorted(item.duration for item in grouped[stage])
+        summary[stage] = {
+            'count': len(durations),
+            'errors': sum(1 for item in grouped[stage] if not item.ok),
+            'total': sum(durations),
+            'p50': _percentile(durations, 0.50),
+            'p99': _percentile(durations, 0.99),
+            'bytes': sum(item.bytes for item in grouped[stage]),
+        }
+    return summary
+
+
+def _atomic_write(path: str, text: str):
+    """Escribe de forma atómica: un recolector de textfiles nunca ve un archivo a medias."""
+    part = f"{path}.{os.getpid()}.tmp"
+    with open(part, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(part, path)
+
+
+def to_jsonl(items: List[Span]) -> str:
+    """Un objeto JSON por span (sin el reloj monotónico, que no tiene sentido fuera del proceso)."""
+    lines = []
+    for item in items:
+        data = asdict(item)
+        del data['started']
+        lines.append(json.dumps(data, ensure_ascii=False, default=str))
+    return "".join(f"{line}\n" for line in lines)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def to_prometheus(items: List[Span]) -> str:
+    """Formato de texto de Prometheus (para el textfile collector de node_exporter)."""
+    grouped: Dict[str, List[Span]] = {}
+    for item in items:
+        grouped.setdefault(item.stage, []).append(item)
+
+    lines = [
+        "# HELP music_cli_stage_duration_seconds Duración de cada etapa por elemento.",
+        "# TYPE music_cli_stage_duration_seconds histogram",
+    ]
+    for stage, group in grouped.items():
+        durations = [item.duration for item in group]
+        for bound in BUCKETS:
+            count = sum(1 for duration in durations if duration <= bound)
+            lines.append(f'music_cli_stage_duration_seconds_bucket{{stage="{_label(stage)}",le="{bound}"}} {count}')
+        lines.append(f'music_cli_stage_duration_seconds_bucket{{stage="{_label(stage)}",le="+Inf"}} {len(durations)}')
+        lines.append(f'music_cli_stage_duration_seconds_sum{{stage="{_label(stage)}"}} {sum(durations):.6f}')
+        lines.append(f'music_cli_stage_duration_seconds_count{{stage="{_label(stage)}"}} {len(durations)}')
+
+    lines += ["# HELP music_cli_stage_bytes_total Bytes procesados por etapa.", "# TYPE music_cli_stage_bytes_total counter"]
+    lines += [f'music_cli_stage_bytes_total{{stage="{_label(stage)}"}} {sum(item.bytes for item in group)}' for stage, group in grouped.items()]
+
+    lines += ["# HELP music_cli_stage_errors_total Operaciones fallidas por etapa.", "# TYPE music_cli_stage_errors_total counter"]
+    lines += [f'music_cli_stage_errors_total{{stage="{_label(stage)}"}} {sum(1 for item in group if not item.ok)}' for stage, group in grouped.items()]
+
+    lines += ["# HELP music_cli_last_run_timestamp_seconds Momento en que se exportaron las métricas.",
+              "# TYPE music_cli_last_run_timestamp_seconds gauge",
+              f"music_cli_last_run_timestamp_seconds {time.time():.3f}"]
+    return "\n".join(lines) + "\n"
+
+
+def export(path: str, items: Optional[List[Span]] = None):
+    """
+    Escribe los spans en `path`: formato de Prometheus si la extensión es
+    '.prom', JSON Lines en cualquier otro caso.
+    """
+    items = spans() if items is None else items
+    text = to_prometheus(items) if path.endswith(".prom") else to_jsonl(items)
+    _atomic_write(path, text)
@@ -0,0 +1,381 @@
+# src/core/organizer.py
+
+import errno
+import os
+import sqlite3
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Nombre del índice de mtime/tamaño dentro de la carpeta organizada.
+INDEX_NAME = ".music_organize.sqlite3"
+# Diario de movimientos de la última reorganización (reanudación y vuelta atrás).
+JOURNAL_NAME = ".music_organize.journal.sqlite3"
+# Movimientos confirmados en el diario por transacción.
+JOURNAL_BATCH = 500
+
+# Sufijo temporal para romper ciclos de renombrado (A → B, B → A).
+_CYCLE_SUFFIX = ".organize-tmp"
+
+
+@dataclass
+class FileEntry:
+    path: str
+    size: int
+    mtime: float
+
+
+@dataclass
+class RenamePlan:
+    """Plan completo de renombrado, calculado antes de tocar ningún archivo."""
+    moves: List[Tuple[str, str]] = field(default_factory=list)
+    collisions: List[Tuple[str, str]] = field(default_factory=list)
+    cycles: int = 0
+    unchanged: int = 0
+    invalid: List[str] = field(default_factory=list)
+
+
+def scan_tree(root: str, extensions: Iterable[str], workers: int = 8) -> List[FileEntry]:
+    """
+    Recorre `root` recursivamente con `os.scandir`, escaneando varios
+    directorios a la vez en un pool de hilos. Se ignoran los ocultos.
+    """
+    extensions = {ext.lower() for ext in extensions}
+
+    def scan(directory: str) -> Tuple[List[FileEntry], List[str]]:
+        files, subdirs = [], []
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.name.startswith('.'):
+                        continue
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs.append(entry.path)
+                    elif entry.is_file(follow_symlinks=False) and os.path.splitext(entry.name)[1].lower() in extensions:
+                        stat = entry.stat(follow_symlinks=False)
+                        files.append(FileEntry(entry.path, stat.st_size, stat.st_mtime))
+        except OSError:
+            pass
+        return files, subdirs
+
+    found: List[FileEntry] = []
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="scan") as pool:
+        pending = {pool.submit(scan, root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                found.extend(files)
+                pending.update(pool.submit(scan, subdir) for subdir in subdirs)
+    return found
+
+
+class OrganizeIndex:
+    """
+    Índice (SQLite) de tamaño y mtime de cada archivo ya procesado, para que
+    las siguientes ejecuciones solo planifiquen los archivos nuevos o modificados.
+    """
+
+    def __init__(self, root: str, layout: str = ""):
+        self._conn = sqlite3.connect(str(Path(root) / INDEX_NAME))
+        self._conn.execute("CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, size INTEGER NOT NULL, mtime REAL NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        row = self._conn.execute("SELECT value FROM settings WHERE key = 'layout'").fetchone()
+        if (row[0] if row else "") != layout:
+            # Con otra disposición, ningún archivo está "sin cambios"
+            self._conn.execute("DELETE FROM files")
+            self._conn.execute("INSERT OR REPLACE INTO settings (key, value) VALUES ('layout', ?)", (layout,))
+        self._conn.commit()
+        self._known: Dict[str, Tuple[int, float]] = {
+            path: (size, mtime) for path, size, mtime in self._conn.execute("SELECT path, size, mtime FROM files")
+        }
+
+    def is_unchanged(self, entry: FileEntry) -> bool:
+        return self._known.get(entry.path) == (entry.size, entry.mtime)
+
+    def sync(self, entries: Iterable[FileEntry]):
+        """
+        Deja el índice igual al estado final de la carpeta en una sola
+        transacción, escribiendo solo las filas nuevas, modificadas o eliminadas.
+        """
+        final = {entry.path: (entry.size, entry.mtime) for entry in entries}
+        removed = [(path,) for path in self._known if path not in final]
+        changed = [(path, size, mtime) for path, (size, mtime) in final.items() if self._known.get(path) != (size, mtime)]
+        with self._conn:
+            self._conn.executemany("DELETE FROM files WHERE path = ?", removed)
+            self._conn.executemany("INSERT OR REPLACE INTO files (path, size, mtime) VALUES (?, ?, ?)", changed)
+        self._known = final
+
+    def reset(self):
+        """Olvida todos los archivos: la próxima ejecución analiza la carpeta entera."""
+        with self._conn:
+            self._conn.execute("DELETE FROM files")
+        self._known = {}
+
+    def close(self):
+        self._conn.close()
+
+
+def build_plan(entries: List[FileEntry], target_for: Callable[[str], Optional[str]],
+               index: Optional[OrganizeIndex] = None) -> RenamePlan:
+    """
+    Calcula el plan de renombrado completo. `target_for` retorna la ruta
+    destino de un archivo (o None si su nombre no es interpretable).
+
+    Las colisiones (dos archivos hacia el mismo destino, o un destino ya
+    ocupado por un archivo que no se mueve) se resuelven con un sufijo
+    " (2)", " (3)"... y quedan registradas en el plan. Los movimientos se
+    ordenan para que ningún destino esté ocupado al aplicarlos; los ciclos
+    se rompen con un nombre temporal.
+    """
+    plan = RenamePlan()
+    existing = {entry.path for entry in entries}
+    wanted: Dict[str, str] = {}
+
+    for entry in entries:
+        if index is not None and index.is_unchanged(entry):
+            plan.unchanged += 1
+            continue
+        target = target_for(entry.path)
+        if target is None:
+            plan.invalid.append(entry.path)
+        elif os.path.abspath(target) != os.path.abspath(entry.path):
+            wanted[entry.path] = target
+
+    # Resolución de colisiones: un destino queda libre si nadie lo reclamó y
+    # no está ocupado por un archivo que permanece en su sitio.
+    claimed = set()
+    moves: Dict[str, str] = {}
+    for source, target in sorted(wanted.items()):
+        candidate, n = target, 1
+        while candidate in claimed or (
+            (candidate in existing or os.path.exists(candidate)) and candidate not in wanted
+        ):
+            n += 1
+            stem, ext = os.path.splitext(target)
+            candidate = f"{stem} ({n}){ext}"
+        if candidate != target:
+            plan.collisions.append((source, candidate))
+        claimed.add(candidate)
+        moves[source] = candidate
+
+    # Orden de aplicación: primero los movimientos cuyo destino ya está libre.
+    pending = dict(moves)
+    while pending:
+        ready = [(source, target) for source, target in pending.items() if target not in pending]
+        if ready:
+            for source, target in ready:
+                plan.moves.append((source, target))
+                del pending[source]
+            continue
+        # Solo quedan ciclos: se mueve un archivo a un nombre temporal.
+        source, target = next(iter(pending.items()))
+        temporary = source + _CYCLE_SUFFIX
+        plan.moves.append((source, temporary))
+        del pending[source]
+        pending[temporary] = target
+        plan.cycles += 1
+    return plan
+
+
+class MoveJournal:
+    """
+    Diario (SQLite) de los movimientos de una reorganización. El plan entero
+    se escribe antes de mover nada y cada movimiento se marca al completarse,
+    en lotes de `JOURNAL_BATCH` por transacción. Si el proceso muere a mitad,
+    el diario indica qué falta (`resume`) o qué deshacer (`rollback`); un
+    movimiento hecho pero aún no confirmado se reconoce en el sistema de
+    archivos (origen ausente y destino presente).
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._conn = sqlite3.connect(str(Path(root) / JOURNAL_NAME))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS moves (seq INTEGER PRIMARY KEY, source TEXT NOT NULL, target TEXT NOT NULL, done INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+    @property
+    def state(self) -> Optional[str]:
+        """'applying', 'applied', 'rolling-back', 'rolled-back' o None si no hay diario."""
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'state'").fetchone()
+        return row[0] if row else None
+
+    def _set_state(self, state: str):
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('state', ?)", (state,))
+
+    def begin(self, moves: List[Tuple[str, str]]):
+        """Sustituye el diario anterior por el plan completo, en una sola transacción."""
+        with self._conn:
+            self._conn.execute("DELETE FROM moves")
+            self._conn.executemany("INSERT INTO moves (source, target) VALUES (?, ?)", moves)
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('state', 'applying')")
+
+    def counts(self) -> Tuple[int, int]:
+        """(movimientos hechos, total)."""
+        done, total = self._conn.execute("SELECT COALESCE(SUM(done), 0), COUNT(*) FROM moves").fetchone()
+        return done, total
+
+    def _moves(self, done: bool, reverse: bool = False) -> List[Tuple[int, str, str]]:
+        order = "DESC" if reverse else "ASC"
+        return self._conn.execute(
+            f"SELECT seq, source, target FROM moves WHERE done = ? ORDER BY seq {order}", (int(done),)
+        ).fetchall()
+
+    def _mark(self, seqs: List[int], done: bool):
+        with self._conn:
+            self._conn.executemany("UPDATE moves SET done = ? WHERE seq = ?", [(int(done), seq) for seq in seqs])
+        seqs.clear()
+
+    def applied(self) -> List[Tuple[str, str]]:
+        """Movimientos hechos, en orden de aplicación."""
+        return [(source, target) for _, source, target in self._moves(True)]
+
+    def resume(self, on_error: Optional[Callable[[str, str, Exception], None]] = None) -> int:
+        """Aplica los movimientos pendientes del diario. Retorna cuántos se hicieron."""
+        moved = _Mover(self.root)
+        batch: List[int] = []
+        count = 0
+        for seq, source, target in self._moves(False):
+            try:
+                if not (os.path.exists(target) and not os.path.exists(source)):
+                    moved.move(source, target)
+                batch.append(seq)
+                count += 1
+            except OSError as e:
+                if on_error is not None:
+                    on_error(source, target, e)
+            if len(batch) >= JOURNAL_BATCH:
+                self._mark(batch, True)
+        self._mark(batch, True)
+        self._set_state("applied")
+        return count
+
+    def rollback(self, on_error: Optional[Callable[[str, str, Exception], None]] = None) -> int:
+        """
+        Deshace, en orden inverso, los movimientos hechos. Los que no llegaron
+        a confirmarse en el diario (el proceso murió antes de cerrar su lote)
+        se deshacen solo si el sistema de archivos muestra que ocurrieron.
+        Retorna cuántos se deshicieron.
+        """
+        self._set_state("rolling-back")
+        moved = _Mover(self.root)
+        batch: List[int] = []
+        count = 0
+        rows = self._conn.execute("SELECT seq, source, target, done FROM moves ORDER BY seq DESC").fetchall()
+        for seq, source, target, done in rows:
+            if not done and not (os.path.exists(target) and not os.path.exists(source)):
+                continue
+            try:
+                if not (os.path.exists(source) and not os.path.exists(target)):
+                    moved.move(target, source)
+                batch.append(seq)
+                count += 1
+            except OSError as e:
+                if on_error is not None:
+                    on_error(target, source, e)
+            if len(batch) >= JOURNAL_BATCH:
+                self._mark(batch, False)
+        self._mark(batch, False)
+        self._set_state("rolled-back")
+        return count
+
+    def close(self):
+        self._conn.close()
+
+
+def _move_no_clobber(source: str, target: str):
+    """
+    Mueve `source` a `target` sin sobrescribir nunca un archivo existente
+    (creado entre el plan y su aplicación, o por otra ejecución): el enlace
+    duro falla si el destino existe. Lanza FileExistsError en ese caso.
+    """
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        # Mismo archivo con otro nombre (sistemas de archivos sin mayúsculas)
+        if not os.path.samefile(source, target):
+            raise
+        os.replace(source, target)
+        return
+    except OSError:
+        # Sin enlaces duros: se comprueba antes de renombrar
+        if os.path.lexists(target):
+            raise FileExistsError(errno.EEXIST, "El destino ya existe", target)
+        os.replace(source, target)
+        return
+    os.remove(source)
+
+
+class _Mover:
+    """
+    Renombra archivos dentro de `root` creando cada directorio destino una
+    sola vez y eliminando los directorios de origen que quedan vacíos.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self._created = set()
+
+    def move(self, source: str, target: str):
+        directory = os.path.dirname(target) or "."
+        if directory not in self._created:
+            os.makedirs(directory, exist_ok=True)
+            self._created.add(directory)
+        _move_no_clobber(source, target)
+        self._prune(os.path.dirname(os.path.abspath(source)))
+
+    def _prune(self, directory: str):
+        while directory != self.root and directory.startswith(self.root + os.sep):
+            try:
+                os.rmdir(directory)
+            except OSError:
+                return
+            self._created.discard(directory)
+            directory = os.path.dirname(directory)
+
+
+def apply_plan(plan: RenamePlan, on_error: Optional[Callable[[str, str, Exception], None]] = None,
+               journal: Optional[MoveJournal] = None) -> List[Tuple[str, str]]:
+    """
+    Aplica los movimientos del plan en orden. Retorna los que se completaron.
+    Un destino que ya existe no se sobrescribe: el movimiento se omite y se
+    notifica a `on_error` con FileExistsError.
+    Con `journal`, el plan queda registrado antes de empezar y la pasada se
+    puede reanudar o deshacer si se interrumpe.
+    """
+    if journal is not None:
+        journal.begin(plan.moves)
+        journal.resume(on_error)
+        return journal.applied()
+    applied = []
+    created = set()
+    for source, target in plan.moves:
+        try:
+            directory = os.path.dirname(target) or "."
+            if directory not in created:
+                os.makedirs(directory, exist_ok=True)
+                created.add(directory)
+            _move_no_clobber(source, target)
+            applied.append((source, target))
+        except OSError as e:
+            if on_error is not None:
+                on_error(source, target, e)
+    return applied
+
+
+def final_paths(moves: Iterable[Tuple[str, str]]) -> Dict[str, str]:
+    """
+    Ruta final de cada archivo movido (origen → destino definitivo),
+    reproduciendo los movimientos en orden. Los pasos por un nombre temporal
+    (ciclos A → B, B → A) se siguen hasta el destino real, así que el
+    resultado nunca contiene cadenas ni ciclos.
+    """
+    origin: Dict[str, str] = {}
+    for source, target in moves:
+        origin[target] = origin.pop(source, source)
+    return {start: path for path, start in origin.items()}
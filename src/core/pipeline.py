@@ -0,0 +1,120 @@
+# src/core/pipeline.py
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Marca de fin de flujo que se propaga entre etapas.
+_END = object()
+
+
+@dataclass
+class Stage:
+    """
+    Etapa del pipeline. `func` recibe un item y retorna un iterable con los
+    items que pasan a la siguiente etapa (puede ser un generador, de modo que
+    una URL de playlist alimente a las etapas siguientes pista por pista).
+    """
+    name: str
+    func: Callable[[dict], Iterable[dict]]
+    workers: int = 1
+
+
+@dataclass
+class Failure:
+    """Fallo aislado de un item en una etapa concreta."""
+    stage: str
+    item: dict
+    error: Exception
+
+
+@dataclass
+class PipelineStats:
+    """Resultado agregado de una ejecución del pipeline."""
+    started_at: float = field(default_factory=time.monotonic)
+    finished_at: Optional[float] = None
+    inputs: int = 0
+    processed: Dict[str, int] = field(default_factory=dict)
+    completed: List[dict] = field(default_factory=list)
+    failures: List[Failure] = field(default_factory=list)
+
+    @property
+    def elapsed(self) -> float:
+        end = self.finished_at if self.finished_at is not None else time.monotonic()
+        return max(end - self.started_at, 1e-9)
+
+
+class Pipeline:
+    """
+    Pipeline por etapas con un pool de hilos acotado por etapa.
+
+    Cada etapa consume de una cola acotada y produce en la cola de la
+    siguiente, de modo que la E/S de red de una pista se solapa con el
+    etiquetado y renombrado de las anteriores. Una excepción en un item se
+    registra como `Failure` y no detiene al resto del lote.
+    """
+
+    def __init__(self, stages: List[Stage], queue_factor: int = 2):
+        if not stages:
+            raise ValueError("El pipeline necesita al menos una etapa.")
+        self.stages = stages
+        self.queue_factor = queue_factor
+        self._lock = threading.Lock()
+
+    def run(self, inputs: Iterable[dict]) -> PipelineStats:
+        stats = PipelineStats()
+        stats.processed = {stage.name: 0 for stage in self.stages}
+
+        queues = [queue.Queue(maxsize=max(1, stage.workers * self.queue_factor)) for stage in self.stages]
+        threads: List[List[threading.Thread]] = []
+
+        for index, stage in enumerate(self.stages):
+            in_queue = queues[index]
+            out_queue = queues[index + 1] if index + 1 < len(queues) else None
+            workers = [
+                threading.Thread(
+                    target=self._worker,
+                    args=(stage, in_queue, out_queue, stats),
+                    name=f"{stage.name}-{n}",
+                    daemon=True,
+                )
+                for n in range(max(1, stage.workers))
+            ]
+            for worker in workers:
+                worker.start()
+            threads.append(workers)
+
+        for item in inputs:
+            stats.inputs += 1
+            queues[0].put(item)
+
+        # Cierra cada etapa en orden: cuando todos sus hilos terminan, ya no
+        # pueden llegar más items a la siguiente cola.
+        for index, workers in enumerate(threads):
+            for _ in workers:
+                queues[index].put(_END)
+            for worker in workers:
+                worker.join()
+
+        stats.finished_at = time.monotonic()
+        return stats
+
+    def _worker(self, stage: Stage, in_queue: queue.Queue, out_queue: Optional[queue.Queue], stats: PipelineStats):
+        while True:
+            item = in_queue.get()
+            if item is _END:
+                return
+            try:
+                for result in stage.func(item) or ():
+                    if out_queue is not None:
+                        out_queue.put(result)
+                    else:
+                        with self._lock:
+                            stats.completed.append(result)
+                with self._lock:
+                    stats.processed[stage.name] += 1
+            except Exception as e:
+                with self._lock:
+                    stats.failures.append(Failure(stage.name, item, e))
@@ -0,0 +1,84 @@
+# src/core/profiler.py
+
+import os
+import sys
+import threading
+from collections import Counter
+from typing import List, Optional, Tuple
+
+# Intervalo de muestreo por defecto (segundos).
+DEFAULT_INTERVAL = 0.005
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Perfilador por muestreo de tiempo de pared: un hilo daemon toma cada
+    `interval` segundos la pila de todos los hilos (`sys._current_frames`) y
+    cuenta las pilas repetidas. Al no instrumentar cada llamada (como
+    cProfile), su coste no depende de cuántas funciones se ejecutan, y al
+    incluir hilos bloqueados muestra también las esperas de red o disco.
+    """
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "SamplingProfiler":
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        own = threading.get_ident()
+        names = {}
+        while not self._stop.wait(self.interval):
+            names.update((thread.ident, thread.name) for thread in threading.enumerate())
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self._stacks[tuple(reversed(stack))] += 1
+            self.samples += 1
+
+    @property
+    def thread_samples(self) -> int:
+        """Total de pilas capturadas (una por hilo vivo en cada muestra)."""
+        return sum(self._stacks.values())
+
+    def folded(self) -> str:
+        """Pilas en formato "plegado" (hilo;raíz;...;hoja N), compatible con flamegraph.pl y speedscope."""
+        return "".join(f"{';'.join(stack)} {count}\n" for stack, count in self._stacks.most_common())
+
+    def write_folded(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(self.folded())
+
+    def top(self, limit: int = 15) -> List[Tuple[str, int, int]]:
+        """
+        Funciones con más muestras: (función, muestras propias, muestras
+        acumuladas). Las propias son las que la tienen en la cima de la pila.
+        """
+        own: Counter = Counter()
+        cumulative: Counter = Counter()
+        for stack, count in self._stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack[1:]):
+                cumulative[label] += count
+        return [(label, count, cumulative[label]) for label, count in own.most_common(limit)]
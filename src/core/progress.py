@@ -0,0 +1,168 @@
+# src/core/progress.py
+
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import List, Optional
+
+from rich.console import Console
+from rich.progress import BarColumn, MofNCompleteColumn, Progress, SpinnerColumn, TextColumn
+from rich.text import Text
+
+console = Console()
+
+_lock = threading.Lock()
+_progress: Optional[Progress] = None
+_active = 0
+# Seguimiento activo en cada hilo (ver `track`)
+_local = threading.local()
+# Mensajes que conserva cada `Tracker`
+TRACKER_MESSAGES = 20
+
+
+class Tracker:
+    """
+    Progreso de un trabajo en segundo plano (el modo interactivo): pistas
+    completadas sobre el total conocido, archivos y bytes terminados y los
+    últimos mensajes. Se alimenta desde los hilos del pipeline; seguro entre hilos.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.finished: Optional[float] = None
+        self.total: Optional[int] = None
+        self.completed = 0
+        self.files = 0
+        self.bytes = 0
+        self.cancelled = False
+        self.messages = deque(maxlen=TRACKER_MESSAGES)
+        self._lock = threading.Lock()
+
+    def add_file(self, path: str):
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        with self._lock:
+            self.files += 1
+            self.bytes += size
+
+    def log(self, message: str):
+        with self._lock:
+            self.messages.append(message)
+
+    def cancel(self):
+        """Pide detener el trabajo tras la pista en curso."""
+        self.cancelled = True
+
+    def finish(self):
+        self.finished = self.finished or time.monotonic()
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def speed(self) -> float:
+        """Bytes por segundo de los archivos terminados."""
+        return self.bytes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def eta(self) -> Optional[float]:
+        """Segundos restantes estimados, o None si el total aún no se conoce."""
+        if not self.total or not self.completed or self.finished:
+            return None
+        return self.elapsed / self.completed * max(0, self.total - self.completed)
+
+    def last_messages(self, limit: int = 5) -> List[str]:
+        with self._lock:
+            return list(self.messages)[-limit:]
+
+
+class _TrackedProgress:
+    """
+    Sustituto de `Progress` que recibe `task` dentro de `track`: las
+    actualizaciones van al `Tracker` del hilo en lugar de a la barra
+    compartida, de modo que los trabajos en segundo plano no abren displays
+    en vivo. Implementa la parte de la interfaz que usan las fuentes.
+    """
+
+    def __init__(self, tracker: Tracker):
+        self.tracker = tracker
+
+    @property
+    def console(self) -> "_TrackedProgress":
+        return self
+
+    def print(self, *objects, **kwargs):
+        self.tracker.log(" ".join(Text.from_markup(str(obj)).plain for obj in objects))
+
+    def update(self, task_id, total: Optional[float] = None, completed: Optional[float] = None,
+               advance: Optional[float] = None, **kwargs):
+        if total is not None:
+            self.tracker.total = int(total)
+        if completed is not None:
+            self.tracker.completed = int(completed)
+        if advance:
+            self.advance(task_id, advance)
+
+    def advance(self, task_id, advance: float = 1):
+        self.tracker.completed += int(advance)
+
+
+@contextmanager
+def track(tracker: Optional[Tracker]):
+    """
+    Dirige a `tracker` las tareas de progreso que se creen en este hilo
+    mientras dure el bloque. Con None no hace nada.
+    """
+    if tracker is None:
+        yield
+        return
+    previous = getattr(_local, "tracker", None)
+    _local.tracker = tracker
+    try:
+        yield
+    finally:
+        _local.tracker = previous
+
+
+@contextmanager
+def task(description: str, total: Optional[float] = None):
+    """
+    Crea una tarea en una barra de progreso compartida por todo el proceso.
+    Rich solo permite un display en vivo a la vez, así que varios hilos del
+    pipeline comparten el mismo `Progress`, que se detiene con la última tarea.
+    Retorna `(progress, task_id)`.
+    """
+    global _progress, _active
+    tracker = getattr(_local, "tracker", None)
+    if tracker is not None:
+        if total is not None:
+            tracker.total = int(total)
+        yield _TrackedProgress(tracker), 0
+        return
+    with _lock:
+        if _progress is None:
+            _progress = Progress(
+                SpinnerColumn(),
+                TextColumn("[progress.description]{task.description}"),
+                BarColumn(),
+                MofNCompleteColumn(),
+                console=console,
+            )
+            _progress.start()
+        _active += 1
+        progress = _progress
+        task_id = progress.add_task(description, total=total)
+    try:
+        yield progress, task_id
+    finally:
+        with _lock:
+            progress.remove_task(task_id)
+            _active -= 1
+            if _active == 0:
+                progress.stop()
+                _progress = None
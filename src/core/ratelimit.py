@@ -0,0 +1,265 @@
+# src/core/ratelimit.py
+
+import email.utils
+import http.client
+import json
+import os
+import random
+import threading
+import time
+import urllib.error
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo límites dentro del proceso
+    fcntl = None
+
+from core.cache import default_cache_dir
+
+# Reintentos y backoff por defecto, configurables con variables de entorno.
+MAX_RETRIES = int(os.environ.get("MUSIC_CLI_RETRIES", 4))
+BASE_DELAY = float(os.environ.get("MUSIC_CLI_RETRY_DELAY", 1.0))
+MAX_DELAY = 60.0
+# Con MUSIC_CLI_RATE_SHARED=1 varios procesos comparten el cubo de cada fuente.
+SHARED = os.environ.get("MUSIC_CLI_RATE_SHARED", "").lower() in ("1", "true", "yes")
+
+# Respuestas HTTP que indican un fallo transitorio; 429 y 503 además indican limitación.
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+THROTTLE_STATUS = {429, 503}
+
+_limiters: Dict[str, "RateLimiter"] = {}
+_limiters_lock = threading.Lock()
+
+
+@dataclass
+class LimiterStats:
+    """Contadores de una fuente durante la sesión."""
+    calls: int = 0
+    throttled: int = 0
+    retries: int = 0
+    failures: int = 0
+    waits: int = 0
+    waited: float = 0.0
+    backoff: float = 0.0
+
+
+def retry_after(headers) -> Optional[float]:
+    """Segundos indicados por la cabecera Retry-After (número o fecha HTTP), o None."""
+    if not headers:
+        return None
+    value = headers.get("Retry-After") or headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - time.time())
+
+
+def error_details(error: BaseException) -> Tuple[Optional[int], Optional[float]]:
+    """
+    Extrae el código HTTP y el Retry-After de una excepción de urllib,
+    requests o spotipy, recorriendo también sus causas encadenadas.
+    """
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        response = getattr(error, "response", None)
+        status = (
+            getattr(error, "http_status", None)
+            or (error.code if isinstance(error, urllib.error.HTTPError) else None)
+            or getattr(response, "status_code", None)
+        )
+        if status is not None:
+            headers = getattr(error, "headers", None) or getattr(response, "headers", None)
+            return int(status), retry_after(headers)
+        error = error.__cause__ or error.__context__
+    return None, None
+
+
+def _is_network_error(error: BaseException) -> bool:
+    if isinstance(error, (ConnectionError, TimeoutError, urllib.error.URLError, http.client.HTTPException)):
+        return True
+    # requests y urllib3 derivan sus errores de conexión de OSError/IOError
+    return isinstance(error, OSError) and type(error).__module__.split(".")[0] in ("requests", "urllib3")
+
+
+def is_retryable(error: BaseException) -> bool:
+    """True si el error es transitorio: limitación, fallo del servidor o de red."""
+    status, _ = error_details(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return _is_network_error(error) or (error.__cause__ is not None and is_retryable(error.__cause__))
+
+
+def backoff_delay(attempt: int, wait: Optional[float] = None, base: float = BASE_DELAY, cap: float = MAX_DELAY) -> float:
+    """
+    Espera antes del reintento `attempt` (desde 0): exponencial con jitter
+    (la mitad fija y la mitad aleatoria), o lo indicado por Retry-After más
+    un pequeño jitter para que los hilos no reintenten a la vez.
+    """
+    if wait is not None:
+        return min(cap, wait) + random.uniform(0, base / 2)
+    delay = min(cap, base * 2 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class TokenBucket:
+    """
+    Cubo de tokens: permite ráfagas de hasta `burst` peticiones y un ritmo
+    sostenido de `rate` peticiones por segundo. Con `state_path`, el estado
+    vive en un archivo protegido con `flock`, de modo que varios procesos
+    comparten el mismo límite de forma cooperativa.
+    """
+
+    def __init__(self, rate: float, burst: float, state_path: Optional[str] = None):
+        self.rate = max(rate, 1e-6)
+        self.burst = max(1.0, burst)
+        self.state_path = state_path if fcntl is not None else None
+        self._tokens = self.burst
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def _update(self, change: Callable[[float], Tuple[float, float]]) -> float:
+        """
+        Aplica `change(tokens) -> (tokens, espera)` sobre el estado rellenado
+        hasta ahora, bajo el cerrojo del hilo y, si se comparte, del archivo.
+        """
+        with self._lock:
+            if self.state_path is None:
+                now = time.time()
+                tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._tokens, delay = change(tokens)
+                self._updated = now
+                return delay
+            with open(self.state_path, "a+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    try:
+                        state = json.loads(f.read() or "{}")
+                    except ValueError:
+                        state = {}
+                    now = time.time()
+                    tokens = state.get("tokens", self.burst)
+                    tokens = min(self.burst, tokens + (now - state.get("updated", now)) * self.rate)
+                    tokens, delay = change(tokens)
+                    f.seek(0)
+                    f.truncate()
+                    f.write(json.dumps({"tokens": tokens, "updated": now}))
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                return delay
+
+    def _take(self, tokens: float) -> Tuple[float, float]:
+        if tokens >= 1:
+            return tokens - 1, 0.0
+        return tokens, (1 - tokens) / self.rate
+
+    def acquire(self) -> float:
+        """Espera hasta obtener un token. Retorna los segundos esperados."""
+        waited = 0.0
+        while True:
+            delay = self._update(self._take)
+            if delay <= 0:
+                return waited
+            time.sleep(delay)
+            waited += delay
+
+    def pause(self, seconds: float):
+        """Vacía el cubo para que nadie obtenga un token durante `seconds` segundos (Retry-After)."""
+        self._update(lambda tokens: (min(tokens, 0.0) - seconds * self.rate, 0.0))
+
+
+class RateLimiter:
+    """
+    Límite de peticiones y política de reintentos de una fuente. Todas las
+    llamadas al backend pasan por `call`, que toma un token, reintenta los
+    errores transitorios con backoff exponencial (respetando Retry-After) y
+    acumula contadores de limitación.
+    """
+
+    def __init__(self, name: str, rate: float, burst: float, shared: bool = False,
+                 retries: int = MAX_RETRIES, base_delay: float = BASE_DELAY, max_delay: float = MAX_DELAY):
+        self.name = name
+        self.retries = retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        state_path = None
+        if shared:
+            directory = default_cache_dir() / "ratelimit"
+            directory.mkdir(exist_ok=True)
+            state_path = str(directory / f"{name.lower()}.json")
+        self.bucket = TokenBucket(rate, burst, state_path)
+        self.stats = LimiterStats()
+        self._lock = threading.Lock()
+
+    def _count(self, **amounts):
+        with self._lock:
+            for name, amount in amounts.items():
+                setattr(self.stats, name, getattr(self.stats, name) + amount)
+
+    def acquire(self):
+        """Toma un token (esperando si hace falta) sin ejecutar nada."""
+        waited = self.bucket.acquire()
+        self._count(calls=1, waits=int(waited > 0), waited=waited)
+
+    def call(self, func: Callable, *args, **kwargs):
+        """Ejecuta `func(*args, **kwargs)` bajo el límite, con reintentos."""
+        for attempt in range(self.retries + 1):
+            self.acquire()
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    self._count(failures=1)
+                    raise
+                status, wait = error_details(e)
+                if status in THROTTLE_STATUS:
+                    self._count(throttled=1)
+                if wait is not None:
+                    # El servidor pidió esperar: se aplica a todos los hilos de la fuente
+                    self.bucket.pause(wait)
+                delay = backoff_delay(attempt, wait, self.base_delay, self.max_delay)
+                self._count(retries=1, backoff=delay)
+                time.sleep(delay)
+
+
+def _configured(name: str, rate: float, burst: float) -> Tuple[float, float]:
+    """
+    Aplica `MUSIC_CLI_RATE_<FUENTE>` ('peticiones/s' o 'peticiones/s:ráfaga'),
+    por ejemplo MUSIC_CLI_RATE_YOUTUBE=1.5:3.
+    """
+    value = os.environ.get(f"MUSIC_CLI_RATE_{name.upper()}")
+    if not value:
+        return rate, burst
+    try:
+        configured_rate, _, configured_burst = value.partition(":")
+        rate = float(configured_rate)
+        burst = float(configured_burst) if configured_burst else max(1.0, rate)
+    except ValueError:
+        pass
+    return rate, burst
+
+
+def get_limiter(name: str, rate: float = 5.0, burst: float = 10.0) -> RateLimiter:
+    """Limitador compartido por todas las instancias (e hilos) de una fuente."""
+    key = "".join(c for c in name.lower() if c.isalnum())
+    with _limiters_lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter(key, *_configured(key, rate, burst), shared=SHARED)
+        return _limiters[key]
+
+
+def all_stats() -> Dict[str, dict]:
+    """Contadores de todas las fuentes usadas en la sesión."""
+    with _limiters_lock:
+        return {name: asdict(limiter.stats) for name, limiter in _limiters.items()}
@@ -0,0 +1,107 @@
+# src/core/search.py
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Iterator, List, Optional, Sequence
+
+from core.cache import ResolutionCache, normalize, search_key
+
+# Plazo por defecto de cada fuente, en segundos.
+DEFAULT_TIMEOUT = 8.0
+
+
+@dataclass
+class ProviderResult:
+    """Respuesta de una fuente a una búsqueda federada."""
+    source: str
+    status: str  # 'ok', 'cached', 'timeout' o 'error'
+    results: List[dict] = field(default_factory=list)
+    elapsed: float = 0.0
+    error: Optional[str] = None
+
+
+def _search_one(provider, query: str, results: "queue.Queue"):
+    """Ejecuta la búsqueda de una fuente y deja (nombre, resultados, error) en la cola."""
+    name = provider.get_source_name()
+    try:
+        found = [dict(result, source=name) for result in provider.search(query) or []]
+        results.put((name, found, None))
+    except Exception as e:
+        results.put((name, [], e))
+
+
+def federated_search(query: str, providers: Sequence, timeout: float = DEFAULT_TIMEOUT,
+                     cache: Optional[ResolutionCache] = None) -> Iterator[ProviderResult]:
+    """
+    Consulta todas las fuentes a la vez y produce un `ProviderResult` por
+    fuente en cuanto responde. Las respuestas en caché se producen primero,
+    sin esperar a la red. Una fuente que no responde antes de `timeout`
+    segundos se da por vencida y no retrasa al resto.
+    """
+    started = time.perf_counter()
+    responses: "queue.Queue" = queue.Queue()
+    pending = set()
+    for provider in providers:
+        name = provider.get_source_name()
+        cached = cache.get(search_key(name, query)) if cache is not None else None
+        if cached is not None:
+            yield ProviderResult(name, 'cached', cached)
+            continue
+        # Hilos daemon: una fuente vencida no impide que el proceso termine
+        threading.Thread(target=_search_one, args=(provider, query, responses), name=f"search-{name}", daemon=True).start()
+        pending.add(name)
+
+    deadline = started + timeout
+    while pending:
+        try:
+            name, results, error = responses.get(timeout=max(0.0, deadline - time.perf_counter()))
+        except queue.Empty:
+            break
+        pending.discard(name)
+        elapsed = time.perf_counter() - started
+        if error is not None:
+            yield ProviderResult(name, 'error', elapsed=elapsed, error=str(error))
+            continue
+        if cache is not None:
+            cache.set(search_key(name, query), results)
+        yield ProviderResult(name, 'ok', results, elapsed=elapsed)
+
+    for name in sorted(pending):
+        yield ProviderResult(name, 'timeout', elapsed=timeout)
+
+
+def relevance(query: str, result: dict) -> float:
+    """Similitud (0-1) entre la consulta y el artista/título de un resultado."""
+    wanted = normalize(query)
+    artist, title = normalize(result.get('artist', '')), normalize(result.get('title', ''))
+    candidates = (f"{artist} {title}", f"{title} {artist}", title)
+    return max(SequenceMatcher(None, wanted, candidate).ratio() for candidate in candidates)
+
+
+def merge_results(query: str, responses: Sequence[ProviderResult]) -> List[dict]:
+    """
+    Une los resultados de todas las fuentes, elimina duplicados (misma URL o
+    mismo artista y título) y los ordena por relevancia. Cada resultado
+    conserva 'score' y la lista de 'sources' donde apareció.
+    """
+    merged, by_url = {}, {}
+    for order, response in enumerate(responses):
+        for position, result in enumerate(response.results):
+            score = relevance(query, result)
+            key = (normalize(result.get('artist', '')), normalize(result.get('title', '')))
+            current = merged.get(key) or by_url.get(result.get('url'))
+            if current is None:
+                current = merged[key] = dict(result, score=score, sources=[response.source], _rank=(order, position))
+                by_url[result.get('url')] = current
+            else:
+                if response.source not in current['sources']:
+                    current['sources'].append(response.source)
+                if score > current['score']:
+                    current.update(result, score=score)
+    ranked = sorted(merged.values(), key=lambda item: (-item['score'], item['_rank']))
+    for item in ranked:
+        del item['_rank']
+    return ranked
@@ -0,0 +1,145 @@
+# src/core/streams.py
+
+import re
+import time
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional, Sequence, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+# Nombres de códec aceptados en --codec → prefijo del códec RFC 6381 del manifiesto.
+CODEC_ALIASES = {"aac": "mp4a", "m4a": "mp4a", "mp4a": "mp4a", "opus": "opus", "vorbis": "vorbis", "mp3": "mp3"}
+QUALITIES = ("best", "smallest", "max-bitrate=N")
+# Margen antes de la caducidad de una URL firmada para no empezar una descarga que no terminará.
+EXPIRY_MARGIN = 10 * 60
+
+
+@dataclass
+class StreamInfo:
+    """Stream de audio de un manifiesto, independiente de la librería que lo obtuvo."""
+    itag: int
+    url: str
+    mime_type: str
+    subtype: str
+    codec: str
+    bitrate: int                    # bits/s (0 si se desconoce)
+    filesize: Optional[int] = None  # bytes (None si el manifiesto no lo informa)
+    expires: Optional[float] = None # epoch de caducidad de la URL firmada
+    cached: bool = field(default=False, compare=False)
+
+    @classmethod
+    def from_pytube(cls, stream) -> "StreamInfo":
+        # `_filesize` viene del manifiesto; la propiedad `filesize` haría un HEAD si falta
+        filesize = getattr(stream, "_filesize", 0) or None
+        bitrate = stream.bitrate or 0
+        if not bitrate and stream.abr:
+            bitrate = int(re.sub(r"\D", "", stream.abr) or 0) * 1000
+        return cls(stream.itag, stream.url, stream.mime_type, stream.subtype, stream.audio_codec or "",
+                   bitrate, filesize, url_expiry(stream.url))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "StreamInfo":
+        return cls(**{key: value for key, value in data.items() if key != "cached"}, cached=True)
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        del data["cached"]
+        return data
+
+
+def url_expiry(url: str) -> Optional[float]:
+    """Caducidad ('expire=<epoch>') de una URL firmada de googlevideo, o None."""
+    value = parse_qs(urlsplit(url).query).get("expire", [None])[0]
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+def manifest_expiry(streams: Sequence[StreamInfo]) -> Optional[float]:
+    """Momento en que caduca la primera URL del manifiesto."""
+    expiries = [stream.expires for stream in streams if stream.expires]
+    return min(expiries) if expiries else None
+
+
+@dataclass(frozen=True)
+class SelectionPolicy:
+    """
+    Criterio de elección del stream de audio:
+
+    - 'best': mayor bitrate.
+    - 'smallest': menor tamaño (o bitrate, si el tamaño no se conoce).
+    - 'max-bitrate': mayor bitrate sin superar `max_bitrate` kbps (o el menor, si ninguno cabe).
+
+    `codecs` es la lista de códecs preferidos, por orden: si algún stream
+    usa uno de ellos, se elige entre los del primero disponible aunque otro
+    códec ofrezca más bitrate.
+    """
+    quality: str = "best"
+    max_bitrate: Optional[int] = None
+    codecs: Tuple[str, ...] = ()
+
+    def describe(self) -> str:
+        quality = f"max-bitrate={self.max_bitrate}" if self.quality == "max-bitrate" else self.quality
+        return quality + (f" ({', '.join(self.codecs)})" if self.codecs else "")
+
+
+def parse_policy(quality: str = "best", codecs: Sequence[str] = ()) -> SelectionPolicy:
+    """Construye una política a partir de '--quality' y '--codec'; lanza ValueError si no es válida."""
+    quality = (quality or "best").strip().lower()
+    max_bitrate = None
+    match = re.fullmatch(r"max-bitrate=(\d+)(?:k|kbps)?", quality)
+    if match:
+        quality, max_bitrate = "max-bitrate", int(match.group(1))
+    elif quality not in ("best", "smallest"):
+        raise ValueError(f"Calidad no válida: '{quality}' (usa {', '.join(QUALITIES)})")
+    prefixes = []
+    for codec in codecs:
+        name = codec.strip().lower()
+        if name not in CODEC_ALIASES:
+            raise ValueError(f"Códec desconocido: '{codec}' (usa {', '.join(sorted(CODEC_ALIASES))})")
+        if CODEC_ALIASES[name] not in prefixes:
+            prefixes.append(CODEC_ALIASES[name])
+    return SelectionPolicy(quality, max_bitrate, tuple(prefixes))
+
+
+def _codec_rank(stream: StreamInfo, codecs: Tuple[str, ...]) -> int:
+    for rank, prefix in enumerate(codecs):
+        if stream.codec.lower().startswith(prefix):
+            return rank
+    return len(codecs)
+
+
+def select_stream(streams: List[StreamInfo], policy: SelectionPolicy) -> Optional[StreamInfo]:
+    """Elige el stream que mejor cumple la política; None si no hay ninguno."""
+    candidates = list(streams)
+    if not candidates:
+        return None
+    limit = policy.max_bitrate * 1000 if policy.quality == "max-bitrate" else None
+    if policy.codecs:
+        # El orden de --codec manda sobre el bitrate: se elige dentro del primer
+        # códec preferido presente (con 'max-bitrate', el primero que tenga un
+        # stream dentro del límite).
+        ranks = sorted({_codec_rank(stream, policy.codecs) for stream in candidates} - {len(policy.codecs)})
+        groups = [[stream for stream in candidates if _codec_rank(stream, policy.codecs) == rank] for rank in ranks]
+        if groups:
+            candidates = groups[0]
+            if limit is not None:
+                candidates = next((group for group in groups if any(stream.bitrate <= limit for stream in group)),
+                                  candidates)
+
+    if policy.quality == "smallest":
+        # El tamaño real solo es comparable si todos lo informan; si no, el bitrate (misma duración)
+        if all(stream.filesize for stream in candidates):
+            return min(candidates, key=lambda stream: stream.filesize)
+        return min(candidates, key=lambda stream: stream.bitrate)
+    if limit is not None:
+        fitting = [stream for stream in candidates if stream.bitrate <= limit]
+        if not fitting:
+            return min(candidates, key=lambda stream: stream.bitrate)
+        candidates = fitting
+    return max(candidates, key=lambda stream: (stream.bitrate, -(stream.filesize or 0)))
+
+
+def is_fresh(expires: Optional[float], margin: float = EXPIRY_MARGIN) -> bool:
+    """True si la caducidad no se conoce o aún no llega (con `margin` segundos de margen)."""
+    return expires is None or expires - margin > time.time()
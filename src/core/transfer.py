@@ -0,0 +1,229 @@
+# src/core/transfer.py
+
+import http.client
+import os
+import threading
+import time
+from typing import List, Optional, Tuple
+
+from core import metrics, ratelimit
+from core.connections import HttpPool, get_pool
+
+# Tamaño de cada bloque leído de la red y escrito en el archivo `.part`.
+CHUNK_SIZE = 1024 * 1024
+# Cada cuántos bytes se sincroniza el `.part` a disco y se registra el offset verificado.
+SYNC_EVERY = 8 * CHUNK_SIZE
+# A partir de este tamaño se permite dividir la descarga en segmentos paralelos.
+SEGMENT_THRESHOLD = 64 * 1024 * 1024
+
+
+class TransferError(Exception):
+    """La transferencia no pudo completarse o no superó la verificación de integridad."""
+    pass
+
+
+class RangeNotSupported(TransferError):
+    """El servidor ignoró la cabecera Range (respondió 200 o sin Content-Range)."""
+    pass
+
+
+def download_file(url: str, dest: str, expected_size: Optional[int] = None, chunk_size: int = CHUNK_SIZE,
+                  segments: int = 1, retries: int = 3, timeout: float = 30.0, pool: Optional[HttpPool] = None) -> str:
+    """
+    Descarga `url` en `dest` de forma reanudable.
+
+    Los datos se escriben en `dest + '.part'` por bloques; tras cada
+    sincronización se guarda el offset verificado en `dest + '.part.offset'`.
+    Si la transferencia se interrumpe, la siguiente llamada trunca el `.part`
+    a ese offset y continúa con una petición HTTP Range. El archivo final solo
+    aparece, mediante un renombrado atómico, cuando su tamaño coincide con el
+    esperado. Con `segments > 1` y archivos grandes, el rango se reparte en
+    segmentos que se descargan en paralelo. Las peticiones usan el pool de
+    conexiones persistentes (`pool` o el compartido del proceso).
+    """
+    pool = pool or get_pool()
+    with metrics.span("fetch", item=dest) as current:
+        if expected_size is None:
+            expected_size = _probe_size(pool, url, timeout)
+
+        if expected_size is not None and os.path.exists(dest) and os.path.getsize(dest) == expected_size:
+            return dest
+
+        part = dest + ".part"
+        # Solo cuentan los bytes transferidos ahora, no los de un intento anterior
+        resumed = _read_offset(part) if os.path.exists(part) else 0
+        segmented = segments > 1 and expected_size and expected_size >= SEGMENT_THRESHOLD
+        if segmented:
+            try:
+                _download_segmented(pool, url, part, expected_size, segments, chunk_size, retries, timeout)
+            except RangeNotSupported:
+                # El servidor ignora Range: se descarga en un único flujo
+                segmented = False
+        if not segmented:
+            end = expected_size - 1 if expected_size else None
+            _with_retries(lambda: _fetch_range(pool, url, part, 0, end, chunk_size, timeout), retries)
+
+        actual_size = os.path.getsize(part)
+        current.bytes = max(0, actual_size - resumed)
+        if expected_size is not None and actual_size != expected_size:
+            raise TransferError(f"Tamaño inesperado para {os.path.basename(dest)}: {actual_size} de {expected_size} bytes")
+
+        os.replace(part, dest)
+        _clear_offset(part)
+        return dest
+
+
+def open_stream(url: str, timeout: float = 30.0, pool: Optional[HttpPool] = None):
+    """Abre `url` y retorna la respuesta HTTP para leerla en flujo (por ejemplo, hacia el conversor)."""
+    return (pool or get_pool()).get(url, timeout=timeout)
+
+
+def _probe_size(pool: HttpPool, url: str, timeout: float) -> Optional[int]:
+    """Obtiene Content-Length con una petición HEAD; None si el servidor no lo informa."""
+    try:
+        with pool.request("HEAD", url, timeout=timeout, preload=True) as response:
+            length = response.headers.get("Content-Length")
+            return int(length) if length else None
+    except (OSError, ValueError):
+        return None
+
+
+def _fetch_range(pool: HttpPool, url: str, part: str, start: int, end: Optional[int], chunk_size: int, timeout: float,
+                 require_range: bool = False):
+    """
+    Descarga los bytes `[start, end]` de `url` en `part`, reanudando desde el
+    último offset verificado de ese mismo archivo. Con `require_range` (un
+    segmento), lanza `RangeNotSupported` si el servidor no responde con el
+    rango pedido en lugar de escribir el cuerpo completo.
+    """
+    offset = _read_offset(part)
+    if os.path.exists(part):
+        with open(part, "r+b") as f:
+            f.truncate(offset)
+    else:
+        offset = 0
+
+    if end is not None and start + offset > end:
+        return
+
+    headers = {}
+    if start + offset > 0 or end is not None:
+        headers["Range"] = f"bytes={start + offset}-{'' if end is None else end}"
+
+    with pool.get(url, headers=headers, timeout=timeout) as response:
+        if require_range and (response.status != 206 or not response.headers.get("Content-Range")):
+            raise RangeNotSupported(f"El servidor no admite peticiones Range (HTTP {response.status}).")
+        if start + offset > 0 and response.status != 206:
+            if start > 0:
+                raise TransferError("El servidor no admite peticiones Range.")
+            # Sin soporte de Range para una descarga simple: se empieza de cero.
+            offset = 0
+        with open(part, "r+b" if offset else "wb") as f:
+            f.seek(offset)
+            unsynced = 0
+            while True:
+                chunk = response.read(chunk_size)
+                if not chunk:
+                    break
+                f.write(chunk)
+                offset += len(chunk)
+                unsynced += len(chunk)
+                if unsynced >= SYNC_EVERY:
+                    _sync(f, part, offset)
+                    unsynced = 0
+            _sync(f, part, offset)
+
+
+def _download_segmented(pool: HttpPool, url: str, part: str, size: int, segments: int, chunk_size: int, retries: int, timeout: float):
+    """
+    Descarga `segments` rangos en paralelo y los concatena en `part`. Si el
+    servidor ignora Range, descarta los segmentos y lanza `RangeNotSupported`.
+    """
+    ranges = _split_ranges(size, segments)
+    segment_parts = [f"{part}.{index}" for index in range(len(ranges))]
+    errors: List[Exception] = []
+
+    def worker(segment_part: str, start: int, end: int):
+        try:
+            _with_retries(lambda: _fetch_range(pool, url, segment_part, start, end, chunk_size, timeout, require_range=True),
+                          retries)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [
+        threading.Thread(target=worker, args=(segment_part, start, end), daemon=True)
+        for segment_part, (start, end) in zip(segment_parts, ranges)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if any(isinstance(error, RangeNotSupported) for error in errors):
+        for segment_part in segment_parts:
+            if os.path.exists(segment_part):
+                os.remove(segment_part)
+            _clear_offset(segment_part)
+        raise RangeNotSupported("El servidor no admite peticiones Range.")
+    if errors:
+        raise errors[0]
+
+    for segment_part, (start, end) in zip(segment_parts, ranges):
+        if os.path.getsize(segment_part) != end - start + 1:
+            raise TransferError(f"Segmento incompleto: {os.path.basename(segment_part)}")
+
+    with open(part, "wb") as out:
+        for segment_part in segment_parts:
+            with open(segment_part, "rb") as f:
+                while True:
+                    chunk = f.read(chunk_size)
+                    if not chunk:
+                        break
+                    out.write(chunk)
+        out.flush()
+        os.fsync(out.fileno())
+    for segment_part in segment_parts:
+        os.remove(segment_part)
+        _clear_offset(segment_part)
+
+
+def _split_ranges(size: int, segments: int) -> List[Tuple[int, int]]:
+    """Divide `[0, size)` en rangos inclusivos de tamaño similar."""
+    step = -(-size // segments)
+    return [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+
+def _with_retries(func, retries: int):
+    """
+    Reintenta `func` ante errores transitorios (red, 429, 5xx) con backoff
+    exponencial y Retry-After; cada intento reanuda desde el offset verificado.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return func()
+        except (http.client.HTTPException, OSError) as e:
+            if attempt == retries or not ratelimit.is_retryable(e):
+                raise TransferError(f"Transferencia interrumpida: {e}") from e
+            _, wait = ratelimit.error_details(e)
+            time.sleep(ratelimit.backoff_delay(attempt, wait))
+
+
+def _sync(f, part: str, offset: int):
+    f.flush()
+    os.fsync(f.fileno())
+    with open(part + ".offset", "w") as marker:
+        marker.write(str(offset))
+
+
+def _read_offset(part: str) -> int:
+    try:
+        with open(part + ".offset") as marker:
+            return int(marker.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def _clear_offset(part: str):
+    try:
+        os.remove(part + ".offset")
+    except OSError:
+        pass
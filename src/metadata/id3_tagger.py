@@ -1,46 +1,260 @@
 # src/metadata/id3_tagger.py
 
+import base64
+import os
 import mutagen
-from mutagen.id3 import ID3, TIT2, TPE1, TALB, TXXX, TCON, USLT
+from mutagen.flac import FLAC, Picture
+from mutagen.id3 import APIC, ID3, TALB, TCON, TDRC, TIT2, TPE1, TRCK, TSRC, TXXX, USLT
+from mutagen.mp4 import MP4, MP4Cover, MP4FreeForm
+from mutagen.oggopus import OggOpus
 import click
+from typing import Dict, List, Optional
 from rich.console import Console
 
 console = Console()
 
-def apply_tags(file_path: str, title: str, artist: str, album: str = None):
+# Metadatos de la fuente → clave de etiqueta (nombre Vorbis; ver `_ID3_FRAMES` y `_MP4_ATOMS`).
+SOURCE_TAGS = (('title', 'title'), ('artist', 'artist'), ('album', 'album'), ('track', 'tracknumber'),
+               ('year', 'date'), ('isrc', 'isrc'))
+# Claves de metadatos que una fuente puede aportar ('cover' es la ruta de la portada en caché).
+METADATA_KEYS = tuple(key for key, _ in SOURCE_TAGS) + ('cover',)
+# Etiquetas ReplayGain 2.0 (referencia de -18 LUFS) que escribe `write_replaygain`.
+REPLAYGAIN_KEYS = ('REPLAYGAIN_TRACK_GAIN', 'REPLAYGAIN_TRACK_PEAK', 'REPLAYGAIN_ALBUM_GAIN', 'REPLAYGAIN_ALBUM_PEAK')
+# Diferencia entre la referencia de ReplayGain 2.0 (-18 LUFS) y la de R128_*_GAIN en Opus (-23 LUFS).
+_R128_OFFSET = -5.0
+
+# Las etiquetas se escriben sobre el objeto completo de mutagen (no la vista
+# "easy"), así que texto y portada se aplican en una sola apertura y guardado.
+_ID3_FRAMES = {'title': TIT2, 'artist': TPE1, 'album': TALB, 'tracknumber': TRCK, 'date': TDRC, 'isrc': TSRC}
+_MP4_ATOMS = {'title': '\xa9nam', 'artist': '\xa9ART', 'album': '\xa9alb', 'date': '\xa9day',
+              'isrc': '----:com.apple.iTunes:ISRC'}
+
+
+def _read_tag(audio, key: str) -> Optional[str]:
+    if isinstance(audio.tags, ID3):
+        frame = audio.tags.get(_ID3_FRAMES[key].__name__)
+        return str(frame.text[0]) if frame is not None and frame.text else None
+    if isinstance(audio, MP4):
+        if key == 'tracknumber':
+            values = audio.tags.get('trkn')
+            if not values:
+                return None
+            number, total = values[0]
+            return f"{number}/{total}" if total else str(number)
+        values = audio.tags.get(_MP4_ATOMS[key])
+        if not values:
+            return None
+        value = values[0]
+        return bytes(value).decode("utf-8", "replace") if isinstance(value, MP4FreeForm) else str(value)
+    values = audio.tags.get(key)
+    return str(values[0]) if values else None
+
+
+def _write_tag(audio, key: str, value: str):
+    if isinstance(audio.tags, ID3):
+        frame = _ID3_FRAMES[key]
+        audio.tags.setall(frame.__name__, [frame(encoding=3, text=[value])])
+    elif isinstance(audio, MP4):
+        if key == 'tracknumber':
+            number, _, total = value.partition("/")
+            audio.tags['trkn'] = [(int(number), int(total or 0))]
+        elif key == 'isrc':
+            audio.tags[_MP4_ATOMS[key]] = [MP4FreeForm(value.encode("utf-8"))]
+        else:
+            audio.tags[_MP4_ATOMS[key]] = [value]
+    else:
+        audio.tags[key] = [value]
+
+
+def update_tags(audio, tags: Dict[str, Optional[str]]) -> List[str]:
+    """
+    Escribe en `audio` (ya abierto con mutagen, sin easy) solo las etiquetas
+    cuyo valor cambia. Las que el formato no admite se omiten. Retorna las
+    claves modificadas; no guarda el archivo.
+    """
+    if audio.tags is None:
+        audio.add_tags()
+    changed = []
+    for key, value in tags.items():
+        if not value:
+            continue
+        try:
+            if _read_tag(audio, key) != value:
+                _write_tag(audio, key, value)
+                changed.append(key)
+        except (KeyError, ValueError, TypeError):
+            continue
+    return changed
+
+
+def source_tags(metadata: dict) -> Dict[str, Optional[str]]:
+    """Etiquetas para los metadatos de una pista ('track' → 'tracknumber', 'year' → 'date'...)."""
+    return {tag: str(metadata[key]) if metadata.get(key) else None for key, tag in SOURCE_TAGS}
+
+
+def set_cover(audio, image_path: str) -> bool:
+    """
+    Pone la portada en `audio` (ya abierto con mutagen, sin easy): APIC en
+    ID3, 'covr' en MP4, bloque PICTURE en FLAC y Ogg. Retorna False si ya
+    tiene esa imagen; no guarda el archivo.
+    """
+    with open(image_path, "rb") as f:
+        data = f.read()
+    mime = "image/png" if image_path.endswith(".png") else "image/jpeg"
+    if audio.tags is None:
+        audio.add_tags()
+
+    if isinstance(audio.tags, ID3):
+        if any(frame.data == data for frame in audio.tags.getall("APIC")):
+            return False
+        audio.tags.delall("APIC")
+        audio.tags.add(APIC(encoding=3, mime=mime, type=3, desc="Cover", data=data))
+    elif isinstance(audio, MP4):
+        if any(bytes(cover) == data for cover in audio.tags.get("covr", [])):
+            return False
+        image_format = MP4Cover.FORMAT_PNG if mime == "image/png" else MP4Cover.FORMAT_JPEG
+        audio.tags["covr"] = [MP4Cover(data, imageformat=image_format)]
+    else:
+        picture = Picture()
+        picture.type, picture.mime, picture.desc, picture.data = 3, mime, "Cover", data
+        if isinstance(audio, FLAC):
+            if any(existing.data == data for existing in audio.pictures):
+                return False
+            audio.clear_pictures()
+            audio.add_picture(picture)
+        else:
+            current = [Picture(base64.b64decode(value)).data for value in audio.tags.get("metadata_block_picture", [])]
+            if data in current:
+                return False
+            audio.tags["metadata_block_picture"] = [base64.b64encode(picture.write()).decode("ascii")]
+    return True
+
+
+def embed_cover(file_path: str, image_path: str) -> bool:
+    """Incrusta la portada en el archivo. Retorna False sin reescribirlo si ya tiene esa imagen."""
+    audio = mutagen.File(file_path)
+    if audio is None or not set_cover(audio, image_path):
+        return False
+    audio.save()
+    return True
+
+
+def apply_tags(file_path: str, title: str, artist: str, album: str = None, track=None, year: str = None,
+               isrc: str = None, cover: str = None):
     """
-    Aplica etiquetas de metadatos (ID3) a un archivo de audio.
+    Aplica etiquetas de metadatos (ID3) a un archivo de audio: las básicas y,
+    si la fuente las conoce, número de pista, fecha, ISRC y portada (`cover`
+    es la ruta de la imagen).
     """
     try:
         # Abre el archivo para etiquetado
-        audio = mutagen.File(file_path, easy=True)
-        if not audio:
+        audio = mutagen.File(file_path)
+        if audio is None:
             console.log(f"[bold red]❌ Error:[/bold red] Formato de archivo no soportado para etiquetado: {file_path}")
             return False
 
-        audio['title'] = title
-        audio['artist'] = artist
-        if album:
-            audio['album'] = album
-        
-        audio.save()
+        # Solo se reescribe el archivo (una vez) si alguna etiqueta cambia
+        metadata = {'title': title, 'artist': artist, 'album': album, 'track': track, 'year': year, 'isrc': isrc}
+        changed = update_tags(audio, source_tags(metadata))
+        if cover and set_cover(audio, cover):
+            changed.append('cover')
+        if changed:
+            audio.save()
         console.log(f"  [bold green]✅ Metadatos aplicados:[/bold green] {title} por {artist}")
         return True
     except Exception as e:
         console.log(f"[bold red]❌ Error al aplicar metadatos:[/bold red] {e}")
         return False
 
-def get_metadata_from_source(file_path: str) -> dict:
+
+def get_metadata_from_source(file_path: str, source: Optional[dict] = None) -> dict:
     """
-    Simulación de búsqueda de metadatos. En un proyecto real, se usaría
-    una API como la de MusicBrainz.
+    Metadatos de la pista: los que aportó la fuente (`source`, por ejemplo
+    el track de Spotify con álbum, número, fecha, ISRC y portada) y, si
+    faltan el título o el artista, los que se deducen del nombre del archivo.
     """
-    # En un proyecto real, buscarías metadatos en MusicBrainz o similar.
-    # Aquí simulamos la obtención de metadatos del nombre del archivo.
-    base_name = file_path.split("/")[-1].replace(".mp4", "").replace(".mp3", "")
+    metadata = {key: source[key] for key in METADATA_KEYS if source and source.get(key)}
+    if metadata.get('title') and metadata.get('artist'):
+        return metadata
+    # Sin datos de la fuente, se deducen del nombre "Artista - Título"
+    base_name = os.path.splitext(os.path.basename(file_path))[0]
     parts = base_name.split(" - ")
     if len(parts) >= 2:
-        artist = parts[0].strip()
-        title = parts[1].strip()
-        return {"title": title, "artist": artist}
-    return {"title": base_name, "artist": "Desconocido"}
\ No newline at end of file
+        metadata.setdefault('artist', parts[0].strip())
+        metadata.setdefault('title', parts[1].strip())
+    else:
+        metadata.setdefault('title', base_name)
+        metadata.setdefault('artist', "Desconocido")
+    return metadata
+
+
+def _replaygain_values(track_gain: float, track_peak: float, album_gain: Optional[float], album_peak: Optional[float]) -> Dict[str, str]:
+    values = {'REPLAYGAIN_TRACK_GAIN': f"{track_gain:.2f} dB", 'REPLAYGAIN_TRACK_PEAK': f"{track_peak:.6f}"}
+    if album_gain is not None:
+        values['REPLAYGAIN_ALBUM_GAIN'] = f"{album_gain:.2f} dB"
+        values['REPLAYGAIN_ALBUM_PEAK'] = f"{album_peak or 0.0:.6f}"
+    return values
+
+
+def read_replaygain(file_path: str) -> Dict[str, str]:
+    """Etiquetas ReplayGain presentes en el archivo (ID3 TXXX, átomos MP4 o comentarios Vorbis)."""
+    audio = mutagen.File(file_path)
+    if audio is None or audio.tags is None:
+        return {}
+    found = {}
+    for key in REPLAYGAIN_KEYS:
+        if isinstance(audio.tags, ID3):
+            frame = audio.tags.get(f"TXXX:{key}")
+            value = str(frame.text[0]) if frame is not None and frame.text else None
+        elif isinstance(audio, MP4):
+            atoms = audio.tags.get(f"----:com.apple.iTunes:{key}")
+            value = bytes(atoms[0]).decode("utf-8", "replace") if atoms else None
+        else:
+            values = audio.tags.get(key)
+            value = values[0] if values else None
+        if value:
+            found[key] = value
+    return found
+
+
+def has_replaygain(file_path: str, album: bool = False) -> bool:
+    """True si el archivo ya tiene las etiquetas ReplayGain de pista (y de álbum, con `album`)."""
+    try:
+        found = read_replaygain(file_path)
+    except Exception:
+        return False
+    keys = REPLAYGAIN_KEYS if album else REPLAYGAIN_KEYS[:2]
+    return all(key in found for key in keys)
+
+
+def write_replaygain(file_path: str, track_gain: Optional[float], track_peak: float,
+                     album_gain: Optional[float] = None, album_peak: Optional[float] = None) -> bool:
+    """
+    Escribe la ganancia y el pico ReplayGain 2.0 en el formato de etiquetas
+    del archivo. En Opus también escribe R128_TRACK_GAIN/R128_ALBUM_GAIN
+    (Q7.8 relativo a -23 LUFS), que es lo que aplican sus reproductores.
+    Retorna False si no hay ganancia (pista en silencio) o el formato no admite etiquetas.
+    """
+    if track_gain is None:
+        return False
+    audio = mutagen.File(file_path)
+    if audio is None:
+        return False
+    if audio.tags is None:
+        audio.add_tags()
+    values = _replaygain_values(track_gain, track_peak, album_gain, album_peak)
+    if isinstance(audio.tags, ID3):
+        for key, value in values.items():
+            audio.tags.add(TXXX(encoding=3, desc=key, text=[value]))
+    elif isinstance(audio, MP4):
+        for key, value in values.items():
+            audio.tags[f"----:com.apple.iTunes:{key}"] = [MP4FreeForm(value.encode("utf-8"))]
+    else:
+        for key, value in values.items():
+            audio.tags[key] = [value]
+        if isinstance(audio, OggOpus):
+            audio.tags['R128_TRACK_GAIN'] = [str(round((track_gain + _R128_OFFSET) * 256))]
+            if album_gain is not None:
+                audio.tags['R128_ALBUM_GAIN'] = [str(round((album_gain + _R128_OFFSET) * 256))]
+    audio.save()
+    return True
@@ -0,0 +1,159 @@
+# src/metadata/postprocess.py
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+import mutagen
+from rich.console import Console
+
+from core import metrics
+from core.layout import PathLayout
+from metadata.id3_tagger import set_cover, source_tags, update_tags
+
+console = Console()
+
+
+def sanitize(text: str) -> str:
+    """Deja solo caracteres alfanuméricos y espacios."""
+    return "".join(c for c in text if c.isalnum() or c.isspace()).strip()
+
+
+def target_path(file_path: str, title: str, artist: str, output_dir: str,
+                layout: Optional[PathLayout] = None, **fields) -> Optional[Path]:
+    """
+    Ruta final en formato "Artista - Título.ext" o, con `layout`, la que dicte
+    su plantilla (`fields` aporta 'album', 'track' y 'year'). Retorna None si
+    los metadatos no producen un nombre válido.
+    """
+    if layout is not None:
+        relative = layout.relative_path({**fields, 'title': title, 'artist': artist}, Path(file_path).suffix)
+        return Path(output_dir, *relative.split("/")) if relative else None
+    valid_title = sanitize(title)
+    valid_artist = sanitize(artist)
+    if not valid_title or not valid_artist:
+        return None
+    return Path(output_dir) / f"{valid_artist} - {valid_title}{Path(file_path).suffix}"
+
+
+def _move_to_free_path(file_path: str, target: Path) -> Path:
+    """
+    Mueve el archivo a `target` o, si ya existe, al primer nombre libre con
+    sufijo " (2)", " (3)"... (el mismo criterio que `organize`). El enlace
+    duro falla si el destino existe, así que dos hilos nunca reclaman el
+    mismo nombre; sin enlaces duros se comprueba antes de `os.replace`.
+    """
+    candidate, n = target, 1
+    while True:
+        try:
+            os.link(file_path, candidate)
+        except FileExistsError:
+            pass
+        except OSError:
+            if not os.path.exists(candidate):
+                os.replace(file_path, candidate)
+                return candidate
+        else:
+            os.remove(file_path)
+            return candidate
+        n += 1
+        candidate = target.with_name(f"{target.stem} ({n}){target.suffix}")
+
+
+def rename_and_organize(file_path: str, title: str, artist: str, output_dir: str,
+                        layout: Optional[PathLayout] = None, **fields) -> str:
+    """
+    Renombra y organiza un archivo en un formato consistente.
+    Formato: "Artista - Título.mp3", o el de `layout` si se indica.
+    El renombrado es atómico: el archivo nunca queda a medias, y si el
+    destino ya lo ocupa otro archivo se usa un nombre libre en lugar de
+    sobrescribirlo.
+    """
+    if not os.path.exists(file_path):
+        console.log(f"[bold red]❌ Error: El archivo '{file_path}' no existe.[/bold red]")
+        return file_path
+
+    new_path = target_path(file_path, title, artist, output_dir, layout, **fields)
+    # Maneja el caso de que la información sea inválida
+    if new_path is None:
+        console.log("[bold yellow]⚠️ Advertencia:[/bold yellow] No se pudo obtener metadatos válidos para renombrar.")
+        return file_path
+    if os.path.abspath(new_path) == os.path.abspath(file_path):
+        return file_path
+
+    try:
+        if new_path.parent != Path(output_dir):
+            new_path.parent.mkdir(parents=True, exist_ok=True)
+        new_path = _move_to_free_path(file_path, new_path)
+        console.log(f"  [bold green]✅ Archivo renombrado a:[/bold green] {new_path.name}")
+        return str(new_path)
+    except Exception as e:
+        console.log(f"[bold red]❌ Error al renombrar el archivo:[/bold red] {e}")
+        return file_path
+
+
+def process_file(file_path: str, metadata: dict, output_dir: str, layout: Optional[PathLayout] = None) -> dict:
+    """
+    Post-procesado de un archivo en una sola pasada: lo abre y analiza una
+    vez, escribe solo las etiquetas que cambian (con 'cover' en `metadata`,
+    también la portada si el archivo no la tiene ya), lo guarda una sola vez
+    y solo si algo cambió, y finalmente lo renombra de forma atómica (dentro
+    de `output_dir`, según `layout`).
+    Retorna {'path', 'tags_written', 'renamed'}.
+    """
+    result = {'path': file_path, 'tags_written': [], 'renamed': False}
+    tags = source_tags(metadata)
+
+    with metrics.span("tag", item=file_path) as current:
+        try:
+            audio = mutagen.File(file_path)
+        except Exception as e:
+            console.log(f"[bold red]❌ Error al leer metadatos:[/bold red] {e}")
+            audio = None
+
+        if audio is None:
+            current.ok = False
+            console.log(f"[bold red]❌ Error:[/bold red] Formato de archivo no soportado para etiquetado: {file_path}")
+        else:
+            changed = update_tags(audio, tags)
+            if metadata.get('cover'):
+                try:
+                    if set_cover(audio, metadata['cover']):
+                        changed.append('cover')
+                except Exception as e:
+                    console.log(f"[bold yellow]⚠️ No se pudo incrustar la portada:[/bold yellow] {e}")
+            if changed:
+                audio.save()
+                # Guardar reescribe el archivo entero: esos son los bytes de la etapa
+                current.bytes = os.path.getsize(file_path)
+                result['tags_written'] = changed
+                console.log(f"  [bold green]✅ Metadatos aplicados:[/bold green] {tags['title']} por {tags['artist']} ({', '.join(changed)})")
+            else:
+                console.log(f"  [dim]Etiquetas al día, no se reescribe:[/dim] {os.path.basename(file_path)}")
+
+    if tags['title'] and tags['artist']:
+        with metrics.span("rename", item=file_path):
+            new_path = rename_and_organize(
+                file_path, tags['title'], tags['artist'], output_dir, layout,
+                album=metadata.get('album'), track=metadata.get('track'), year=metadata.get('year'),
+            )
+        result['renamed'] = new_path != file_path
+        result['path'] = new_path
+    return result
+
+
+def process_batch(items: Iterable[dict], output_dir: str, workers: int = 4, layout: Optional[PathLayout] = None) -> List[dict]:
+    """
+    Aplica `process_file` a muchos archivos con un pool de hilos. Cada item
+    es un diccionario con 'path' y los metadatos ('title', 'artist', 'album'...).
+    """
+    def run(item: dict) -> dict:
+        try:
+            return process_file(item['path'], item, output_dir, layout)
+        except Exception as e:
+            console.log(f"[bold red]❌ Error en el post-procesado de {item['path']}:[/bold red] {e}")
+            return {'path': item['path'], 'tags_written': [], 'renamed': False, 'error': str(e)}
+
+    with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="postprocess") as pool:
+        return list(pool.map(run, items))
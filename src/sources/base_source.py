@@ -1,11 +1,51 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from core import connections, ratelimit
+
+
+class DownloadError(Exception):
+    """
+    Error al descargar una URL concreta. Las fuentes lo lanzan en lugar de
+    terminar el proceso, para que el fallo quede aislado a esa URL.
+    """
+    pass
+
 
 class BaseSource(ABC):
     """
     Clase base abstracta que define la interfaz para los proveedores de fuentes de descarga.
     Cada nueva fuente (YouTube, SoundCloud, etc.) debe heredar de esta clase.
     """
+    # Límite por defecto de la fuente: (peticiones por segundo, ráfaga). Se
+    # puede ajustar con la variable de entorno MUSIC_CLI_RATE_<FUENTE>.
+    rate_limit = (5.0, 10)
+    # Datos para el registro de fuentes (`sources.registry`) cuando la fuente
+    # se publica como entry point: dominios y esquemas de URI que atiende,
+    # opciones de construcción que acepta y si participa en la búsqueda.
+    hosts: Tuple[str, ...] = ()
+    schemes: Tuple[str, ...] = ()
+    options: Tuple[str, ...] = ()
+    searchable = True
+
+    @property
+    def limiter(self) -> ratelimit.RateLimiter:
+        """Limitador compartido por todas las instancias de la fuente."""
+        return ratelimit.get_limiter(self.get_source_name(), *self.rate_limit)
+
+    @property
+    def http(self) -> connections.HttpPool:
+        """Pool de conexiones HTTP persistentes compartido por todas las fuentes."""
+        return connections.get_pool()
+
+    def _call(self, func: Callable, *args, **kwargs):
+        """
+        Llama al backend de la fuente a través de su limitador: respeta el
+        ritmo permitido y reintenta los errores transitorios (429, 5xx, red)
+        con backoff exponencial y Retry-After.
+        """
+        return self.limiter.call(func, *args, **kwargs)
+
     @abstractmethod
     def is_valid_url(self, url: str) -> bool:
         """Verifica si la URL es válida para esta fuente."""
@@ -24,6 +64,27 @@ class BaseSource(ABC):
         """
         pass
 
+    def get_source_id(self, url: str) -> Optional[str]:
+        """
+        Devuelve un ID estable de la pista ('youtube:<id>', 'spotify:<id>')
+        sin acceder a la red, o None si la URL no identifica una sola pista.
+        """
+        return None
+
+    def iter_download(self, url: str, output_path: str, skip: Optional[Callable[[str], bool]] = None) -> Iterator[dict]:
+        """
+        Versión en flujo de `download`: produce un diccionario por archivo
+        descargado (al menos con 'path' y, si se conoce, 'source_id') en cuanto
+        está disponible. `skip` recibe un ID de pista y retorna True si debe
+        omitirse (por ejemplo, porque ya figura en el manifiesto).
+        Las fuentes que puedan producir resultados incrementalmente deben sobrescribirlo.
+        """
+        source_id = self.get_source_id(url)
+        if skip is not None and source_id is not None and skip(source_id):
+            return
+        for file_path in self.download(url, output_path):
+            yield {'path': file_path, 'source_id': source_id}
+
     @abstractmethod
     def search(self, query: str) -> List[dict]:
         """
@@ -0,0 +1,194 @@
+# src/sources/registry.py
+
+import importlib
+import threading
+from dataclasses import dataclass
+from importlib.metadata import entry_points
+from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from urllib.parse import urlparse
+
+from rich.console import Console
+
+from sources.base_source import BaseSource
+
+console = Console()
+
+# Grupo de entry points con el que los paquetes externos registran fuentes:
+#   [project.entry-points."music_cli.sources"]
+#   bandcamp = "music_cli_bandcamp:SPEC"   # un ProviderSpec, o una subclase de BaseSource con `hosts`
+ENTRY_POINT_GROUP = "music_cli.sources"
+
+
+@dataclass(frozen=True)
+class ProviderSpec:
+    """
+    Descripción de una fuente sin instanciarla (ni importar su módulo):
+    `target` es "modulo:Clase" o una fábrica, `hosts` los dominios que
+    atiende (los subdominios se resuelven por su dominio padre), `schemes`
+    los esquemas de URI propios ('spotify:track:...') y `options` las
+    opciones de construcción que acepta (segments, transcode, policy).
+    """
+    name: str
+    target: Union[str, Callable[..., BaseSource]]
+    hosts: Tuple[str, ...] = ()
+    schemes: Tuple[str, ...] = ()
+    options: Tuple[str, ...] = ()
+    searchable: bool = True
+
+    def factory(self) -> Callable[..., BaseSource]:
+        if callable(self.target):
+            return self.target
+        module, _, attr = self.target.partition(":")
+        return getattr(importlib.import_module(module), attr)
+
+
+# Fuentes incluidas. Spotify no participa en la búsqueda federada: requiere
+# credenciales y sus resultados se descargan igualmente desde YouTube.
+BUILTIN = (
+    ProviderSpec("youtube", "sources.youtube:YouTubeSource", hosts=("youtube.com", "youtu.be"),
+                 options=("segments", "transcode", "policy")),
+    ProviderSpec("soundcloud", "sources.soundcloud:SoundCloudSource", hosts=("soundcloud.com",)),
+    ProviderSpec("spotify", "sources.spotify:SpotifySource", hosts=("spotify.com",), schemes=("spotify",),
+                 searchable=False),
+)
+
+
+def _spec_from_entry_point(entry_point) -> ProviderSpec:
+    loaded = entry_point.load()
+    if isinstance(loaded, ProviderSpec):
+        return loaded
+    if isinstance(loaded, type) and issubclass(loaded, BaseSource):
+        return ProviderSpec(
+            entry_point.name, loaded, hosts=tuple(loaded.hosts), schemes=tuple(loaded.schemes),
+            options=tuple(loaded.options), searchable=loaded.searchable,
+        )
+    raise TypeError(f"se esperaba un ProviderSpec o una subclase de BaseSource, no {type(loaded).__name__}")
+
+
+def discover() -> List[ProviderSpec]:
+    """Fuentes incluidas más las registradas por paquetes externos (estas reemplazan a las de igual nombre)."""
+    specs = list(BUILTIN)
+    for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+        try:
+            specs.append(_spec_from_entry_point(entry_point))
+        except Exception as e:
+            console.log(f"[bold yellow]⚠️ No se pudo cargar la fuente '{entry_point.name}':[/bold yellow] {e}")
+    return specs
+
+
+def _host_of(url: str) -> Optional[str]:
+    parsed = urlparse(url if "://" in url else f"//{url}")
+    return parsed.hostname
+
+
+class ProviderRegistry:
+    """
+    Registro de fuentes indexado por dominio: despachar una URL cuesta un
+    acceso a diccionario por nivel del dominio ('music.youtube.com' →
+    'youtube.com') en lugar de preguntar a cada fuente. Las fuentes se
+    instancian la primera vez que se usan (importar pytube o autenticarse en
+    Spotify solo ocurre si llega una URL suya) y la instancia se reutiliza
+    durante todo el proceso.
+
+    Cuando varias fuentes comparten dominio, se desempata con su
+    `is_valid_url`, en orden de registro.
+    """
+
+    def __init__(self, specs: Iterable[ProviderSpec] = (), **options):
+        self.options = options
+        self._lock = threading.RLock()
+        self._specs: Dict[str, ProviderSpec] = {}
+        self._hosts: Dict[str, List[str]] = {}
+        self._schemes: Dict[str, List[str]] = {}
+        self._instances: Dict[str, BaseSource] = {}
+        for spec in specs:
+            self.register(spec)
+
+    def register(self, spec: ProviderSpec):
+        """Añade (o reemplaza, si ya existe una con su nombre) una fuente."""
+        with self._lock:
+            self._specs[spec.name] = spec
+            self._instances.pop(spec.name, None)
+            self._reindex()
+
+    def _reindex(self):
+        self._hosts, self._schemes = {}, {}
+        for spec in self._specs.values():
+            for host in spec.hosts:
+                self._hosts.setdefault(host.lower(), []).append(spec.name)
+            for scheme in spec.schemes:
+                self._schemes.setdefault(scheme.lower(), []).append(spec.name)
+
+    def configure(self, **options):
+        """
+        Cambia las opciones de construcción. Solo se descartan las instancias
+        de las fuentes que aceptan alguna opción que haya cambiado.
+        """
+        with self._lock:
+            changed = {key for key, value in options.items() if self.options.get(key) != value}
+            self.options.update(options)
+            for name in list(self._instances):
+                if changed.intersection(self._specs[name].options):
+                    del self._instances[name]
+
+    def names(self) -> List[str]:
+        return list(self._specs)
+
+    def get(self, name: str) -> BaseSource:
+        """Instancia de la fuente `name`, creada en el primer uso. Lanza KeyError si no existe."""
+        with self._lock:
+            provider = self._instances.get(name)
+            if provider is None:
+                spec = self._specs[name]
+                options = {key: self.options[key] for key in spec.options if key in self.options}
+                provider = spec.factory()(**options)
+                self._instances[name] = provider
+            return provider
+
+    def candidates(self, url: str) -> List[str]:
+        """Nombres de las fuentes que atienden el dominio (o esquema) de la URL, sin instanciarlas."""
+        scheme, _, rest = url.partition(":")
+        if rest and not rest.startswith("//") and scheme.lower() in self._schemes:
+            return self._schemes[scheme.lower()]
+        host = _host_of(url)
+        if not host:
+            return []
+        labels = host.rstrip(".").split(".")
+        for start in range(len(labels)):
+            names = self._hosts.get(".".join(labels[start:]))
+            if names:
+                return names
+        return []
+
+    def for_url(self, url: str) -> Optional[BaseSource]:
+        """Fuente que atiende la URL, o None si ninguna la soporta."""
+        names = self.candidates(url)
+        if len(names) == 1:
+            return self.get(names[0])
+        for name in names:
+            provider = self.get(name)
+            if provider.is_valid_url(url):
+                return provider
+        return None
+
+    def searchable(self) -> List[BaseSource]:
+        """Instancias de las fuentes que participan en la búsqueda federada."""
+        return [self.get(name) for name, spec in list(self._specs.items()) if spec.searchable]
+
+    def loaded(self) -> List[BaseSource]:
+        """Fuentes ya instanciadas (las que el proceso ha llegado a usar)."""
+        with self._lock:
+            return list(self._instances.values())
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_registry() -> ProviderRegistry:
+    """Registro compartido por todo el proceso, con las fuentes incluidas y las de los entry points."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = ProviderRegistry(discover())
+        return _shared
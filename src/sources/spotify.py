@@ -1,8 +1,14 @@
 import click
 import os
-from .base_source import BaseSource
+import re
+import threading
+from .base_source import BaseSource, DownloadError
+from core import metrics
+from core.cache import get_resolution_cache, query_key
+from core.covers import get_cover_cache
+from . import registry
 from .youtube import YouTubeSource
-from typing import List
+from typing import Callable, Iterator, List, Optional
 from rich.console import Console
 from rich.prompt import Prompt
 import spotipy
@@ -10,88 +16,265 @@ from spotipy.oauth2 import SpotifyClientCredentials
 
 console = Console()
 
+_KIND_RE = re.compile(r"(track|playlist|album|artist)[/:]")
+
+# Campos de cada item de playlist: los del etiquetado (número, ISRC, álbum con
+# fecha y portadas) vienen en la misma página; 'next' es necesario para paginar.
+_PLAYLIST_FIELDS = ("items(track(id,name,type,track_number,external_ids(isrc),artists(name),"
+                    "album(id,name,release_date,total_tracks,images(url,width)))),next")
+
+# Límite de IDs por petición en los endpoints de varios IDs de la API de Spotify.
+_MAX_IDS_PER_REQUEST = 50
+
+
+def _batched(items: List[str], size: int) -> Iterator[List[str]]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _has_details(track: dict) -> bool:
+    """True si el track trae lo necesario para etiquetar (número, ISRC y álbum con fecha)."""
+    return bool(track.get('track_number') and track.get('external_ids') is not None
+                and (track.get('album') or {}).get('release_date'))
+
+
+def track_metadata(track: dict) -> dict:
+    """
+    Metadatos de etiquetado de un track de Spotify: título, artista, álbum,
+    número ('3/12'), fecha de publicación, ISRC y URL de la portada (la de
+    mayor tamaño).
+    """
+    album = track.get('album') or {}
+    images = sorted(album.get('images') or [], key=lambda image: image.get('width') or 0, reverse=True)
+    number = track.get('track_number')
+    if number and album.get('total_tracks'):
+        number = f"{number}/{album['total_tracks']}"
+    return {
+        'title': track['name'],
+        'artist': track['artists'][0]['name'],
+        'album': album.get('name'),
+        'track': number,
+        'year': album.get('release_date'),
+        'isrc': (track.get('external_ids') or {}).get('isrc'),
+        'cover_url': images[0]['url'] if images else None,
+    }
+
+
 class SpotifySource(BaseSource):
     """
     Proveedor para descargar música desde Spotify.
     Se usa la API de Spotify para obtener metadatos y luego se busca la canción en YouTube.
     """
-    def __init__(self):
+    rate_limit = (10.0, 20)
+    def __init__(self, youtube: Optional[YouTubeSource] = None):
         super().__init__()
+        # El cliente de la API se crea en el primer uso (ver `sp`)
+        self._sp = None
+        self._sp_ready = False
+        self._sp_lock = threading.Lock()
+        self._youtube = youtube
+
+    @property
+    def sp(self) -> Optional[spotipy.Spotify]:
+        """Cliente de la API de Spotify, o None si no hay credenciales."""
+        with self._sp_lock:
+            if not self._sp_ready:
+                self._sp = self._connect()
+                self._sp_ready = True
+            return self._sp
+
+    def _connect(self) -> Optional[spotipy.Spotify]:
         try:
             client_id = os.environ.get("SPOTIPY_CLIENT_ID")
             client_secret = os.environ.get("SPOTIPY_CLIENT_SECRET")
             if not client_id or not client_secret:
                 console.log("[bold red]❌ Error:[/bold red] Variables de entorno SPOTIPY_CLIENT_ID y SPOTIPY_CLIENT_SECRET no encontradas.")
                 console.log("Obtén tus credenciales en el 'Spotify Developer Dashboard'.")
-                self.sp = None
-            else:
-                self.sp = spotipy.Spotify(auth_manager=SpotifyClientCredentials(client_id=client_id, client_secret=client_secret))
-                self.youtube_source = YouTubeSource()
+                return None
+            # Las peticiones (incluido el token) reutilizan las conexiones del pool
+            # compartido; los reintentos los gestiona el limitador de la fuente
+            session = self.http.requests_session()
+            return spotipy.Spotify(
+                auth_manager=SpotifyClientCredentials(client_id=client_id, client_secret=client_secret, requests_session=session),
+                requests_session=session, retries=0, status_retries=0,
+            )
         except Exception as e:
             console.log(f"[bold red]❌ Error al inicializar Spotipy:[/bold red] {e}")
-            self.sp = None
+            return None
+
+    @property
+    def youtube_source(self) -> YouTubeSource:
+        """Fuente de YouTube que descarga los tracks: la del registro del proceso, con sus opciones."""
+        return self._youtube or registry.get_registry().get("youtube")
 
     def is_valid_url(self, url: str) -> bool:
-        return "spotify.com" in url
+        return "spotify.com" in url or url.startswith("spotify:")
 
     def get_source_name(self) -> str:
         return "Spotify"
 
+    def get_source_id(self, url: str) -> Optional[str]:
+        if self._url_kind(url) == "track":
+            return f"spotify:{self._extract_id(url)}"
+        return None
+
+    def _extract_id(self, url: str) -> str:
+        """Extrae el ID de una URL (open.spotify.com/...) o URI (spotify:track:...) de Spotify."""
+        return url.split('/')[-1].split(':')[-1].split('?')[0]
+
+    def _url_kind(self, url: str) -> Optional[str]:
+        """Tipo de recurso de la URL: 'track', 'playlist', 'album', 'artist' o None."""
+        match = _KIND_RE.search(url)
+        return match.group(1) if match else None
+
     def download(self, url: str, output_path: str) -> List[str]:
+        return [entry['path'] for entry in self.iter_download(url, output_path)]
+
+    def iter_download(self, url: str, output_path: str, skip: Optional[Callable[[str], bool]] = None) -> Iterator[dict]:
         if not self.sp:
-            return []
+            return
         
         console.log(f"[bold]Analizando URL de Spotify:[/bold] {url}")
+        kind = self._url_kind(url)
         
-        # Lógica para manejar URLs de tracks o playlists
-        if "track" in url:
+        if kind == "track":
+            source_id = self.get_source_id(url)
+            if skip is not None and skip(source_id):
+                console.log(f"[dim]↷ Ya descargado, se omite:[/dim] {url}")
+                return
             try:
-                track = self.sp.track(url)
-                title = track['name']
-                artist = track['artists'][0]['name']
-                query = f"{artist} - {title} official audio"
-                
-                console.log(f"  [bold]Encontrado:[/bold] '{title}' de {artist}. Buscando en YouTube...")
-                
-                # Usamos el proveedor de YouTube para la descarga real
-                youtube_results = self.youtube_source.search(query)
-                if youtube_results:
-                    return self.youtube_source.download(youtube_results[0]['url'], output_path)
-                else:
-                    console.log("[bold yellow]No se encontraron resultados en YouTube para descargar.[/bold yellow]")
-                    return []
+                track = self._call(self.sp.track, url)
+                console.log(f"  [bold]Encontrado:[/bold] '{track['name']}' de {track['artists'][0]['name']}. Buscando en YouTube...")
+                yield from self._download_track(track, output_path)
             except Exception as e:
                 console.log(f"[bold red]❌ Error al obtener detalles del track:[/bold red] {e}")
-                return []
+                raise DownloadError(f"Spotify: {e}") from e
         
-        elif "playlist" in url:
+        elif kind in ("playlist", "album", "artist"):
+            tracks = {
+                "playlist": self.iter_playlist_tracks,
+                "album": self.iter_album_tracks,
+                "artist": self.iter_artist_top_tracks,
+            }[kind](self._extract_id(url))
             try:
-                playlist_id = url.split('/')[-1].split('?')[0]
-                playlist_items = self.sp.playlist_items(playlist_id)
-                
-                downloaded_files = []
-                for item in playlist_items['items']:
-                    track = item['track']
-                    title = track['name']
-                    artist = track['artists'][0]['name']
-                    query = f"{artist} - {title} official audio"
+                # Cada track se resuelve y descarga en cuanto llega su página
+                for track in tracks:
+                    if skip is not None and skip(f"spotify:{track['id']}"):
+                        continue
                     
-                    console.log(f"  [bold]Procesando track de playlist:[/bold] '{title}' de {artist}")
-                    youtube_results = self.youtube_source.search(query)
-                    if youtube_results:
-                        files = self.youtube_source.download(youtube_results[0]['url'], output_path)
-                        downloaded_files.extend(files)
-                    else:
-                        console.log(f"[bold yellow]No se encontraron resultados en YouTube para '{title}'.[/bold yellow]")
-                
-                return downloaded_files
+                    console.log(f"  [bold]Procesando track:[/bold] '{track['name']}' de {track['artists'][0]['name']}")
+                    try:
+                        yield from self._download_track(track, output_path)
+                    except DownloadError as e:
+                        # Un track fallido no debe abortar el resto de la colección
+                        console.log(f"[bold red]❌ Falló la descarga de '{track['name']}':[/bold red] {e}")
             except Exception as e:
-                console.log(f"[bold red]❌ Error al procesar la playlist:[/bold red] {e}")
-                return []
+                console.log(f"[bold red]❌ Error al procesar la colección ({kind}):[/bold red] {e}")
+                raise DownloadError(f"Spotify: {e}") from e
         
         else:
-            console.log("[bold red]❌ URL de Spotify no soportada. Solo tracks y playlists.[/bold red]")
-            return []
+            console.log("[bold red]❌ URL de Spotify no soportada. Solo tracks, playlists, álbumes y artistas.[/bold red]")
+
+    def iter_playlist_tracks(self, playlist_id: str) -> Iterator[dict]:
+        """
+        Recorre todas las páginas de la playlist pidiendo solo los campos
+        necesarios (incluidos los del etiquetado). Se omiten los episodios y
+        los archivos locales (sin ID).
+        """
+        page = self._call(self.sp.playlist_items, playlist_id, fields=_PLAYLIST_FIELDS, limit=100, additional_types=("track",))
+        while page:
+            tracks = [item.get('track') for item in page['items']]
+            yield from self._complete_tracks([
+                track for track in tracks if track and track.get('id') and track.get('type', 'track') == 'track'
+            ])
+            page = self._call(self.sp.next, page) if page.get('next') else None
+
+    def _complete_tracks(self, tracks: List[dict]) -> List[dict]:
+        """
+        Completa los tracks de una página a los que les faltan datos de
+        etiquetado con el endpoint de varios IDs (`tracks`, 50 por petición),
+        nunca con una petición por track. Conserva el orden.
+        """
+        missing = [track['id'] for track in tracks if not _has_details(track)]
+        if not missing:
+            return tracks
+        full = {}
+        for batch in _batched(missing, _MAX_IDS_PER_REQUEST):
+            for track in self._call(self.sp.tracks, batch)['tracks']:
+                if track:
+                    full[track['id']] = track
+        return [full.get(track['id'], track) for track in tracks]
+
+    def iter_album_tracks(self, album_id: str) -> Iterator[dict]:
+        """
+        Recorre el álbum página a página. Los tracks simplificados de
+        `album_tracks` no incluyen el álbum, así que cada página se completa
+        con una sola llamada al endpoint de varios IDs (`tracks`).
+        """
+        page = self._call(self.sp.album_tracks, album_id, limit=_MAX_IDS_PER_REQUEST)
+        while page:
+            ids = [track['id'] for track in page['items'] if track.get('id')]
+            for batch in _batched(ids, _MAX_IDS_PER_REQUEST):
+                for track in self._call(self.sp.tracks, batch)['tracks']:
+                    if track:
+                        yield track
+            page = self._call(self.sp.next, page) if page.get('next') else None
+
+    def iter_artist_top_tracks(self, artist_id: str) -> Iterator[dict]:
+        """Top tracks del artista; la respuesta ya contiene tracks completos."""
+        for track in self._call(self.sp.artist_top_tracks, artist_id)['tracks']:
+            if track.get('id'):
+                yield track
+
+    def _download_track(self, track: dict, output_path: str) -> Iterator[dict]:
+        """
+        Resuelve el track a una URL de YouTube y la descarga, identificada por
+        su ID de Spotify y con sus metadatos (el posproceso los usa en lugar
+        del nombre del archivo). La portada se toma de la caché de portadas.
+        """
+        youtube_url = self.resolve_youtube_url(track)
+        if not youtube_url:
+            console.log(f"[bold yellow]No se encontraron resultados en YouTube para '{track['name']}'.[/bold yellow]")
+            return
+        metadata = track_metadata(track)
+        try:
+            metadata['cover'] = get_cover_cache().get(metadata.pop('cover_url'))
+        except Exception as e:
+            console.log(f"[bold yellow]⚠️ No se pudo descargar la portada de '{metadata['album']}':[/bold yellow] {e}")
+        for entry in self.youtube_source.iter_download(youtube_url, output_path):
+            entry.update(metadata, source_id=f"spotify:{track['id']}")
+            yield entry
+
+    def resolve_youtube_url(self, track: dict) -> Optional[str]:
+        """
+        Retorna la URL de YouTube para un track de Spotify. Consulta primero la
+        caché de resoluciones (por ID de Spotify y por 'artista - título') y
+        solo busca en YouTube si ambas fallan.
+        """
+        with metrics.span("resolve", source="Spotify", item=f"spotify:{track['id']}") as current:
+            title = track['name']
+            artist = track['artists'][0]['name']
+            cache = get_resolution_cache()
+            track_key = f"spotify:{track['id']}"
+            cached = cache.get(track_key)
+            if cached is None:
+                cached = cache.get(query_key(artist, title))
+                if cached and track['id']:
+                    cache.set(track_key, cached)
+            current.attrs['cached'] = bool(cached)
+            if cached:
+                return cached['url']
+
+            query = f"{artist} - {title} official audio"
+            # Usamos el proveedor de YouTube para la descarga real
+            youtube_results = self.youtube_source.search(query)
+            if not youtube_results:
+                return None
+            resolution = {'url': youtube_results[0]['url'], 'title': title, 'artist': artist}
+            if track['id']:
+                cache.set(track_key, resolution)
+            cache.set(query_key(artist, title), resolution)
+            return resolution['url']
 
     def search(self, query: str) -> List[dict]:
         if not self.sp:
@@ -99,7 +282,7 @@ class SpotifySource(BaseSource):
         
         console.log(f"[bold]Buscando en Spotify:[/bold] {query}")
         try:
-            results = self.sp.search(q=query, limit=10, type='track')
+            results = self._call(self.sp.search, q=query, limit=10, type='track')
             formatted_results = []
             for item in results['tracks']['items']:
                 formatted_results.append({
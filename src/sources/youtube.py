@@ -1,21 +1,71 @@
 # src/sources/youtube.py
 
+import json
 import os
-import sys
-from pytube import YouTube, Playlist
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pytube import YouTube, Playlist, request as pytube_request
 #from base_source import BaseSource
-from typing import List
+from typing import Callable, Iterator, List, Optional
+from urllib.parse import parse_qs, urlparse
 from rich.console import Console
-from rich.progress import Progress, SpinnerColumn, TextColumn
 
-from sources.base_source import BaseSource
+from converters import audio_converter
+from core import connections, metrics, progress, ratelimit, transfer
+from core.cache import get_manifest_cache, manifest_key
+from core.streams import SelectionPolicy, StreamInfo, is_fresh, manifest_expiry, select_stream
+from sources.base_source import BaseSource, DownloadError
 
 console = Console()
 
+# Extensión según el subtipo MIME del stream de audio (audio/mp4, audio/webm).
+_STREAM_EXTENSIONS = {'mp4': '.m4a', 'webm': '.webm'}
+# Respuestas de googlevideo cuando la URL firmada del manifiesto ya no es válida.
+_EXPIRED_STATUS = (403, 410)
+
+def _execute_request(url, method=None, headers=None, data=None, timeout=None):
+    """
+    Sustituto de `pytube.request._execute_request`: las peticiones de pytube
+    usan el pool de conexiones persistentes compartido por el proceso en
+    lugar de abrir una conexión nueva (con su handshake TLS) en cada `urlopen`.
+    """
+    if data is not None and not isinstance(data, bytes):
+        data = json.dumps(data).encode("utf-8")
+    if not url.lower().startswith("http"):
+        raise ValueError("Invalid URL")
+    return connections.get_pool().request(
+        method or ("POST" if data else "GET"), url, headers=headers, body=data,
+        timeout=timeout if isinstance(timeout, (int, float)) else None, preload=True,
+    )
+
+
+def _install_pool():
+    """Instala `_execute_request` en pytube una sola vez por proceso (idempotente)."""
+    if pytube_request._execute_request is not _execute_request:
+        pytube_request._execute_request = _execute_request
+
+
+_install_pool()
+
 class YouTubeSource(BaseSource):
     """
     Proveedor para descargar música de YouTube, incluyendo listas de reproducción.
     """
+    # YouTube limita con rapidez las peticiones de página/manifiesto
+    rate_limit = (2.0, 4)
+
+    def __init__(self, prefetch: int = 4, segments: int = 1, transcode: bool = False,
+                 policy: Optional[SelectionPolicy] = None):
+        super().__init__()
+        # Número de entradas de la playlist cuyos streams se resuelven por adelantado
+        self.prefetch = max(1, prefetch)
+        # Segmentos paralelos por archivo grande (1 = descarga en un solo flujo)
+        self.segments = max(1, segments)
+        # Si es True, el stream de red se convierte a MP3 al vuelo, sin archivo intermedio
+        self.transcode = transcode
+        # Criterio para elegir el stream de audio (--quality, --codec)
+        self.policy = policy or SelectionPolicy()
+        self.manifests = get_manifest_cache()
 
     def is_valid_url(self, url: str) -> bool:
         return "youtube.com" in url or "youtu.be" in url
@@ -23,41 +73,219 @@ class YouTubeSource(BaseSource):
     def get_source_name(self) -> str:
         return "YouTube"
 
+    def get_source_id(self, url: str) -> Optional[str]:
+        if 'list=' in url:
+            return None
+        parsed = urlparse(url)
+        if parsed.netloc.endswith("youtu.be"):
+            video_id = parsed.path.lstrip("/").split("/")[0]
+        elif parsed.path.startswith("/shorts/"):
+            video_id = parsed.path.split("/")[2]
+        else:
+            video_id = parse_qs(parsed.query).get("v", [""])[0]
+        return f"youtube:{video_id}" if video_id else None
+
     def download(self, url: str, output_path: str) -> List[str]:
-        downloaded_files = []
+        return [entry['path'] for entry in self.iter_download(url, output_path)]
+
+    def iter_download(self, url: str, output_path: str, skip: Optional[Callable[[str], bool]] = None) -> Iterator[dict]:
         try:
             if 'list=' in url:
-                playlist = Playlist(url)
-                console.print(f"[bold magenta]Descargando playlist:[/bold magenta] {playlist.title}")
-                with Progress(SpinnerColumn(), TextColumn("[progress.description]{task.description}")) as progress:
-                    task = progress.add_task("Descargando videos...", total=len(playlist.video_urls))
-                    for video_url in playlist.video_urls:
-                        yt = YouTube(video_url)
-                        audio_stream = yt.streams.filter(only_audio=True).first()
-                        if audio_stream:
-                            safe_title = self._sanitize_filename(yt.title)
-                            out_file = audio_stream.download(output_path=output_path, filename=f"{safe_title}.mp3")
-                            downloaded_files.append(out_file)
-                            progress.console.print(f"  [green]✔[/green] {yt.title}")
-                        progress.advance(task)
+                yield from self._download_playlist(url, output_path, skip)
             else:
-                print("url: ", url)
-                yt = YouTube(url)
-
-                print("yt.title: ", yt.__dict__)
-                print("yt.author: ", yt.stream_monostate.__dict__)
-                audio_stream = yt.streams.filter(only_audio=True).first()
-                if audio_stream:   
-                    safe_title = self._sanitize_filename(yt.title)
-                    out_file = audio_stream.download(output_path=output_path, filename=f"{safe_title}.mp3")
-                    downloaded_files.append(out_file)
-                    console.print(f"[green]✔ Descargado:[/green] {yt.title}")
+                source_id = self.get_source_id(url)
+                if skip is not None and source_id is not None and skip(source_id):
+                    console.print(f"[dim]↷ Ya descargado, se omite:[/dim] {url}")
+                    return
+                title, audio_stream = self._load_stream(url)
+                if audio_stream:
+                    out_file = self._fetch_with_refresh(url, title, audio_stream, output_path)
+                    console.print(f"[green]✔ Descargado:[/green] {title}")
+                    yield {'path': out_file, 'source_id': source_id}
                 else:
                     console.print(f"[red]No se encontró stream de audio para este video.[/red]")
         except Exception as e:
             console.print(f"[bold red]❌ Error al descargar de YouTube:[/bold red] {e}")
-            sys.exit(1)
-        return downloaded_files
+            raise DownloadError(f"YouTube: {e}") from e
+
+    def iter_playlist_entries(self, url: str) -> Iterator[str]:
+        """
+        Expande la playlist de forma perezosa: las URLs se producen página a
+        página a medida que pytube las obtiene, sin materializar la lista completa.
+        Cada página de continuación toma un turno del limitador, como el resto
+        de peticiones a YouTube.
+
+        El paginado usa `_paginate` y `_video_url`, internos de pytube. Si la
+        versión instalada no los tiene se recurre a `video_urls`, que sigue
+        siendo perezoso pero pide las páginas de continuación sin pasar por
+        el limitador.
+        """
+        playlist = Playlist(url)
+        title = self._call(lambda: playlist.title)
+        console.print(f"[bold magenta]Descargando playlist:[/bold magenta] {title}")
+        if not (hasattr(playlist, "_paginate") and hasattr(playlist, "_video_url")):
+            yield from playlist.video_urls
+            return
+        # La primera página sale del HTML ya descargado para obtener el título
+        pages = playlist._paginate()
+        page = next(pages, None)
+        while page is not None:
+            for video in page:
+                yield playlist._video_url(video)
+            self.limiter.acquire()
+            page = next(pages, None)
+
+    def _download_playlist(self, url: str, output_path: str, skip: Optional[Callable[[str], bool]] = None) -> Iterator[dict]:
+        with progress.task("Descargando videos...") as (bar, task):
+            discovered = 0
+            skipped = 0
+
+            def entries():
+                # Cuenta las entradas a medida que llegan: el total crece por páginas.
+                # Las ya descargadas se descartan antes de resolver su stream.
+                nonlocal discovered, skipped
+                for video_url in self.iter_playlist_entries(url):
+                    source_id = self.get_source_id(video_url)
+                    if skip is not None and source_id is not None and skip(source_id):
+                        skipped += 1
+                        continue
+                    discovered += 1
+                    bar.update(task, total=discovered)
+                    yield video_url
+
+            for video_url, title, audio_stream, error in self._prefetch_streams(entries()):
+                if error is not None:
+                    bar.console.print(f"  [red]✘[/red] {video_url}: {error}")
+                elif audio_stream:
+                    # Un video fallido (transferencia, remux, 403 tras refrescar) no aborta la playlist
+                    try:
+                        out_file = self._fetch_with_refresh(video_url, title, audio_stream, output_path)
+                    except Exception as e:
+                        bar.console.print(f"  [red]✘[/red] {video_url}: {e}")
+                    else:
+                        bar.console.print(f"  [green]✔[/green] {title}")
+                        yield {'path': out_file, 'source_id': self.get_source_id(video_url)}
+                bar.advance(task)
+
+            if skipped:
+                bar.console.print(f"  [dim]↷ {skipped} entradas omitidas (ya descargadas)[/dim]")
+
+    def _prefetch_streams(self, video_urls: Iterator[str]) -> Iterator[tuple]:
+        """
+        Resuelve en segundo plano el manifiesto de streams de las próximas
+        `self.prefetch` entradas mientras se descarga la actual.
+        Produce tuplas `(url, title, audio_stream, error)` en el orden de la playlist.
+        """
+        with ThreadPoolExecutor(max_workers=self.prefetch, thread_name_prefix="yt-prefetch") as pool:
+            pending = deque()
+            for video_url in video_urls:
+                pending.append(pool.submit(self._resolve_stream, video_url))
+                if len(pending) > self.prefetch:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def _cached_manifest(self, key: Optional[str]) -> Optional[tuple]:
+        """Manifiesto `(title, streams)` de la caché si sus URLs aún no caducan."""
+        if key is None:
+            return None
+        entry = self.manifests.get(key)
+        if entry is None:
+            return None
+        if not is_fresh(entry.get('expires')):
+            self.manifests.invalidate(key)
+            return None
+        return entry['title'], [StreamInfo.from_dict(item) for item in entry['streams']]
+
+    def _fetch_manifest(self, video_url: str) -> tuple:
+        """Descarga la página del video y extrae `(title, streams)` de audio."""
+        yt = YouTube(video_url)
+        with metrics.span("resolve", source="YouTube", item=video_url):
+            title = yt.title
+            streams = [StreamInfo.from_pytube(stream) for stream in yt.streams.filter(only_audio=True)]
+        return title, streams
+
+    def _load_stream(self, video_url: str) -> tuple:
+        """
+        Obtiene el manifiesto de streams de audio del video (de la caché o
+        descargando su página) y elige uno según la política: `(title, stream)`.
+        Solo la descarga pasa por el limitador; un acierto de caché no consume
+        turno.
+        """
+        source_id = self.get_source_id(video_url)
+        key = manifest_key(source_id) if source_id else None
+        cached = self._cached_manifest(key)
+        if cached is not None:
+            title, streams = cached
+        else:
+            title, streams = self._call(self._fetch_manifest, video_url)
+            if key is not None and streams:
+                self.manifests.set(key, {
+                    'title': title,
+                    'streams': [stream.to_dict() for stream in streams],
+                    'expires': manifest_expiry(streams),
+                })
+        with metrics.span("stream-select", source="YouTube", item=video_url, cached=cached is not None) as current:
+            selected = select_stream(streams, self.policy)
+            if selected is not None:
+                current.attrs.update(itag=selected.itag, codec=selected.codec, bitrate=selected.bitrate)
+            return title, selected
+
+    def _resolve_stream(self, video_url: str) -> tuple:
+        """Obtiene el título y el stream de audio elegido; los errores se retornan, no se lanzan."""
+        try:
+            title, audio_stream = self._load_stream(video_url)
+            return video_url, title, audio_stream, None
+        except Exception as e:
+            return video_url, None, None, e
+
+    def _fetch_with_refresh(self, video_url: str, title: str, audio_stream: StreamInfo, output_path: str) -> str:
+        """
+        Descarga el stream; si venía de la caché y el servidor rechaza su URL
+        firmada (revocada antes de su caducidad), descarta el manifiesto, lo
+        vuelve a obtener y reintenta una vez.
+        """
+        try:
+            return self._fetch_stream(audio_stream, title, output_path)
+        except Exception as e:
+            status, _ = ratelimit.error_details(e)
+            source_id = self.get_source_id(video_url)
+            if not audio_stream.cached or status not in _EXPIRED_STATUS or source_id is None:
+                raise
+            self.manifests.invalidate(manifest_key(source_id))
+            console.log(f"  [dim]URL del stream caducada ({status}); se renueva el manifiesto de {title}[/dim]")
+            title, audio_stream = self._load_stream(video_url)
+            if audio_stream is None:
+                raise
+            return self._fetch_stream(audio_stream, title, output_path)
+
+    def _fetch_stream(self, audio_stream: StreamInfo, title: str, output_path: str) -> str:
+        """
+        Descarga el stream mediante la capa reanudable de `core.transfer`: un
+        corte deja un `.part` que se retoma en el siguiente intento. El archivo
+        se guarda con la extensión de su contenedor real y, si hace falta, se
+        remultiplexa (sin recodificar) a un contenedor etiquetable.
+        Con `transcode`, el stream se convierte a MP3 real mientras se descarga.
+        """
+        safe_title = self._sanitize_filename(title)
+        if self.transcode:
+            dest = os.path.join(output_path, f"{safe_title}.mp3")
+            # La respuesta HTTP alimenta directamente a FFmpeg; no es reanudable
+            with metrics.span("fetch", source="YouTube", item=dest, transcode=True) as current, \
+                    transfer.open_stream(audio_stream.url, pool=self.http) as response:
+                current.bytes = audio_converter.stream_to_mp3(response, dest).bytes_in
+            return dest
+
+        extension = _STREAM_EXTENSIONS.get(audio_stream.subtype, f".{audio_stream.subtype}")
+        dest = os.path.join(output_path, f"{safe_title}{extension}")
+        transfer.download_file(audio_stream.url, dest, expected_size=audio_stream.filesize, segments=self.segments, pool=self.http)
+        with metrics.span("convert", source="YouTube", item=dest) as current:
+            final_path, action = audio_converter.normalize_container(dest)
+            current.bytes = os.path.getsize(final_path)
+            current.attrs['action'] = action
+        if action == "remux":
+            console.log(f"  [dim]{os.path.basename(dest)} → {os.path.basename(final_path)} ({audio_converter.ACTION_LABELS[action]})[/dim]")
+        return final_path
 
     def search(self, query: str) -> List[dict]:
         """
@@ -71,4 +299,4 @@ class YouTubeSource(BaseSource):
 
     def _sanitize_filename(self, name: str) -> str:
         """Limpia el nombre del archivo para evitar caracteres inválidos."""
-        return "".join(c for c in name if c.isalnum() or c in " .-_").rstrip()
\ No newline at end of file
+        return "".join(c for c in name if c.isalnum() or c in " .-_").rstrip()
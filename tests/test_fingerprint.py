@@ -0,0 +1,48 @@
+# tests/test_fingerprint.py
+
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from core.fingerprint import Fingerprint, find_duplicates  # noqa: E402
+
+
+def _vector(angle: float) -> np.ndarray:
+    return np.array([np.cos(angle), np.sin(angle), 0.0, 0.0], dtype=np.float32)
+
+
+class _Index:
+    """Índice en memoria con una sola cubeta que contiene todas las huellas."""
+
+    def __init__(self, fingerprints):
+        self.fingerprints = {fp.path: fp for fp in fingerprints}
+
+    def candidate_groups(self):
+        yield sorted(self.fingerprints)
+
+    def get(self, path):
+        return self.fingerprints.get(path)
+
+
+class FindDuplicatesTest(unittest.TestCase):
+    def test_chained_match_below_threshold_is_not_grouped_with_kept_copy(self):
+        # A~B y B~C superan el umbral, pero A~C no: C no puede caer en el grupo de A
+        step = float(np.arccos(0.93))
+        index = _Index([
+            Fingerprint("a.flac", 30, 0.0, 200.0, 900_000, "flac", _vector(0.0), 0),
+            Fingerprint("b.mp3", 20, 0.0, 200.0, 320_000, "mp3", _vector(step), 0),
+            Fingerprint("c.mp3", 10, 0.0, 200.0, 128_000, "mp3", _vector(2 * step), 0),
+        ])
+        groups = find_duplicates(index, threshold=0.92)
+        self.assertEqual([[fp.path for fp in group] for group in groups], [["a.flac", "b.mp3"]])
+        for group in groups:
+            for member in group[1:]:
+                self.assertGreaterEqual(group[0].similarity(member), 0.92)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+# tests/test_organizer.py
+
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from core.organizer import FileEntry, MoveJournal, _Mover, apply_plan, build_plan, final_paths  # noqa: E402
+
+
+class MoveJournalRollbackTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.root = self._tmp.name
+        self.moves = []
+        for name in ("f1.mp3", "f2.mp3", "f3.mp3"):
+            source = os.path.join(self.root, name)
+            Path(source).write_bytes(name.encode())
+            self.moves.append((source, os.path.join(self.root, "A", name)))
+
+    def tearDown(self):
+        self._tmp.cleanup()
+
+    def test_rollback_undoes_moves_not_yet_committed(self):
+        # El proceso muere tras mover dos archivos y antes de confirmar su lote.
+        journal = MoveJournal(self.root)
+        journal.begin(self.moves)
+        mover = _Mover(self.root)
+        for source, target in self.moves[:2]:
+            mover.move(source, target)
+        journal.close()
+
+        journal = MoveJournal(self.root)
+        self.assertEqual(journal.counts(), (0, 3))
+        self.assertEqual(journal.rollback(), 2)
+        self.assertEqual(journal.state, "rolled-back")
+        journal.close()
+
+        for source, target in self.moves:
+            self.assertTrue(os.path.exists(source), source)
+            self.assertFalse(os.path.exists(target), target)
+        self.assertFalse(os.path.exists(os.path.join(self.root, "A")))
+
+    def test_rollback_after_resume_undoes_everything(self):
+        journal = MoveJournal(self.root)
+        journal.begin(self.moves)
+        self.assertEqual(journal.resume(), 3)
+        self.assertEqual(journal.rollback(), 3)
+        journal.close()
+
+        for source, _ in self.moves:
+            self.assertEqual(Path(source).read_bytes(), os.path.basename(source).encode())
+
+
+class SwapPlanTest(unittest.TestCase):
+    def test_two_file_swap_resolves_to_final_paths(self):
+        with tempfile.TemporaryDirectory() as root:
+            a, b = os.path.join(root, "A - B.mp3"), os.path.join(root, "B - A.mp3")
+            Path(a).write_bytes(b"a")
+            Path(b).write_bytes(b"b")
+            entries = [FileEntry(a, 1, 0.0), FileEntry(b, 1, 0.0)]
+            plan = build_plan(entries, {a: b, b: a}.get)
+            self.assertEqual(plan.cycles, 1)
+
+            applied = apply_plan(plan)
+            self.assertEqual(final_paths(applied), {a: b, b: a})
+            self.assertEqual(Path(b).read_bytes(), b"a")
+            self.assertEqual(Path(a).read_bytes(), b"b")
+
+    def test_apply_plan_never_overwrites_a_target_created_after_planning(self):
+        with tempfile.TemporaryDirectory() as root:
+            source, target = os.path.join(root, "a.mp3"), os.path.join(root, "A", "b.mp3")
+            Path(source).write_bytes(b"source")
+            plan = build_plan([FileEntry(source, 6, 0.0)], {source: target}.get)
+            os.makedirs(os.path.dirname(target))
+            Path(target).write_bytes(b"other")
+
+            errors = []
+            applied = apply_plan(plan, on_error=lambda *args: errors.append(args))
+            self.assertEqual(applied, [])
+            self.assertIsInstance(errors[0][2], FileExistsError)
+            self.assertEqual(Path(target).read_bytes(), b"other")
+            self.assertEqual(Path(source).read_bytes(), b"source")
+
+
+if __name__ == "__main__":
+    unittest.main()
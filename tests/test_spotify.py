@@ -0,0 +1,130 @@
+# tests/test_spotify.py
+
+import http.server
+import json
+import sys
+import threading
+import unittest
+from pathlib import Path
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+import spotipy
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from sources.spotify import _PLAYLIST_FIELDS, SpotifySource  # noqa: E402
+
+
+def _track(n: int, detailed: bool) -> dict:
+    track = {'id': f"t{n}", 'name': f"Canción {n}", 'type': 'track', 'artists': [{'name': "Artista"}]}
+    if detailed:
+        track.update(track_number=n % 12 + 1, external_ids={'isrc': f"ISRC{n}"},
+                     album={'id': "al", 'name': "Álbum", 'release_date': "2020", 'total_tracks': 12, 'images': []})
+    return track
+
+
+class FakeSpotifyServer:
+    """
+    API de Spotify mínima en local: pagina `/v1/playlists/<id>/tracks` (o
+    `/items`, según la versión de spotipy) con `offset`/`limit` y atiende
+    `/v1/tracks?ids=...`. Registra cada petición.
+    """
+
+    def __init__(self, total: int, detailed: bool = True):
+        self.total = total
+        self.detailed = detailed
+        self.requests = []
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                parsed = urlsplit(self.path)
+                path = parsed.path.rstrip("/")
+                query = {key: values[0] for key, values in parse_qs(parsed.query).items()}
+                server.requests.append((path, query))
+                status, payload = server.route(path, query)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self._httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_port}"
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def route(self, path: str, query: dict):
+        if self.is_playlist(path):
+            offset, limit = int(query.get('offset', 0)), int(query.get('limit', 100))
+            end = min(offset + limit, self.total)
+            items = [{'track': _track(n, self.detailed)} for n in range(offset, end)]
+            following = f"{self.url}{path}?offset={end}&limit={limit}" if end < self.total else None
+            return 200, {'items': items, 'next': following}
+        if path == "/v1/tracks":
+            ids = query['ids'].split(",")
+            return 200, {'tracks': [_track(int(track_id[1:]), True) for track_id in ids]}
+        return 404, {'error': {'status': 404, 'message': "not found"}}
+
+    @staticmethod
+    def is_playlist(path: str) -> bool:
+        return path.startswith("/v1/playlists/") and path.endswith(("/tracks", "/items"))
+
+    def playlist_pages(self) -> list:
+        return [query for path, query in self.requests if self.is_playlist(path)]
+
+    def batches(self) -> list:
+        return [query['ids'].split(",") for path, query in self.requests if path == "/v1/tracks"]
+
+    def close(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class PlaylistTracksTest(unittest.TestCase):
+    def source_for(self, server: FakeSpotifyServer) -> SpotifySource:
+        session = requests.Session()
+        session.trust_env = False
+        client = spotipy.Spotify(auth="token", requests_session=session, retries=0, status_retries=0)
+        client.prefix = f"{server.url}/v1/"
+        source = SpotifySource()
+        source._sp, source._sp_ready = client, True
+        return source
+
+    def serve(self, total: int, detailed: bool = True) -> FakeSpotifyServer:
+        server = FakeSpotifyServer(total, detailed)
+        self.addCleanup(server.close)
+        return server
+
+    def test_follows_next_through_every_page(self):
+        server = self.serve(250)
+        tracks = list(self.source_for(server).iter_playlist_tracks("pl"))
+        self.assertEqual([track['id'] for track in tracks], [f"t{n}" for n in range(250)])
+        self.assertEqual([int(page.get('offset', 0)) for page in server.playlist_pages()], [0, 100, 200])
+
+    def test_requests_only_the_needed_fields(self):
+        server = self.serve(3)
+        list(self.source_for(server).iter_playlist_tracks("pl"))
+        self.assertEqual(server.playlist_pages()[0]['fields'], _PLAYLIST_FIELDS)
+
+    def test_completes_missing_details_in_batches_of_50(self):
+        server = self.serve(130, detailed=False)
+        tracks = list(self.source_for(server).iter_playlist_tracks("pl"))
+        self.assertEqual([len(batch) for batch in server.batches()], [50, 50, 30])
+        self.assertTrue(all(track.get('track_number') and track['album']['release_date'] for track in tracks))
+        self.assertEqual([track['id'] for track in tracks], [f"t{n}" for n in range(130)])
+
+    def test_streams_tracks_before_fetching_the_last_page(self):
+        server = self.serve(250)
+        tracks = self.source_for(server).iter_playlist_tracks("pl")
+        self.assertEqual(next(tracks)['id'], "t0")
+        self.assertEqual(len(server.playlist_pages()), 1)
+        tracks.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+# tests/test_transfer.py
+
+import http.server
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from core import transfer  # noqa: E402
+from core.connections import HttpPool  # noqa: E402
+
+_BODY = bytes(range(256)) * 4096
+
+
+class _IgnoresRangeHandler(http.server.BaseHTTPRequestHandler):
+    """Servidor que ignora Range: siempre responde 200 con el cuerpo completo."""
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(_BODY)))
+        self.end_headers()
+
+    def do_GET(self):
+        self.do_HEAD()
+        self.wfile.write(_BODY)
+
+
+class SegmentedDownloadTest(unittest.TestCase):
+    def test_falls_back_to_single_stream_when_range_is_ignored(self):
+        httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _IgnoresRangeHandler)
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        self.addCleanup(httpd.server_close)
+        self.addCleanup(httpd.shutdown)
+
+        with tempfile.TemporaryDirectory() as root, mock.patch.object(transfer, "SEGMENT_THRESHOLD", 1024):
+            dest = os.path.join(root, "track.webm")
+            url = f"http://127.0.0.1:{httpd.server_port}/track"
+            transfer.download_file(url, dest, segments=4, pool=HttpPool())
+            self.assertEqual(Path(dest).read_bytes(), _BODY)
+            self.assertEqual(sorted(os.listdir(root)), ["track.webm"])
+
+
+if __name__ == "__main__":
+    unittest.main()